@@ -1,13 +1,13 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response
 from flask_restful import Api
 import requests
-import json
 import hashlib
 import time
-import cv2
 from ALRU_robot_api.robot_api_alru import ArmController
-from ALRU_Arduino_control.control_arduino_alru import Arduino
+from ALRU_Arduino_control.control_arduino_alru import Arduino, BoardStarter
 from host import *
+from fields_config import fields_store
+from vision_framebus import FrameBusReader
 import serial
 from dotenv import load_dotenv
 
@@ -34,31 +34,33 @@ tablee = False
 angle_1 = 90
 angle_2 = 90
 
-# camera = cv2.VideoCapture(1)
-
-board = Arduino('COM13')
 servo_pin_1 = 8
 servo_pin_2 = 9
-servo_1 = board.get_pin(f'd:{servo_pin_1}:s')
-servo_2 = board.get_pin(f'd:{servo_pin_2}:s')
-ser = serial.Serial('COM3', 9600, timeout=1)
+BOARD_TIMEOUT = 10
+
+
+def connect_board():
+    board = Arduino('COM13')
+    return board, board.get_pin(f'd:{servo_pin_1}:s'), board.get_pin(f'd:{servo_pin_2}:s')
+
 
+# Плата и порт конвейера открываются в main(): на Windows процессы пула PlacementService
+# заново импортируют этот модуль и не должны сами лезть в COM-порты
+arduino = None
+ser = None
 
-# def generate_frames():
-#     while True:
-#         success, frame = camera.read()
-#         if not success:
-#             break
-#         else:
-#             ret, buffer = cv2.imencode('.jpg', frame)
-#             frame = buffer.tobytes()
-#             yield (b'--frame\r\n'
-#                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
+# Кадры берутся из общей памяти процесса распознавания (2) video_yolo.py):
+# камера и кодирование JPEG не зависят от числа зрителей
+def generate_frames():
+    for frame in FrameBusReader().frames():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
-# @app.route('/video_feed')
-# def video_feed():
-#     return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video_feed')
+def video_feed():
+    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
 @app.route('/')
@@ -138,16 +140,33 @@ def move():
     return jsonify({'status': 'success', 'direction': direction})
 
 
+def board_error():
+    # Пока плата подключается (или не подключилась), маршруты с сервами сразу отвечают
+    # ошибкой, а не ждут BOARD_TIMEOUT и не падают с 500
+    try:
+        arduino.wait(0)
+    except IOError as e:
+        print(e)
+        return jsonify({'status': 'error', 'error': str(e)}), 503
+    return None
+
+
 def send_servo_command(servo_type, value, servo_type_2, value_2):
-    if servo_type == 1:
-        servo_1.write(value)
-    if servo_type_2 == 2:
-        servo_2.write(value_2)
+    board, servo_1, servo_2 = arduino.wait(BOARD_TIMEOUT)
+    # Обе сервы - одной записью в порт
+    with board.batch():
+        if servo_type == 1:
+            servo_1.write(value)
+        if servo_type_2 == 2:
+            servo_2.write(value_2)
 
 
 @app.route('/activate_grabber', methods=['POST'])
 def activate_grabber():
     global grabber, angle_1, angle_2
+    error = board_error()
+    if error:
+        return error
     if grabber:
         send_servo_command(1, 20, 2, angle_2)
         grabber = False
@@ -163,6 +182,9 @@ def activate_grabber():
 @app.route('/table', methods=['POST'])
 def table():
     global tablee, angle_1, angle_2
+    error = board_error()
+    if error:
+        return error
     if tablee:
         send_servo_command(1, angle_1, 2, 90)
         tablee = False
@@ -176,19 +198,17 @@ def table():
 
 @app.route('/reset_table', methods=['POST'])
 def reset_table():
-    file_path = "fields_state.json"
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        print(f"Файл {file_path} удален.")
-    with open(file_path, "w") as file:
-        json.dump({"field1": [[0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]], "field2": [[0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0]], "x1": 8, "y1": 12, "x2": 8, "y2": 12, "current_box_id": 0}, file)
-        print(f"Файл {file_path} создан.")
+    fields_store().reset()
+    print("Состояние полей сброшено.")
     return jsonify({'status': 'success'})
 
 
 @app.route('/start_program', methods=['POST'])
 def start_program():
     global tablee, angle_1, angle_2
+    error = board_error()
+    if error:
+        return error
     ser.write(("start_motor" + '\n').encode('utf-8'))
     print('Program started')
     try:
@@ -417,6 +437,10 @@ def get_data():
 
 
 def main():
+    global arduino, ser
+    # Плата подключается в фоне, веб-сервер стартует, не дожидаясь её
+    arduino = BoardStarter(connect_board)
+    ser = serial.Serial('COM3', 9600, timeout=1)
     api.add_resource(get_password, '/api/v1/get/get_password')
     api.add_resource(get_data_txt, '/api/v1/get/get_data_txt')
     api.add_resource(get_wall, '/api/v1/get/get_wall')
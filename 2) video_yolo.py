@@ -1,20 +1,37 @@
 import cv2
 import supervision as sv
 from pyzbar import pyzbar
-from PIL import Image, ImageDraw, ImageFont
-import numpy as np
 import os
-import torch
-from ultralytics import YOLO
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print(f"Using device: {device}")
+import time
+import argparse
+
+from vision_pipeline import VisionPipeline, StageStats
+from vision_draw import draw_russian_text
+from vision_track import BoxTracker, box_bbox
+from vision_source import open_source
+from vision_motion import MotionGate
+from vision_backend import load_backend
+from vision_channel import DetectionPublisher, DetectionRecord, capture_time
+from vision_framebus import FrameBus, BUS_NAME
+from vision_adapt import AdaptiveController, LEVELS
 
 label_annotator = sv.LabelAnnotator()
 box_annotator = sv.BoxAnnotator()
 
-model = YOLO('yolov8n_custom_for_box.pt')
-model.to(device)
+# Модель загружается при первом кадре: .pt через ultralytics/torch,
+# .onnx через onnxruntime или OpenCV DNN (MODEL_ENGINE = "opencv")
+MODEL_PATH = 'yolov8n_custom_for_box.pt'
+MODEL_ENGINE = None
+model = None
+
+# В headless-режиме кадр не рисуется и не показывается, остаются только output.txt и консоль
+headless = False
+annotate_stats = StageStats("annotate")
+tracker = BoxTracker()
+# Записи с посылками для host.py (DetectionPublisher), создаётся при запуске скрипта
+channel = None
+# Кадр для /video_feed веб-сервера: шина в общей памяти на каждую камеру
+frame_buses = {}
 
 
 def decode_qr_code(image, box):
@@ -33,53 +50,104 @@ def decode_qr_code(image, box):
         return None
 
 
-def draw_russian_text(image, text, position, font_size=30, font_color=(0, 255, 0)):
-    image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(image_pil)
+def write_to_file(data, file_path="output.txt"):
+    # Через временный файл, чтобы читатель не застал файл недописанным
+    with open(file_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(file_path + ".tmp", file_path)
 
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except IOError:
-        print("Шрифт Arial не найден. Используется стандартный шрифт.")
-        font = ImageFont.load_default()
 
-    draw.text(position, text, font=font, fill=font_color)
+def publish_records(packet, source="1"):
+    timestamp = capture_time(packet)
+    records = [DetectionRecord.create(timestamp, source, packet.seq, box.get('track'), box_bbox(box),
+                                      qr_code_value is not None, qr_code_value)
+               for box, qr_code_value in zip(packet.boxes, packet.qr)]
+    channel.publish(source, packet.seq, timestamp, records)
 
-    return cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
 
+def get_model():
+    global model
+    if model is None:
+        model = load_backend(MODEL_PATH, MODEL_ENGINE)
+    return model
 
-def write_to_file(data, file_path="output.txt"):
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(data)
+
+def boxes_from_result(result):
+    boxes = []
+    for xyxy, class_id in zip(result.xyxy, result.class_id):
+        class_name = model.names[int(class_id)]
+        if class_name == "box":
+            x1, y1, x2, y2 = map(int, xyxy)
+            boxes.append({
+                "class": class_name,
+                "x": (x1 + x2) / 2,
+                "y": (y1 + y2) / 2,
+                "width": x2 - x1,
+                "height": y2 - y1
+            })
+    return boxes
+
+
+def detect_boxes(packet):
+    detect_batch([packet])
 
 
-def my_custom_sink(video_frame):
-    image = video_frame.imag.copy()
+def detect_batch(packets):
+    # Один вызов модели на кадры нескольких камер
+    results = get_model().predict([packet.image for packet in packets])
+
+    for packet, result in zip(packets, results):
+        packet.boxes = boxes_from_result(result)
+        packet.detections = sv.Detections(xyxy=result.xyxy, confidence=result.confidence,
+                                          class_id=result.class_id)
+
+
+def read_qr_codes(packet, tracker=tracker):
+    center_x = packet.image.shape[1] // 2
+
+    # QR посылки читается один раз за всё время её проезда через центр
+    tracks = tracker.update([box_bbox(box) for box in packet.boxes])
+
+    packet.qr = []
+    for box, track in zip(packet.boxes, tracks):
+        box['track'] = track.id
+        box_left = box['x'] - box['width'] / 2
+        box_right = box['x'] + box['width'] / 2
+        if box_left <= center_x <= box_right:
+            packet.qr.append(tracker.read(track, lambda: decode_qr_code(packet.image, box)) or "")
+        else:
+            packet.qr.append(None)
+
+
+def annotate(packet):
+    image = packet.image.copy()
 
     height, width, _ = image.shape
 
     center_x = width // 2
     cv2.line(image, (center_x, 0), (center_x, height), (0, 255, 0), 2)
 
-    output_data = ""
+    if packet.boxes:
+        for qr_code_value in packet.qr:
+            if qr_code_value:
+                draw_russian_text(image, f"QR: {qr_code_value}", (10, 30))
 
-    results = model(image)
+        detections = packet.detections
+        labels = [model.names[int(cls)] for cls in detections.class_id]
+        image = label_annotator.annotate(
+            scene=image, detections=detections, labels=labels)
+        image = box_annotator.annotate(image, detections=detections)
 
-    boxes = []
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls)
-            class_name = model.names[class_id]
-            if class_name == "box":
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                boxes.append({
-                    "class": class_name,
-                    "x": (x1 + x2) / 2,
-                    "y": (y1 + y2) / 2,
-                    "width": x2 - x1,
-                    "height": y2 - y1
-                })
+    return image
+
+
+def my_custom_sink(packet, file_path="output.txt", source="1"):
+    if channel is not None:
+        publish_records(packet, source)
 
+    output_data = ""
+
+    boxes = packet.boxes
     if not boxes:
         print("No parcels detected.")
         output_data += "No parcels detected.\n"
@@ -87,7 +155,7 @@ def my_custom_sink(video_frame):
         print(f"Количество посылок: {len(boxes)}")
         output_data += f"Количество посылок: {len(boxes)}\n"
 
-        for i, box in enumerate(boxes):
+        for i, (box, qr_code_value) in enumerate(zip(boxes, packet.qr)):
             print(f"Посылка {i + 1}:")
             print(f"  Координаты: (x: {box['x']}, y: {box['y']})")
             print(
@@ -97,20 +165,12 @@ def my_custom_sink(video_frame):
             output_data += f"  Координаты: (x: {box['x']}, y: {box['y']})\n"
             output_data += f"  Размеры: (ширина: {box['width']}, высота: {box['height']})\n"
 
-            box_x = box['x']
-            box_width = box['width']
-            box_left = box_x - box_width / 2
-            box_right = box_x + box_width / 2
-
-            if box_left <= center_x <= box_right:
+            if qr_code_value is not None:
                 print("OK")
-                qr_code_value = decode_qr_code(image, box)
                 if qr_code_value:
                     print("QR-код распознан.")
                     print(f"QR-код: {qr_code_value}")
                     output_data += f"  QR-код: {qr_code_value}\n"
-                    image = draw_russian_text(
-                        image, f"QR: {qr_code_value}", (10, 30))
                 else:
                     print("QR-код не распознан.")
                     output_data += "  QR-код не распознан.\n"
@@ -118,29 +178,74 @@ def my_custom_sink(video_frame):
                 print("Посылка не в центре.")
                 output_data += "  Посылка не в центре.\n"
 
-        detections = sv.Detections.from_yolov8(results[0])
-        labels = [model.names[int(cls)] for cls in detections.class_id]
-        image = label_annotator.annotate(
-            scene=image, detections=detections, labels=labels)
-        image = box_annotator.annotate(image, detections=detections)
-
-    write_to_file(output_data)
-
-    cv2.imshow("Predictions", image)
-    cv2.waitKey(1)
-
-
-cap = cv2.VideoCapture(0)
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    write_to_file(output_data, file_path)
 
-    my_custom_sink(frame)
+    frame_bus = frame_buses.get(source)
+    if headless:
+        if frame_bus is not None:
+            frame_bus.publish(packet.image)
+        return True
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    start = time.perf_counter()
+    image = annotate(packet)
+    annotate_stats.record(time.perf_counter() - start)
+    if frame_bus is not None:
+        frame_bus.publish(image)
 
-cap.release()
-cv2.destroyAllWindows()
+    cv2.imshow("Predictions", image)
+    return cv2.waitKey(1) & 0xFF != ord('q')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true", help="без окна и отрисовки кадров")
+    parser.add_argument("--source", default="0", help="номер камеры, видеофайл или каталог кадров")
+    parser.add_argument("--realtime", action="store_true", help="отдавать запись с частотой камеры")
+    parser.add_argument("--heartbeat", type=float, default=2.0,
+                        help="инференс не реже чем раз в столько секунд на неподвижной сцене")
+    parser.add_argument("--no-motion-gate", action="store_true", help="инференс на каждом кадре")
+    parser.add_argument("--model", default=MODEL_PATH, help="веса .pt или экспортированная модель .onnx")
+    parser.add_argument("--engine", choices=("onnxruntime", "opencv"), help="чем запускать .onnx")
+    parser.add_argument("--target-ms", type=float,
+                        help="держать задержку распознавания ниже этой, меняя разрешение и пропуск кадров")
+    parser.add_argument("--prefer", choices=tuple(LEVELS), default="throughput",
+                        help="что сохранять под нагрузкой: частоту кадров или разрешение")
+    args = parser.parse_args()
+    headless = args.headless
+    MODEL_PATH, MODEL_ENGINE = args.model, args.engine
+    get_model()
+    channel = DetectionPublisher()
+    frame_buses["1"] = FrameBus(BUS_NAME)
+
+    cap = open_source(args.source, args.realtime)
+
+    read_frame, detect, publish = cap.read, detect_boxes, my_custom_sink
+    controller = None
+    if args.target_ms:
+        controller = AdaptiveController(args.target_ms, args.prefer, model)
+        read_frame = controller.wrap_read(read_frame)
+        detect = controller.wrap(detect)
+        publish = controller.wrap_publish(publish)
+
+    # Пока лента стоит и кадр не меняется, модель не запускается
+    motion_gate = MotionGate(heartbeat=args.heartbeat)
+    if not args.no_motion_gate:
+        detect = motion_gate.wrap(detect)
+
+    # Камера, модель и QR работают в своих потоках; на экран, в output.txt
+    # и подписчикам канала (host.py) выводится последний обработанный кадр
+    pipeline = VisionPipeline(read_frame, detect, read_qr_codes, publish)
+    if not headless:
+        pipeline.stats["annotate"] = annotate_stats
+    try:
+        print(pipeline.run())
+    except KeyboardInterrupt:
+        print(pipeline.report())
+    print(f"Инференс: выполнен {motion_gate.runs}, пропущен {motion_gate.skipped}")
+    if controller is not None:
+        print(controller.metrics())
+
+    cap.release()
+    channel.close()
+    frame_buses["1"].close()
+    cv2.destroyAllWindows()
@@ -1,7 +1,21 @@
 import cv2
 from pyzbar import pyzbar
-from PIL import Image, ImageDraw, ImageFont
 import numpy as np
+import argparse
+import os
+import time
+
+from vision_draw import draw_russian_text
+from vision_track import RegionTracker
+from vision_source import open_source
+from vision_channel import DetectionPublisher, DetectionRecord
+from vision_framebus import FrameBus
+
+# Известные QR-коды ищутся рядом с прежним положением, полный кадр сканируется реже
+tracker = RegionTracker()
+channel = None
+frame_bus = None
+frame_number = 0
 
 def decode_qr_code(image):
     decoded_qr_codes = pyzbar.decode(image)
@@ -15,25 +29,17 @@ def decode_qr_code(image):
 
     return qr_data
 
-def draw_russian_text(image, text, position, font_size=30, font_color=(0, 255, 0)):
-    image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(image_pil)
-
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except IOError:
-        print("Шрифт Arial не найден. Используется стандартный шрифт.")
-        font = ImageFont.load_default()
-
-    draw.text(position, text, font=font, fill=font_color)
-
-    return cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
-
 def write_to_file(data, file_path="output.txt"):
-    with open(file_path, "w", encoding="utf-8") as f:
+    with open(file_path + ".tmp", "w", encoding="utf-8") as f:
         f.write(data)
+    os.replace(file_path + ".tmp", file_path)
 
 def my_custom_sink(video_frame):
+    global frame_number
+    frame_number += 1
+    timestamp = time.time()
+    records = []
+
     image = video_frame.copy()
 
     height, width, _ = image.shape
@@ -43,7 +49,7 @@ def my_custom_sink(video_frame):
 
     output_data = ""
 
-    qr_codes = decode_qr_code(image)
+    qr_codes = tracker.update(video_frame, decode_qr_code)
 
     if not qr_codes:
         print("No QR codes detected.")
@@ -79,7 +85,11 @@ def my_custom_sink(video_frame):
             expanded_top = max(0, qr_top - 50)
             expanded_bottom = min(height, qr_bottom + 50)
 
-            if expanded_left <= center_x <= expanded_right:
+            centered = expanded_left <= center_x <= expanded_right
+            records.append(DetectionRecord.create(timestamp, "1", frame_number, None,
+                                                  (qr_left, qr_top, qr_right, qr_bottom), centered, qr['data']))
+
+            if centered:
                 print("QR-код в центре.")
                 output_data += "  QR-код в центре.\n"
                 image = draw_russian_text(image, f"QR: {qr['data']}", (10, 30))
@@ -98,21 +108,36 @@ def my_custom_sink(video_frame):
 
     if qr_codes:
         write_to_file(output_data)
+    if channel is not None:
+        channel.publish("1", frame_number, timestamp, records)
+
+    if frame_bus is not None:
+        frame_bus.publish(image)
 
     cv2.imshow("QR Code Detection", image)
     cv2.waitKey(1)
 
-cap = cv2.VideoCapture(0)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="0", help="номер камеры, видеофайл или каталог кадров")
+    parser.add_argument("--realtime", action="store_true", help="отдавать запись с частотой камеры")
+    args = parser.parse_args()
+
+    cap = open_source(args.source, args.realtime)
+    channel = DetectionPublisher()
+    frame_bus = FrameBus()
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
 
-    my_custom_sink(frame)
+        my_custom_sink(frame)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+    cap.release()
+    channel.close()
+    frame_bus.close()
+    cv2.destroyAllWindows()
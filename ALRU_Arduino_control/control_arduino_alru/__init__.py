@@ -1,5 +1,7 @@
 from .boards import BOARDS
 from .control_alru import *
+from .async_alru import AsyncBoard
+from .util import BoardStarter
 
 class Arduino(Board):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,242 @@
+import asyncio
+import time
+
+from .control_alru import (Board, FirmataParser, REPORT_VERSION, REPORT_FIRMWARE, CAPABILITY_QUERY,
+                           CAPABILITY_RESPONSE)
+
+# Плата Firmata на asyncio: без потока Iterator, входящие байты разбирает FirmataParser
+# прямо в data_received. Pin/Port и раскладки BOARDS те же, что у Board: их запись
+# уходит в буфер транспорта без блокировки, а await ждёт, пока буфер не опустеет
+# ниже верхней границы. Один цикл событий обслуживает сколько угодно плат.
+# set_write_window() сбрасывает буфер через loop.call_later, а не потоком Board:
+# транспорт asyncio можно трогать только из потока цикла событий.
+#
+#     board = await AsyncBoard.connect('COM13', BOARDS['arduino'])
+#     servo = board.get_pin('d:9:s')
+#     await board.write(servo, 90)
+#     async for pin, value in board.events():
+#         ...
+
+
+class TransportWriter(object):
+    # Замена serial.Serial для Pin/Port и send_sysex
+    def __init__(self, port):
+        self.port = port
+        self.transport = None
+        self.writes = 0
+        self.bytes_written = 0
+
+    def write(self, data):
+        if self.transport is None or self.transport.is_closing():
+            raise IOError("Port {0} is not open".format(self.port))
+        self.transport.write(bytes(data))
+        self.writes += 1
+        self.bytes_written += len(data)
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def inWaiting(self):
+        return 0
+
+    @property
+    def closed(self):
+        return self.transport is None or self.transport.is_closing()
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class FirmataProtocol(asyncio.Protocol):
+    def __init__(self, board, write_limit=None):
+        self.board = board
+        self.write_limit = write_limit
+
+    def connection_made(self, transport):
+        if self.write_limit:
+            transport.set_write_buffer_limits(high=self.write_limit)
+        self.board.sp.transport = transport
+
+    def data_received(self, data):
+        self.board._parser.feed(data)
+
+    def pause_writing(self):
+        self.board._writable.clear()
+
+    def resume_writing(self):
+        self.board._writable.set()
+
+    def connection_lost(self, exc):
+        self.board._writable.set()
+        self.board._connection_lost(exc)
+
+
+class Drained(object):
+    # Результат записи: можно не ждать, как у Board, или await - до освобождения буфера
+    def __init__(self, board):
+        self.board = board
+
+    def __await__(self):
+        return self.board.drain().__await__()
+
+
+class AsyncBoard(Board):
+    _flush_handle = None
+
+    def __init__(self, port, layout=None, name=None, events=256):
+        self.name = name or port
+        self._layout = layout
+        self.sp = TransportWriter(port)
+        self.samplerThread = None
+        self._parser = FirmataParser(self._handlers())
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._reported = asyncio.Event()
+        self._capability = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._subscribers = []
+        self.events_size = events
+        self.dropped = 0
+
+    @classmethod
+    async def connect(cls, port, layout=None, baudrate=57600, name=None, timeout=5.0, write_limit=None):
+        import serial_asyncio
+
+        board = cls(port, layout, name)
+        await serial_asyncio.create_serial_connection(
+            asyncio.get_running_loop(), lambda: FirmataProtocol(board, write_limit), port, baudrate=baudrate)
+        await board.start(timeout)
+        return board
+
+    async def start(self, timeout=5.0):
+        # После открытия порта плата перезагружается и сама присылает REPORT_VERSION;
+        # его ждём не дольше timeout вместо фиксированной паузы, потом спрашиваем версию сами
+        self.add_cmd_handler(REPORT_VERSION, self._handle_report_version)
+        self.add_cmd_handler(REPORT_FIRMWARE, self._handle_report_firmware)
+        try:
+            await asyncio.wait_for(self._reported.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.sp.write(bytearray([REPORT_VERSION]))
+            try:
+                await asyncio.wait_for(self._reported.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+        if not self._layout:
+            self.add_cmd_handler(CAPABILITY_RESPONSE, self._handle_report_capability_response)
+            self.send_sysex(CAPABILITY_QUERY, [])
+            try:
+                await asyncio.wait_for(self._capability.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise IOError("Board detection failed.")
+        self.setup_layout(self._layout)
+
+    def samplingOn(self, sample_interval=19):
+        if sample_interval < 1:
+            raise ValueError("Sampling interval less than 1ms")
+        self.setSamplingInterval(sample_interval)
+
+    def samplingOff(self):
+        pass
+
+    async def drain(self):
+        await self._writable.wait()
+        if self.sp.closed:
+            raise IOError("Port {0} is not open".format(self.sp.port))
+
+    def _schedule_flush(self):
+        # Вызывается из _write под блокировкой - значит, в потоке цикла событий
+        if self._flush_handle is None:
+            delay = self._pending_since + self.write_window - time.perf_counter()
+            self._flush_handle = asyncio.get_running_loop().call_later(max(delay, 0), self._window_flush)
+
+    def _window_flush(self):
+        self._flush_handle = None
+        if not self._pending or not self.write_window:
+            return
+        if self._pending_since + self.write_window > time.perf_counter():
+            # Буфер, под который ставился таймер, уже ушёл; у нового окно ещё не истекло
+            self._schedule_flush()
+            return
+        self._timed_flush()
+
+    def set_write_window(self, window):
+        super(AsyncBoard, self).set_write_window(window)
+        if not window and self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def write(self, pin, value):
+        pin.write(value)
+        return Drained(self)
+
+    def servo_config(self, pin, min_pulse=544, max_pulse=2400, angle=0):
+        super(AsyncBoard, self).servo_config(pin, min_pulse, max_pulse, angle)
+        return Drained(self)
+
+    def events(self):
+        # Асинхронный итератор изменений входов: (pin, value). Каждый вызов - своя
+        # очередь; если читатель отстаёт, старые события вытесняются (счётчик dropped)
+        queue = asyncio.Queue(self.events_size)
+        self._subscribers.append(queue)
+        return self._events(queue)
+
+    async def _events(self, queue):
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.remove(queue)
+
+    def _emit(self, event):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    def _handle_analog_message(self, pin_nr, lsb, msb):
+        pin = self.analog[pin_nr] if pin_nr < len(self.analog) else None
+        previous = pin.value if pin else None
+        super(AsyncBoard, self)._handle_analog_message(pin_nr, lsb, msb)
+        if pin.reporting and pin.value != previous:
+            self._emit((pin, pin.value))
+
+    def _handle_digital_message(self, port_nr, lsb, msb):
+        port = self.digital_ports[port_nr] if port_nr < len(self.digital_ports) else None
+        previous = [pin.value for pin in port.pins] if port else None
+        super(AsyncBoard, self)._handle_digital_message(port_nr, lsb, msb)
+        for pin, value in zip(port.pins, previous):
+            if pin.value != value:
+                self._emit((pin, pin.value))
+
+    def _handle_report_version(self, major, minor):
+        super(AsyncBoard, self)._handle_report_version(major, minor)
+        self._reported.set()
+
+    def _handle_report_capability_response(self, *data):
+        super(AsyncBoard, self)._handle_report_capability_response(*data)
+        self._capability.set()
+
+    def _connection_lost(self, exc):
+        self._closed.set()
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def exit(self):
+        if self.sp.closed:
+            return
+        if hasattr(self, "analog"):
+            super(AsyncBoard, self).exit()
+        else:
+            self.sp.close()
+
+    async def close(self):
+        self.exit()
+        await self._closed.wait()
@@ -1,6 +1,10 @@
 from __future__ import division, unicode_literals
 import inspect
+import json
+import os
+import threading
 import time
+from contextlib import contextmanager
 import warnings
 import serial
 import serial.tools.list_ports
@@ -47,6 +51,7 @@ INPUT_PULLUP = 11
 DIGITAL = OUTPUT
 
 BOARD_SETUP_WAIT_TIME = 5
+LAYOUT_CACHE = "board_layouts.json"
 
 class PinAlreadyTakenError(Exception):
     pass
@@ -57,6 +62,79 @@ class InvalidPinDefError(Exception):
 class NoInputWarning(RuntimeWarning):
     pass
 
+class FirmataParser(object):
+    # Потоковый разбор входящих сообщений Firmata: feed() дописывает прочитанное
+    # в буфер и передаёт обработчикам все полные сообщения, неполное остаётся
+    # в буфере до следующего чтения. Байт со старшим битом внутри данных, как в MIDI,
+    # начинает новое сообщение - после потерянного байта поток восстанавливается.
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.buffer = bytearray()
+        self.messages = 0
+        self.skipped = 0
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        handlers = self.handlers
+        size = len(buffer)
+        pos = 0
+        while pos < size:
+            command = buffer[pos]
+            if command == START_SYSEX:
+                end = buffer.find(END_SYSEX, pos + 1)
+                body = buffer[pos + 1:end if end >= 0 else size]
+                if not body.isascii():
+                    pos = self._resync(pos + 1)
+                    continue
+                if end < 0:
+                    break
+                pos = end + 1
+                handler = handlers.get(body[0]) if body else None
+                if handler is None:
+                    self.skipped += 1
+                    continue
+                self._dispatch(handler, body[1:])
+                continue
+            if command < 0x80 or command == END_SYSEX:
+                pos = self._resync(pos)
+                continue
+            if command < START_SYSEX:
+                handler = handlers.get(command & 0xF0)
+                first = (command & 0x0F,)
+            else:
+                handler = handlers.get(command)
+                first = ()
+            if handler is None:
+                pos = self._resync(pos + 1)
+                continue
+            end = pos + 1 + handler.bytes_needed - len(first)
+            args = buffer[pos + 1:end]
+            if not args.isascii():
+                pos = self._resync(pos + 1)
+                continue
+            if end > size:
+                break
+            pos = end
+            self._dispatch(handler, first + tuple(args))
+        del buffer[:pos]
+
+    def _resync(self, pos):
+        # Пропуск байтов данных до следующей команды
+        buffer = self.buffer
+        size = len(buffer)
+        self.skipped += 1
+        while pos < size and buffer[pos] < 0x80:
+            pos += 1
+        return pos
+
+    def _dispatch(self, handler, args):
+        self.messages += 1
+        try:
+            handler(*args)
+        except ValueError:
+            pass
+
 class Board(object):
     firmata_version = None
     firmware = None
@@ -65,9 +143,25 @@ class Board(object):
     _command = None
     _stored_data = []
     _parsing_sysex = False
+    _parser = None
+    _firmware_event = None
+    _capability_event = None
+    layout_cache = None
+    _pending = None
+    _pending_keys = None
+    _pending_since = None
+    _batch_depth = 0
+    _flush_thread = None
+    write_window = None
+    write_calls = 0
+    messages_sent = 0
+    messages_merged = 0
+    flushes = 0
+    flush_latency = 0.0
     AUTODETECT = None
 
-    def __init__(self, port, layout=None, baudrate=57600, name=None, timeout=None, debug=False):
+    def __init__(self, port, layout=None, baudrate=57600, name=None, timeout=None, debug=False,
+                 layout_cache=LAYOUT_CACHE):
         if port == self.AUTODETECT:
             l = serial.tools.list_ports.comports()
             if l:
@@ -97,11 +191,12 @@ class Board(object):
             print("Port=",port)
         self.samplerThread = Iterator(self)
         self.sp = serial.Serial(port, baudrate, timeout=timeout)
-        self.__pass_time(BOARD_SETUP_WAIT_TIME)
         self.name = name
         self._layout = layout
+        self.layout_cache = layout_cache
         if not self.name:
             self.name = port
+        self.wait_for_firmware(BOARD_SETUP_WAIT_TIME)
         if layout:
             self.setup_layout(layout)
         else:
@@ -116,7 +211,107 @@ class Board(object):
         self.exit()
 
     def send_as_two_bytes(self, val):
-        self.sp.write(bytearray([val % 128, val >> 7]))
+        self._write(bytearray([val % 128, val >> 7]))
+
+    # Запись в порт. Вне batch() и без write_window каждое сообщение сразу уходит
+    # отдельным sp.write, как раньше. Внутри batch() (или в окне set_write_window() секунд
+    # после первой записи) сообщения копятся и уходят одним sp.write: для одного и того же
+    # порта или вывода (key) в буфере остаётся только последнее значение. Сообщение без key
+    # (режим вывода, sysex, отчёты) сохраняет порядок: после него запись в тот же вывод
+    # добавляется заново, а не заменяет значение, записанное до него.
+    def _write_lock(self):
+        return self.__dict__.setdefault("_lock", threading.Condition(threading.RLock()))
+
+    def _write(self, msg, key=None):
+        self.messages_sent += 1
+        if not self._batch_depth and not self.write_window:
+            self.write_calls += 1
+            self.sp.write(msg)
+            return
+        lock = self._write_lock()
+        with lock:
+            if self._pending is None:
+                self._pending = []
+                self._pending_keys = {}
+                self._pending_since = time.perf_counter()
+                lock.notify()
+            if key is not None and key in self._pending_keys:
+                self._pending[self._pending_keys[key]] = msg
+                self.messages_merged += 1
+            else:
+                if key is None:
+                    self._pending_keys.clear()
+                else:
+                    self._pending_keys[key] = len(self._pending)
+                self._pending.append(msg)
+            if self.write_window:
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def _flush_loop(self):
+        # Окно write_window: всё, что записано в течение окна после первой записи, уходит вместе
+        lock = self._write_lock()
+        while True:
+            with lock:
+                lock.wait_for(lambda: not self.write_window or (self._pending and not self._batch_depth))
+                if not self.write_window:
+                    self._flush_thread = None
+                    return
+                delay = self._pending_since + self.write_window - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._timed_flush()
+
+    def _timed_flush(self):
+        # Открытый batch() по окну не сбрасывается: его целиком запишет выход из внешнего batch()
+        with self._write_lock():
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        with self._write_lock():
+            pending, self._pending = self._pending, None
+            if not pending:
+                return
+            self.write_calls += 1
+            self.flushes += 1
+            self.flush_latency += time.perf_counter() - self._pending_since
+            self.sp.write(bytearray().join(pending))
+
+    def set_write_window(self, window):
+        # None - писать сразу; иначе секунды, в течение которых записи копятся
+        lock = self._write_lock()
+        with lock:
+            self.write_window = window
+            lock.notify_all()
+        if not window:
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        # with board.batch(): servo_1.write(...); servo_2.write(...) - одна запись в порт
+        with self._write_lock():
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._write_lock():
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def write_stats(self):
+        return {
+            "messages": self.messages_sent,
+            "merged": self.messages_merged,
+            "writes": self.write_calls,
+            "flushes": self.flushes,
+            "flush_latency_ms": round(self.flush_latency / self.flushes * 1000, 3) if self.flushes else None,
+        }
 
     def setup_layout(self, board_layout):
         self.analog = []
@@ -158,17 +353,81 @@ class Board(object):
             self.samplerThread.stop()
             self.samplerThread.join()
 
+    def wait_for_firmware(self, timeout=BOARD_SETUP_WAIT_TIME):
+        # После открытия порта плата перезагружается и сама присылает REPORT_VERSION
+        # и REPORT_FIRMWARE: их ждём не дольше timeout вместо фиксированной паузы.
+        # Если плата не перезагрузилась, версию и прошивку запрашиваем сами
+        self._firmware_event = threading.Event()
+        self.add_cmd_handler(REPORT_VERSION, self._handle_report_version)
+        self.add_cmd_handler(REPORT_FIRMWARE, self._handle_report_firmware)
+        if not self._read_until(self._firmware_event, timeout):
+            self._write(bytearray([REPORT_VERSION]))
+            self.send_sysex(REPORT_FIRMWARE, [])
+            self._read_until(self._firmware_event, 1.0)
+        return self._firmware_event.is_set()
+
+    def _read_until(self, event, timeout):
+        # Чтение ждёт данных в read() не дольше 50 мс - процессор в ожидании не занят
+        deadline = time.monotonic() + timeout
+        saved = self.sp.timeout
+        self.sp.timeout = 0.05
+        try:
+            while not event.is_set() and time.monotonic() < deadline:
+                self.iterate()
+        finally:
+            self.sp.timeout = saved
+        return event.is_set()
+
     def auto_setup(self):
+        # Раскладка, полученная от платы, запоминается в layout_cache по порту и прошивке:
+        # при следующем запуске запрос возможностей не нужен
+        key = self._layout_key()
+        layouts = self._load_layouts()
+        if key in layouts:
+            self._layout = layouts[key]
+            self.setup_layout(self._layout)
+            return
+        self._capability_event = threading.Event()
         self.add_cmd_handler(CAPABILITY_RESPONSE, self._handle_report_capability_response)
         self.send_sysex(CAPABILITY_QUERY, [])
-        self.__pass_time(0.1)
-        while self.bytes_available():
-            self.iterate()
+        self._read_until(self._capability_event, BOARD_SETUP_WAIT_TIME)
         if self._layout:
+            if key:
+                layouts[key] = self._layout
+                self._save_layouts(layouts)
             self.setup_layout(self._layout)
         else:
             raise IOError("Board detection failed.")
 
+    def _layout_key(self):
+        if not self.layout_cache or self.firmware is None:
+            return None
+        return "{0} {1} {2}.{3}".format(self.sp.port, self.firmware, *self.firmware_version)
+
+    def _load_layouts(self):
+        if not self.layout_cache:
+            return {}
+        try:
+            with open(self.layout_cache, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_layouts(self, layouts):
+        try:
+            with open(self.layout_cache + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(layouts, file, ensure_ascii=False, indent=2)
+            os.replace(self.layout_cache + ".tmp", self.layout_cache)
+        except OSError:
+            pass
+
+    def _handlers(self):
+        # Свой словарь обработчиков у каждой платы: словарь класса общий для всех экземпляров,
+        # и со второй платой обработчики первой начинали вызываться для второй
+        if "_command_handlers" not in self.__dict__:
+            self._command_handlers = {}
+        return self._command_handlers
+
     def add_cmd_handler(self, cmd, func):
         len_args = len(inspect.getfullargspec(func)[0])
         def add_meta(f):
@@ -178,7 +437,7 @@ class Board(object):
             decorator.__name__ = f.__name__
             return decorator
         func = add_meta(func)
-        self._command_handlers[cmd] = func
+        self._handlers()[cmd] = func
 
     def get_pin(self, pin_def):
         if type(pin_def) == list:
@@ -217,55 +476,23 @@ class Board(object):
             pin.enable_reporting()
         return pin
 
-    def __pass_time(self, t):
-        cont = time.time() + t
-        while time.time() < cont:
-            time.sleep(0)
-
     def send_sysex(self, sysex_cmd, data):
         msg = bytearray([START_SYSEX, sysex_cmd])
         msg.extend(data)
         msg.append(END_SYSEX)
-        self.sp.write(msg)
+        self._write(msg)
 
     def bytes_available(self):
-        return self.sp.inWaiting()
+        return self.sp.in_waiting
 
     def iterate(self):
-        byte = self.sp.read()
-        if not byte:
-            return
-        data = ord(byte)
-        received_data = []
-        handler = None
-        if data < START_SYSEX:
-            try:
-                handler = self._command_handlers[data & 0xF0]
-            except KeyError:
-                return
-            received_data.append(data & 0x0F)
-            while len(received_data) < handler.bytes_needed:
-                received_data.append(ord(self.sp.read()))
-        elif data == START_SYSEX:
-            data = ord(self.sp.read())
-            handler = self._command_handlers.get(data)
-            if not handler:
-                return
-            data = ord(self.sp.read())
-            while data != END_SYSEX:
-                received_data.append(data)
-                data = ord(self.sp.read())
-        else:
-            try:
-                handler = self._command_handlers[data]
-            except KeyError:
-                return
-            while len(received_data) < handler.bytes_needed:
-                received_data.append(ord(self.sp.read()))
-        try:
-            handler(*received_data)
-        except ValueError:
-            pass
+        # Всё, что накопилось в порту, читается одним вызовом;
+        # если ничего нет - один байт с таймаутом порта, как раньше
+        if self._parser is None:
+            self._parser = FirmataParser(self._handlers())
+        data = self.sp.read(self.bytes_available() or 1)
+        if data:
+            self._parser.feed(data)
 
     def get_firmata_version(self):
         return self.firmata_version
@@ -296,6 +523,7 @@ class Board(object):
                     pin.mode = OUTPUT
         if hasattr(self, 'sp'):
             if self.sp:
+                self.set_write_window(None)
                 self.sp.close()
 
     def _handle_analog_message(self, pin_nr, lsb, msb):
@@ -323,6 +551,8 @@ class Board(object):
         minor = data[1]
         self.firmware_version = (major, minor)
         self.firmware = two_byte_iter_to_str(data[2:])
+        if self._firmware_event is not None:
+            self._firmware_event.set()
 
     def _handle_report_capability_response(self, *data):
         charbuffer = []
@@ -335,6 +565,8 @@ class Board(object):
                 pin_spec_list.append(charbuffer[:])
                 charbuffer = []
         self._layout = pin_list_to_board_dict(pin_spec_list)
+        if self._capability_event is not None:
+            self._capability_event.set()
 
 class Port(object):
     def __init__(self, board, port_number, num_pins=8):
@@ -352,7 +584,7 @@ class Port(object):
     def enable_reporting(self):
         self.reporting = True
         msg = bytearray([REPORT_DIGITAL + self.port_number, 1])
-        self.board.sp.write(msg)
+        self.board._write(msg)
         for pin in self.pins:
             if pin.mode == INPUT or pin.mode == INPUT_PULLUP:
                 pin.reporting = True
@@ -362,7 +594,7 @@ class Port(object):
             return
         self.reporting = False
         msg = bytearray([REPORT_DIGITAL + self.port_number, 0])
-        self.board.sp.write(msg)
+        self.board._write(msg)
 
     def write(self):
         mask = 0
@@ -372,7 +604,7 @@ class Port(object):
                     pin_nr = pin.pin_number - self.port_number * 8
                     mask |= 1 << int(pin_nr)
         msg = bytearray([DIGITAL_MESSAGE + self.port_number, mask % 128, mask >> 7])
-        self.board.sp.write(msg)
+        self.board._write(msg, ("port", self.port_number))
 
     def _update(self, mask):
         if self.reporting:
@@ -415,7 +647,7 @@ class Pin(object):
             self.board.servo_config(self.pin_number)
             return
         self._mode = mode
-        self.board.sp.write(bytearray([SET_PIN_MODE, self.pin_number, mode]))
+        self.board._write(bytearray([SET_PIN_MODE, self.pin_number, mode]))
         if mode == INPUT or mode == INPUT_PULLUP:
             self.enable_reporting()
 
@@ -430,7 +662,7 @@ class Pin(object):
         if self.type == ANALOG:
             self.reporting = True
             msg = bytearray([REPORT_ANALOG + self.pin_number, 1])
-            self.board.sp.write(msg)
+            self.board._write(msg)
         else:
             self.port.enable_reporting()
 
@@ -440,7 +672,7 @@ class Pin(object):
                 return
             self.reporting = False
             msg = bytearray([REPORT_ANALOG + self.pin_number, 0])
-            self.board.sp.write(msg)
+            self.board._write(msg)
         else:
             self.port.disable_reporting()
 
@@ -470,12 +702,12 @@ class Pin(object):
                     self.port.write()
                 else:
                     msg = bytearray([DIGITAL_MESSAGE, self.pin_number, value])
-                    self.board.sp.write(msg)
+                    self.board._write(msg, ("pin", self.pin_number))
             elif self.mode is PWM:
                 value = int(round(value * 255))
                 msg = bytearray([ANALOG_MESSAGE + self.pin_number, value % 128, value >> 7])
-                self.board.sp.write(msg)
+                self.board._write(msg, ("pin", self.pin_number))
             elif self.mode is SERVO:
                 value = int(value)
                 msg = bytearray([ANALOG_MESSAGE + self.pin_number, value % 128, value >> 7])
-                self.board.sp.write(msg)
\ No newline at end of file
+                self.board._write(msg, ("pin", self.pin_number))
\ No newline at end of file
@@ -10,12 +10,8 @@ class MockupSerial(deque):
 
     def read(self, count=1):
         if count > 1:
-            val = []
-            for i in range(count):
-                try:
-                    val.append(self.popleft())
-                except IndexError:
-                    break
+            count = min(count, len(self))
+            return bytearray(self.popleft() for _ in range(count))
         else:
             try:
                 val = self.popleft()
@@ -39,11 +35,17 @@ class MockupSerial(deque):
     def inWaiting(self):
         return len(self)
 
+    @property
+    def in_waiting(self):
+        return len(self)
+
 
-class MockupBoard(pyfirmata2.Board):
+class MockupBoard(Board):
 
     def __init__(self, port, layout, values_dict={}):
-        super().__init__(port, layout)
+        # Board.__init__ не вызывается: он открывает настоящий порт и ждёт плату
+        self.name = port
+        self._layout = layout
         self.sp = MockupSerial(port, 57600)
         self.setup_layout(layout)
         self.values_dict = values_dict
@@ -64,7 +66,7 @@ class MockupBoard(pyfirmata2.Board):
             pin.values_dict = self.values_dict
 
 
-class MockupPort(pyfirmata2.Port):
+class MockupPort(Port):
     def __init__(self, board, port_number):
         super().__init__(board, port_number)
         self.board = board
@@ -74,14 +76,14 @@ class MockupPort(pyfirmata2.Port):
         self.pins = []
         for i in range(8):
             pin_nr = i + self.port_number * 8
-            self.pins.append(MockupPin(self.board, pin_nr, type=pyfirmata2.DIGITAL, port=self))
+            self.pins.append(MockupPin(self.board, pin_nr, type=DIGITAL, port=self))
 
     def update_values_dict(self):
         for pin in self.pins:
             pin.values_dict = self.values_dict
 
 
-class MockupPin(pyfirmata2.Pin):
+class MockupPin(Pin):
     def __init__(self, *args, **kwargs):
         self.is_active = None
         self.values_dict = kwargs.get('values_dict', {})
@@ -114,9 +116,9 @@ class MockupPin(pyfirmata2.Pin):
         return self.is_active
 
     def write(self, value):
-        if self.mode == pyfirmata2.UNAVAILABLE:
+        if self.mode == UNAVAILABLE:
             raise IOError("Cannot read from pin {0}".format(self.pin_number))
-        if self.mode == pyfirmata2.INPUT:
+        if self.mode == INPUT:
             raise IOError("{0} pin {1} is not an output"
                           .format(self.port and "Digital" or "Analog", self.get_pin_number()))
         if not self.port:
@@ -1,6 +1,7 @@
 from __future__ import division, unicode_literals
 
 import os
+import select
 import sys
 import threading
 import time
@@ -29,20 +30,69 @@ def get_the_board(layout=BOARDS["arduino"], base_dir="/dev/", identifier="tty.us
 
 
 class Iterator(threading.Thread):
-    def __init__(self, board):
+    # Поток чтения платы спит, пока в порт ничего не пришло:
+    # - Linux/macOS: select по дескриптору порта и self-pipe для остановки;
+    # - Windows: блокирующее чтение, stop() прерывает его через cancel_read();
+    # - порт без того и другого (заглушки): опрос раз в 1 мс, как раньше.
+    def __init__(self, board, timeout=1.0):
         super(Iterator, self).__init__()
         self.board = board
         self.daemon = True
         self.running = False
+        self.timeout = timeout
+        self._wake_r = self._wake_w = None
+
+    def _mode(self):
+        sp = self.board.sp
+        if os.name != "nt":
+            try:
+                sp.fileno()
+                return "select"
+            except (AttributeError, serial.SerialException, ValueError, OSError):
+                pass
+        if hasattr(sp, "cancel_read"):
+            return "blocking"
+        return "poll"
+
+    def start(self):
+        self.mode = self._mode()
+        if self.mode == "select":
+            self._wake_r, self._wake_w = os.pipe()
+        super(Iterator, self).start()
+
+    def _wait(self):
+        # True - в порту есть данные
+        if self.mode == "select":
+            ready, _, _ = select.select([self.board.sp.fileno(), self._wake_r], [], [], self.timeout)
+            return self.board.sp.fileno() in ready and self.running
+        if self.mode == "blocking":
+            # iterate() сам ждёт первый байт в read()
+            return True
+        if self.board.bytes_available():
+            return True
+        time.sleep(0.001)
+        return False
 
     def run(self):
         self.running = True
+        try:
+            self._run()
+        finally:
+            fds = (self._wake_r, self._wake_w)
+            self._wake_r = self._wake_w = None
+            for fd in fds:
+                if fd is not None:
+                    os.close(fd)
+
+    def _run(self):
         while self.running:
             try:
+                if not self._wait():
+                    continue
+                self.board.iterate()
                 while self.board.bytes_available():
                     self.board.iterate()
-                time.sleep(0.001)
-            except (AttributeError, serial.SerialException, OSError):
+            except (AttributeError, serial.SerialException, OSError, ValueError):
                 break
             except Exception as e:
                 if getattr(e, 'errno', None) == 9:
@@ -58,6 +108,42 @@ class Iterator(threading.Thread):
 
     def stop(self):
         self.running = False
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                pass
+        elif getattr(self, "mode", None) == "blocking":
+            self.board.sp.cancel_read()
+
+
+class BoardStarter(threading.Thread):
+    # Подключение к плате в фоновом потоке: программа (веб-сервер) работает сразу,
+    # а код, которому нужна плата, ждёт её в wait(). factory создаёт плату и возвращает
+    # то, что нужно этому коду: плату или плату вместе с выводами.
+    def __init__(self, factory):
+        super(BoardStarter, self).__init__()
+        self.factory = factory
+        self.daemon = True
+        self.result = None
+        self.error = None
+        self.ready = threading.Event()
+        self.start()
+
+    def run(self):
+        try:
+            self.result = self.factory()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+    def wait(self, timeout=None):
+        if not self.ready.wait(timeout):
+            raise IOError("Board is not connected yet")
+        if self.error is not None:
+            raise IOError("Board connection failed: {0}".format(self.error))
+        return self.result
 
 
 def to_two_bytes(integer):
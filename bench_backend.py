@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from bench_placement import percentile
+from vision_backend import load_backend, export_onnx, quantize_onnx
+from vision_source import IMAGE_EXTENSIONS
+from vision_track import iou
+
+# Экспорт детектора в ONNX (и INT8), сверка с PyTorch-моделью и замер задержек на CPU.
+# Пример: python bench_backend.py --weights yolov8n_custom_for_box.pt --images frames/ --int8
+
+
+def load_images(path, limit):
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    return [cv2.imread(os.path.join(path, name)) for name in names]
+
+
+def compare(reference, predictions, threshold=0.5):
+    # Доля рамок эталона, найденных тем же классом с IoU >= threshold, и средний IoU совпавших
+    matched = total = found = 0
+    overlaps, confidence_diff = [], []
+    for expected, actual in zip(reference, predictions):
+        total += len(expected.xyxy)
+        found += len(actual.xyxy)
+        used = set()
+        for i in np.argsort(-expected.confidence):
+            best, best_j = 0.0, None
+            for j in range(len(actual.xyxy)):
+                if j in used or actual.class_id[j] != expected.class_id[i]:
+                    continue
+                overlap = iou(expected.xyxy[i], actual.xyxy[j])
+                if overlap > best:
+                    best, best_j = overlap, j
+            if best_j is not None and best >= threshold:
+                used.add(best_j)
+                matched += 1
+                overlaps.append(best)
+                confidence_diff.append(abs(float(expected.confidence[i]) - float(actual.confidence[best_j])))
+    return {
+        "recall": round(matched / total, 4) if total else None,
+        "precision": round(matched / found, 4) if found else None,
+        "mean_iou": round(float(np.mean(overlaps)), 4) if overlaps else None,
+        "max_confidence_diff": round(max(confidence_diff), 4) if confidence_diff else None,
+    }
+
+
+def startup_time(path, engine):
+    # Отдельный процесс: импорт, загрузка модели и первый кадр, как при перезапуске скрипта
+    code = ("import numpy as np; from vision_backend import load_backend; "
+            f"load_backend({path!r}, {engine!r}).predict([np.zeros((480, 640, 3), np.uint8)])")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - start
+
+
+def measure(backend, images, repeat):
+    for image in images[:3]:
+        backend.predict([image])
+    timings, predictions = [], []
+    for _ in range(repeat):
+        predictions = []
+        for image in images:
+            start = time.perf_counter()
+            predictions.extend(backend.predict([image]))
+            timings.append(time.perf_counter() - start)
+    return predictions, {name: round(percentile(timings, p) * 1000, 2)
+                         for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение бэкендов детектора коробок на CPU")
+    parser.add_argument("--weights", default="yolov8n_custom_for_box.pt")
+    parser.add_argument("--images", required=True, help="каталог кадров с ленты")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--int8", action="store_true", help="добавить INT8-модель")
+    parser.add_argument("--calibrate", type=int, default=0,
+                        help="кадров для статической INT8-квантизации (0 - динамическая)")
+    parser.add_argument("--conf", type=float, default=0.25, help="порог уверенности для всех бэкендов")
+    parser.add_argument("--output", default="bench_backend.json")
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    onnx_path = export_onnx(args.weights)
+    variants = [("torch", args.weights, None), ("onnxruntime", onnx_path, "onnxruntime"),
+                ("opencv", onnx_path, "opencv")]
+    if args.int8:
+        int8_path = quantize_onnx(onnx_path, images[:args.calibrate] if args.calibrate else None)
+        variants.append(("onnxruntime-int8", int8_path, "onnxruntime"))
+
+    results = []
+    reference = None
+    print(f"{'бэкенд':>17} {'запуск, с':>10} {'p50, мс':>8} {'p90, мс':>8} {'полнота':>8} {'точность':>9} {'IoU':>6}")
+    for name, path, engine in variants:
+        predictions, latency = measure(load_backend(path, engine, args.conf), images, args.repeat)
+        if reference is None:
+            reference = predictions
+        parity = compare(reference, predictions)
+        result = {"backend": name, "model": path, "startup_s": round(startup_time(path, engine), 2),
+                  "latency_ms": latency, "parity": parity}
+        results.append(result)
+        print(f"{name:>17} {result['startup_s']:>10} {latency['p50']:>8} {latency['p90']:>8} "
+              f"{parity['recall']!s:>8} {parity['precision']!s:>9} {parity['mean_iou']!s:>6}")
+
+    report = {"weights": args.weights, "images": len(images), "python": platform.python_version(),
+              "machine": platform.machine(), "threads": os.cpu_count(), "results": results}
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
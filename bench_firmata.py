@@ -0,0 +1,564 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import select
+import tempfile
+import threading
+import time
+
+import serial
+
+from ALRU_Arduino_control.control_arduino_alru import BOARDS, AsyncBoard, Board, BoardStarter
+from ALRU_Arduino_control.control_arduino_alru.control_alru import (
+    ANALOG_MESSAGE, DIGITAL_MESSAGE, START_SYSEX, END_SYSEX, REPORT_VERSION, REPORT_FIRMWARE, STRING_DATA,
+    INPUT, SERVO_CONFIG, CAPABILITY_QUERY, CAPABILITY_RESPONSE, BOARD_SETUP_WAIT_TIME)
+from ALRU_Arduino_control.control_arduino_alru.mockup_alru import MockupBoard, MockupSerial
+from ALRU_Arduino_control.control_arduino_alru.util import Iterator
+from bench_placement import percentile
+
+# Разбор входящего потока Firmata: прежний Board.iterate (байт за вызов read)
+# против буферизованного FirmataParser на MockupSerial.
+# Поток чтения: прежний Iterator (опрос раз в 1 мс) против ожидания данных в select
+# на псевдотерминале (только Linux/macOS).
+# AsyncBoard: несколько плат на псевдотерминалах в одном цикле asyncio без потоков.
+# Запись: команды run_app (две сервы, восемь выходов одного порта) по отдельности
+# против board.batch() и окна write_window на псевдотерминале.
+# Запуск Board: прежняя пауза в 5 с на time.sleep(0) против ожидания отчёта прошивки,
+# с запросом возможностей и с раскладкой из кэша.
+# Пример: python bench_firmata.py --messages 200000 --read-cost-us 20 --iterator --async-boards 2 --writes --startup
+
+
+def legacy_iterate(board):
+    # Board.iterate до FirmataParser: один read() и ord() на каждый байт
+    byte = board.sp.read()
+    if not byte:
+        return
+    data = ord(byte)
+    received_data = []
+    if data < START_SYSEX:
+        try:
+            handler = board._command_handlers[data & 0xF0]
+        except KeyError:
+            return
+        received_data.append(data & 0x0F)
+        while len(received_data) < handler.bytes_needed:
+            received_data.append(ord(board.sp.read()))
+    elif data == START_SYSEX:
+        data = ord(board.sp.read())
+        handler = board._command_handlers.get(data)
+        if not handler:
+            return
+        data = ord(board.sp.read())
+        while data != END_SYSEX:
+            received_data.append(data)
+            data = ord(board.sp.read())
+    else:
+        try:
+            handler = board._command_handlers[data]
+        except KeyError:
+            return
+        while len(received_data) < handler.bytes_needed:
+            received_data.append(ord(board.sp.read()))
+    try:
+        handler(*received_data)
+    except ValueError:
+        pass
+
+
+class StreamSerial(MockupSerial):
+    # Порт, в который поток приходит кусками по chunk байт: следующий кусок
+    # появляется, когда прочитан предыдущий (как если бы чтение ждало данных).
+    # Каждый вызов read стоит cost секунд процессора, как системный вызов настоящего порта.
+    def __init__(self, stream, chunk=None, cost=0.0):
+        super().__init__("bench", 57600)
+        self.stream = stream
+        self.chunk = chunk or len(stream)
+        self.position = 0
+        self.cost = cost
+        self.reads = 0
+
+    def _arrive(self):
+        if not len(self) and self.position < len(self.stream):
+            self.extend(self.stream[self.position:self.position + self.chunk])
+            self.position += self.chunk
+
+    def read(self, count=1):
+        self.reads += 1
+        if self.cost:
+            end = time.perf_counter() + self.cost
+            while time.perf_counter() < end:
+                pass
+        self._arrive()
+        return super().read(count)
+
+    @property
+    def in_waiting(self):
+        self._arrive()
+        return len(self)
+
+
+def make_stream(messages, seed=0):
+    # Все 6 аналоговых входов и 2 цифровых порта, изредка строка SysEx от скетча
+    rng = random.Random(seed)
+    stream = bytearray([REPORT_VERSION, 2, 5])
+    for n in range(messages):
+        kind = rng.random()
+        if kind < 0.85:
+            value = rng.randrange(1024)
+            stream += bytes([ANALOG_MESSAGE + rng.randrange(6), value & 0x7F, value >> 7])
+        elif kind < 0.995:
+            mask = rng.randrange(256)
+            stream += bytes([DIGITAL_MESSAGE + rng.randrange(2), mask & 0x7F, mask >> 7])
+        else:
+            text = f"t={n}".encode()
+            stream += bytes([START_SYSEX, STRING_DATA]) + bytes(b for c in text for b in (c, 0)) + bytes([END_SYSEX])
+    stream += bytes([START_SYSEX, REPORT_FIRMWARE, 2, 5, ord("a"), 0, END_SYSEX])
+    return stream
+
+
+def make_board(stream, chunk=None, cost=0.0):
+    board = MockupBoard("bench", BOARDS["arduino"])
+    board.sp = StreamSerial(stream, chunk, cost)
+    board.received = []
+    board.add_cmd_handler(STRING_DATA, lambda *data: board.received.append(("string", data)))
+    for pin in board.analog:
+        pin.reporting = True
+        pin.register_callback(lambda value, nr=pin.pin_number: board.received.append(("a", nr, value)))
+    for port in board.digital_ports:
+        port.reporting = True
+        for pin in port.pins:
+            pin._mode = INPUT
+            pin.register_callback(lambda value, nr=pin.pin_number: board.received.append(("d", nr, value)))
+    return board
+
+
+def drain(board, iterate):
+    start = time.process_time()
+    while board.bytes_available():
+        iterate(board)
+    return time.process_time() - start
+
+
+def check_parser(stream, chunks=(1, 2, 3, 7, 64, 4096)):
+    # Поток, разрезанный на куски любой длины, даёт те же вызовы обработчиков
+    reference = make_board(stream)
+    drain(reference, legacy_iterate)
+    ok = True
+    for chunk in chunks:
+        board = make_board(stream, chunk)
+        drain(board, lambda b: b.iterate())
+        same = board.received == reference.received and board.firmware == reference.firmware
+        ok = ok and same
+        print(f"  куски по {chunk:>4} байт: {'совпадает' if same else 'РАСХОЖДЕНИЕ'}")
+    return ok
+
+
+class LegacyIterator(threading.Thread):
+    # Iterator.run до ожидания по дескриптору
+    def __init__(self, board):
+        super().__init__(daemon=True)
+        self.board = board
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                while self.board.bytes_available():
+                    self.board.iterate()
+                time.sleep(0.001)
+            except (AttributeError, serial.SerialException, OSError):
+                break
+
+    def stop(self):
+        self.running = False
+
+
+def benchmark_iterator(idle=2.0, messages=300, interval=0.01):
+    # Плата - псевдотерминал: сообщения пишутся в master, Board читает slave через pyserial
+    results = []
+    print(f"{'поток':>9} {'CPU в простое, %':>17} {'задержка p50, мс':>17} {'p99, мс':>8} {'макс., мс':>10} "
+          f"{'остановка, мс':>14}")
+    for name, make in (("опрос", LegacyIterator), ("select", Iterator)):
+        master, slave = os.openpty()
+        board = MockupBoard("pty", BOARDS["arduino"])
+        board.sp = serial.Serial(os.ttyname(slave), 57600, timeout=None)
+        received = []
+        board.analog[0].reporting = True
+        board.analog[0].register_callback(lambda value: received.append(time.perf_counter()))
+        thread = make(board)
+        thread.start()
+
+        cpu = time.process_time()
+        time.sleep(idle)
+        idle_cpu = (time.process_time() - cpu) / idle
+
+        sent = []
+        for n in range(messages):
+            value = n % 1024
+            sent.append(time.perf_counter())
+            os.write(master, bytes([ANALOG_MESSAGE, value & 0x7F, value >> 7]))
+            time.sleep(interval)
+        time.sleep(0.1)
+        latency = [received[n] - sent[n] for n in range(min(len(sent), len(received)))]
+
+        start = time.perf_counter()
+        thread.stop()
+        thread.join()
+        stop_ms = (time.perf_counter() - start) * 1000
+        board.exit()
+        os.close(master)
+        os.close(slave)
+
+        result = {"iterator": name, "idle_cpu": round(idle_cpu, 4), "received": len(received),
+                  "latency_ms": {p: round(percentile(latency, value) * 1000, 3)
+                                 for p, value in (("p50", 50), ("p99", 99), ("max", 100))},
+                  "stop_ms": round(stop_ms, 2)}
+        results.append(result)
+        print(f"{name:>9} {idle_cpu * 100:17.2f} {result['latency_ms']['p50']:17.3f} "
+              f"{result['latency_ms']['p99']:8.3f} {result['latency_ms']['max']:10.3f} {stop_ms:14.2f}")
+    return results
+
+
+class FakeFirmware:
+    # Прошивка на стороне master псевдотерминала: присылает версию, отвечает
+    # на запрос версии, шлёт значение A0 каждые interval секунд и запоминает команды
+    def __init__(self, interval=0.005):
+        self.master, self.slave = os.openpty()
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.interval = interval
+        self.received = bytearray()
+        self.sent = 0
+
+    def _read(self):
+        try:
+            data = os.read(self.master, 4096)
+        except BlockingIOError:
+            return
+        self.received += data
+        if REPORT_VERSION in data:
+            os.write(self.master, bytes([REPORT_VERSION, 2, 5]))
+
+    async def run(self, samples):
+        asyncio.get_running_loop().add_reader(self.master, self._read)
+        await asyncio.sleep(0.05)
+        os.write(self.master, bytes([REPORT_VERSION, 2, 5]))
+        for n in range(samples):
+            await asyncio.sleep(self.interval)
+            value = (n * 7) % 1024
+            os.write(self.master, bytes([ANALOG_MESSAGE, value & 0x7F, value >> 7]))
+            self.sent += 1
+
+    def close(self):
+        asyncio.get_running_loop().remove_reader(self.master)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class BootingFirmware(threading.Thread):
+    # Uno на стороне master псевдотерминала: через boot секунд после старта
+    # присылает версию и прошивку, на запрос возможностей отвечает раскладкой Uno
+    def __init__(self, boot=1.5):
+        super().__init__(daemon=True)
+        self.master, self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.boot = boot
+        self.queries = 0
+        self.running = True
+        self.start()
+
+    def capability(self):
+        data = bytearray([START_SYSEX, CAPABILITY_RESPONSE])
+        for pin in range(20):
+            if pin >= 2:
+                data += bytes([0, 1, 1, 1])
+            if pin in BOARDS["arduino"]["pwm"]:
+                data += bytes([3, 8])
+            if 2 <= pin < 14:
+                data += bytes([4, 14])
+            if pin >= 14:
+                data += bytes([2, 10])
+            data.append(0x7F)
+        data.append(END_SYSEX)
+        return data
+
+    def run(self):
+        booted = time.perf_counter() + self.boot
+        received = bytearray()
+        while self.running:
+            if booted and time.perf_counter() >= booted:
+                booted = None
+                os.write(self.master, bytes([REPORT_VERSION, 2, 5, START_SYSEX, REPORT_FIRMWARE, 2, 5])
+                         + "Firmata.ino".encode("utf-16-le") + bytes([END_SYSEX]))
+            ready, _, _ = select.select([self.master], [], [], 0.01)
+            if not ready:
+                continue
+            received += os.read(self.master, 4096)
+            query = bytes([START_SYSEX, CAPABILITY_QUERY, END_SYSEX])
+            while query in received:
+                del received[:received.index(query) + len(query)]
+                self.queries += 1
+                os.write(self.master, self.capability())
+
+    def close(self):
+        self.running = False
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def legacy_pass_time(t):
+    # Board.__pass_time до ожидания отчёта прошивки
+    cont = time.time() + t
+    while time.time() < cont:
+        time.sleep(0)
+
+
+def benchmark_startup(boot=1.5):
+    results = []
+    print(f"{'запуск':>22} {'время, с':>9} {'CPU, с':>7} {'запросов возможностей':>22}")
+
+    def report(name, wall, cpu, queries=None, layout=None):
+        result = {"startup": name, "wall_s": round(wall, 3), "cpu_s": round(cpu, 3), "capability_queries": queries,
+                  "layout_ok": layout}
+        results.append(result)
+        print(f"{name:>22} {wall:9.2f} {cpu:7.2f} {'' if queries is None else queries:>22}")
+
+    begin, cpu = time.perf_counter(), time.process_time()
+    legacy_pass_time(BOARD_SETUP_WAIT_TIME + 0.1)
+    report("пауза 5 с (прежний)", time.perf_counter() - begin, time.process_time() - cpu)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, "board_layouts.json")
+        for name, layout in (("раскладка BOARDS", BOARDS["arduino"]), ("запрос возможностей", None),
+                             ("раскладка из кэша", None)):
+            firmware = BootingFirmware(boot)
+            begin, cpu = time.perf_counter(), time.process_time()
+            board = Board(firmware.port, layout, layout_cache=cache)
+            wall, cpu = time.perf_counter() - begin, time.process_time() - cpu
+            ok = (len(board.digital), len(board.analog), board.firmware) == (14, 6, "Firmata.ino")
+            board.exit()
+            firmware.close()
+            report(name, wall, cpu, firmware.queries, ok)
+
+        # Фоновое подключение: сколько ждёт программа до следующей строки и когда плата готова
+        firmware = BootingFirmware(boot)
+        begin = time.perf_counter()
+        starter = BoardStarter(lambda: Board(firmware.port, BOARDS["arduino"], layout_cache=cache))
+        returned = time.perf_counter() - begin
+        board = starter.wait(BOARD_SETUP_WAIT_TIME + 2)
+        ready = time.perf_counter() - begin
+        board.exit()
+        firmware.close()
+        print(f"  BoardStarter: возврат через {returned * 1000:.2f} мс, плата готова через {ready:.2f} с")
+        results.append({"startup": "BoardStarter", "returned_ms": round(returned * 1000, 2),
+                        "ready_s": round(ready, 3)})
+    return results
+
+
+def receive(master, count):
+    data = bytearray()
+    while len(data) < count:
+        data += os.read(master, count - len(data))
+    return data
+
+
+def check_batch_window(batches=30, window=0.001):
+    # Окно записи открыто записью до batch() и истекает посреди batch():
+    # две сервы всё равно уходят одной записью вместе с ней
+    board = MockupBoard("bench", BOARDS["arduino"])
+    servo_1 = board.get_pin("d:8:s")
+    servo_2 = board.get_pin("d:9:s")
+    led = board.get_pin("d:4:o")
+    board.set_write_window(window)
+    ok = True
+    for n in range(batches):
+        time.sleep(window * 3)
+        led.write(n % 2)
+        time.sleep(window / 2)
+        with board.batch():
+            # Запись до batch() могла уйти по окну раньше - считаем только записи с открытия batch()
+            calls = board.write_calls
+            servo_1.write(20 + n)
+            time.sleep(window * 3)
+            servo_2.write(100 + n)
+            if board.write_calls != calls:
+                ok = False
+        if board.write_calls - calls != 1:
+            ok = False
+    board.set_write_window(None)
+    print(f"batch() при окне записи {window * 1000:.0f} мс: {'одна запись' if ok else 'запись разорвана'}")
+    return ok
+
+
+def benchmark_writes(commands=300, window=0.002, baudrate=57600):
+    # Команда: две сервы, как send_servo_command, и восемь выходов порта 0 (шаг анимации).
+    # Задержка - от начала команды до прихода последнего байта на другой конец
+    # псевдотерминала; "по линии" - сколько те же байты идут по UART на baudrate
+    results = []
+    print(f"{'запись':>9} {'sp.write':>9} {'байт':>7} {'на команду, мкс':>16} {'до платы p50, мкс':>18} "
+          f"{'p99, мкс':>9} {'по линии, мс':>13}")
+    for mode in ("сразу", "batch", "окно"):
+        master, slave = os.openpty()
+        board = MockupBoard("pty", BOARDS["arduino"])
+        board.sp = serial.Serial(os.ttyname(slave), baudrate, timeout=None)
+        servo_1 = board.get_pin("d:8:s")
+        servo_2 = board.get_pin("d:9:s")
+        leds = [board.get_pin(f"d:{pin}:o") for pin in range(2, 8)]
+        time.sleep(0.05)
+        os.read(master, 4096)
+        if mode == "окно":
+            board.set_write_window(window)
+        calls = board.write_calls
+        total = 0
+        host = []
+        latency = []
+        for n in range(commands):
+            begin = time.perf_counter()
+            if mode == "batch":
+                with board.batch():
+                    servo_1.write(20 + n % 70)
+                    servo_2.write(1 + n % 179)
+                    for pin, led in enumerate(leds):
+                        led.write((n + pin) % 2)
+            else:
+                servo_1.write(20 + n % 70)
+                servo_2.write(1 + n % 179)
+                for pin, led in enumerate(leds):
+                    led.write((n + pin) % 2)
+            host.append(time.perf_counter() - begin)
+            # Каждый шаг меняет все значения: 2 сервы и 6 сообщений порта, после слияния - одно
+            data = receive(master, 3 * (2 + (len(leds) if mode == "сразу" else 1)))
+            latency.append(time.perf_counter() - begin)
+            total += len(data)
+        writes = board.write_calls - calls
+        board.exit()
+        os.close(master)
+        os.close(slave)
+
+        wire = total * 10 / baudrate / commands
+        result = {"mode": mode, "commands": commands, "writes": writes, "bytes": total,
+                  "host_us": round(percentile(host, 50) * 1e6, 1),
+                  "latency_us": {p: round(percentile(latency, value) * 1e6, 1) for p, value in (("p50", 50), ("p99", 99))},
+                  "wire_ms": round(wire * 1000, 3)}
+        results.append(result)
+        print(f"{mode:>9} {writes:>9} {total:>7} {result['host_us']:16.1f} {result['latency_us']['p50']:18.1f} "
+              f"{result['latency_us']['p99']:9.1f} {result['wire_ms']:13.3f}")
+    return results
+
+
+async def check_async_boards(count=2, samples=200):
+    threads = threading.active_count()
+    firmwares = [FakeFirmware() for _ in range(count)]
+    feeders = [asyncio.create_task(firmware.run(samples)) for firmware in firmwares]
+    start = time.perf_counter()
+    boards = await asyncio.gather(*(AsyncBoard.connect(firmware.port, BOARDS["arduino"], timeout=1.0)
+                                    for firmware in firmwares))
+    startup = time.perf_counter() - start
+
+    async def listen(board):
+        events = 0
+        async for pin, value in board.events():
+            events += 1
+        return events
+
+    listeners = [asyncio.create_task(listen(board)) for board in boards]
+    write_latency = []
+    servos = []
+    for board in boards:
+        board.get_pin("a:0:i")
+        servos.append(board.get_pin("d:9:s"))
+    for board, servo in zip(boards, servos):
+        await board.servo_config(9)
+        for angle in range(0, 181, 10):
+            begin = time.perf_counter()
+            await board.write(servo, angle)
+            write_latency.append(time.perf_counter() - begin)
+            await asyncio.sleep(0.01)
+    # Окно записи сбрасывается таймером цикла событий, без потока Board
+    window_ok = True
+    for board, servo in zip(boards, servos):
+        servo_2 = board.get_pin("d:10:s")
+        board.set_write_window(0.005)
+        writes = board.sp.writes
+        board.write(servo, 45)
+        board.write(servo_2, 135)
+        window_threads = threading.active_count()
+        await asyncio.sleep(0.02)
+        window_ok = window_ok and board.sp.writes - writes == 1 and window_threads == threads
+        board.set_write_window(None)
+    await asyncio.gather(*feeders)
+    await asyncio.sleep(0.05)
+    for board in boards:
+        await board.close()
+    events = await asyncio.gather(*listeners)
+
+    ok = True
+    print(f"Платы на asyncio: {count}, запуск {startup * 1000:.0f} мс, потоков добавилось "
+          f"{threading.active_count() - threads}")
+    for board, firmware, received in zip(boards, firmwares, events):
+        servo_ok = firmware.received.count(bytes([START_SYSEX, SERVO_CONFIG, 9])) >= 1 \
+            and firmware.received.count(bytes([ANALOG_MESSAGE + 9, 180 & 0x7F, 180 >> 7])) == 1
+        ok = ok and servo_ok and window_ok and received > 0 and board.firmata_version == (2, 5)
+        print(f"  {firmware.port}: событий {received} из {firmware.sent}, версия {board.firmata_version}, "
+              f"записей {board.sp.writes}, серво {'ok' if servo_ok else 'НЕТ'}")
+        firmware.close()
+    print(f"  окно записи: {'одна запись из цикла событий' if window_ok else 'НЕТ'}")
+    print(f"  await write: p50 {percentile(write_latency, 50) * 1e6:.0f} мкс, "
+          f"макс. {max(write_latency) * 1e6:.0f} мкс")
+    return {"boards": count, "startup_ms": round(startup * 1000, 1), "events": events, "ok": ok,
+            "extra_threads": threading.active_count() - threads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность разбора потока Firmata")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--read-cost-us", type=float, nargs="+", default=[0.0, 20.0],
+                        help="стоимость одного вызова read, мкс (0 - только разбор)")
+    parser.add_argument("--chunk", type=int, default=64, help="байтов приходит между вызовами iterate")
+    parser.add_argument("--iterator", action="store_true", help="сравнить потоки чтения на псевдотерминале")
+    parser.add_argument("--async-boards", type=int, default=0, help="проверить AsyncBoard на стольких платах")
+    parser.add_argument("--writes", action="store_true", help="сравнить запись по одному сообщению и пакетами")
+    parser.add_argument("--startup", action="store_true", help="сравнить запуск Board на псевдотерминале")
+    parser.add_argument("--output", default="bench_firmata.json")
+    args = parser.parse_args()
+
+    stream = make_stream(args.messages)
+    print("Проверка разбора:")
+    ok = check_parser(make_stream(5000, seed=1))
+    ok = check_batch_window() and ok
+
+    results = []
+    print(f"{'разбор':>9} {'read, мкс':>10} {'вызовов read':>13} {'CPU, с':>8} {'байт/с':>11} {'сообщ./с':>10}")
+    for cost in args.read_cost_us:
+        for name, iterate in (("побайтно", legacy_iterate), ("буфер", lambda b: b.iterate())):
+            board = make_board(stream, args.chunk, cost / 1e6)
+            cpu = drain(board, iterate)
+            result = {"parser": name, "read_cost_us": cost, "reads": board.sp.reads, "cpu_s": round(cpu, 3),
+                      "bytes_per_s": round(len(stream) / cpu), "messages_per_s": round(args.messages / cpu)}
+            results.append(result)
+            print(f"{name:>9} {cost:>10} {board.sp.reads:>13} {cpu:8.2f} {result['bytes_per_s']:>11} "
+                  f"{result['messages_per_s']:>10}")
+    print("Результаты совпадают." if ok else "Найдены расхождения!")
+
+    report = {"messages": args.messages, "bytes": len(stream), "chunk": args.chunk, "parity": ok,
+              "python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.iterator:
+        report["iterator"] = benchmark_iterator()
+    if args.writes:
+        report["writes"] = benchmark_writes()
+    if args.startup:
+        report["startup"] = benchmark_startup()
+    if args.async_boards:
+        report["async"] = asyncio.run(check_async_boards(args.async_boards))
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import platform
+import random
+import time
+
+import wall_logick
+import wall_numpy
+from wall_field import Field
+from wall_cache import placement_cache
+
+# Воспроизводимый прогон размещения: для каждого размера поля, движка и вида
+# потока коробок поле заполняется до упора, а в JSON пишутся задержки одного
+# размещения, время до заполнения, доля занятых клеток и число отказов.
+# Пример: python bench_placement.py --sizes 8x12 40x60 --boxes 500 --output bench.json
+
+ENGINES = {
+    # исходный перебор по спискам (как process_input до Field)
+    "list": lambda cells: (cells, wall_logick.search_best_placement),
+    # Field с индексами и кэшем решений (process_input)
+    "field": lambda cells: (Field(cells), wall_logick.find_best_placement),
+    # векторная оценка всех позиций
+    "numpy": lambda cells: (cells, wall_numpy.find_best_placement),
+    # оценка с приоритетом вертикальной ориентации (get_wall)
+    "vertical": lambda cells: (Field(cells), wall_logick.find_best_placement_vertical_first),
+}
+
+
+def uniform_stream(width, height, rng):
+    max_width, max_height = max(1, width // 3), max(1, height // 3)
+    while True:
+        yield rng.randint(1, max_width), rng.randint(1, max_height)
+
+
+def zipf_stream(width, height, rng, kinds=20, exponent=1.2):
+    # Каталог типов коробок, частота типа убывает как 1/rank^exponent
+    max_width, max_height = max(1, width // 3), max(1, height // 3)
+    catalog = [(rng.randint(1, max_width), rng.randint(1, max_height)) for _ in range(kinds)]
+    weights = [1 / rank ** exponent for rank in range(1, kinds + 1)]
+    while True:
+        yield rng.choices(catalog, weights)[0]
+
+
+def adversarial_stream(width, height, rng):
+    # Длинные тонкие коробки вперемешку с коробками почти в половину поля:
+    # поле быстро дробится, и большие коробки начинают получать отказы
+    while True:
+        kind = rng.randrange(3)
+        if kind == 0:
+            yield 1, rng.randint(max(1, height // 2), height)
+        elif kind == 1:
+            yield rng.randint(max(1, width // 2), width), 1
+        else:
+            yield max(1, width // 2 + rng.randint(0, 1)), max(1, height // 2 + rng.randint(0, 1))
+
+
+STREAMS = {
+    "uniform": uniform_stream,
+    "zipf": zipf_stream,
+    "adversarial": adversarial_stream,
+}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run(engine, stream, width, height, boxes, seed, rejections):
+    placement_cache.clear()
+    field, find = ENGINES[engine](wall_logick.create_field(width, height))
+    rng = random.Random(f"{seed}:{stream}:{width}x{height}")
+    source = STREAMS[stream](width, height, rng)
+
+    latencies = []
+    placed = rejected = in_a_row = 0
+    filled = 0
+    start = time.perf_counter()
+    for _ in range(boxes):
+        box_width, box_height = next(source)
+        t = time.perf_counter()
+        x, y, orientation = find(field, box_width, box_height)
+        latencies.append(time.perf_counter() - t)
+        if x == -1:
+            rejected += 1
+            in_a_row += 1
+            if in_a_row >= rejections:
+                break
+            continue
+        in_a_row = 0
+        placed += 1
+        filled += orientation[0] * orientation[1]
+        wall_logick.place_box(field, orientation[0], orientation[1], x, y, placed)
+        if filled == width * height:
+            break
+    total = time.perf_counter() - start
+
+    return {
+        "engine": engine,
+        "stream": stream,
+        "size": f"{width}x{height}",
+        "boxes": len(latencies),
+        "placed": placed,
+        "rejected": rejected,
+        "fill_ratio": round(filled / (width * height), 4),
+        "time_to_fill_s": round(total, 6),
+        "latency_ms": {name: round(percentile(latencies, p) * 1000, 4)
+                       for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+    }
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк алгоритмов размещения коробок")
+    parser.add_argument("--sizes", nargs="+", default=["8x12", "20x30", "40x60"])
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--streams", nargs="+", default=list(STREAMS), choices=list(STREAMS))
+    parser.add_argument("--boxes", type=int, default=1000, help="максимум коробок в одном прогоне")
+    parser.add_argument("--rejections", type=int, default=20, help="остановка после стольких отказов подряд")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_placement.json")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'поле':>8} {'поток':>12} {'движок':>9} {'коробок':>8} {'отказов':>8} {'заполн.':>8} "
+          f"{'p50, мс':>9} {'p99, мс':>9} {'всего, с':>9}")
+    for size in args.sizes:
+        width, height = parse_size(size)
+        for stream in args.streams:
+            for engine in args.engines:
+                result = run(engine, stream, width, height, args.boxes, args.seed, args.rejections)
+                results.append(result)
+                print(f"{result['size']:>8} {stream:>12} {engine:>9} {result['placed']:>8} "
+                      f"{result['rejected']:>8} {result['fill_ratio']:>8.1%} "
+                      f"{result['latency_ms']['p50']:>9.3f} {result['latency_ms']['p99']:>9.3f} "
+                      f"{result['time_to_fill_s']:>9.3f}")
+
+    report = {
+        "seed": args.seed,
+        "boxes": args.boxes,
+        "rejections": args.rejections,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
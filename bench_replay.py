@@ -0,0 +1,149 @@
+import argparse
+import importlib.util
+import json
+import platform
+import time
+
+from bench_placement import percentile
+from vision_pipeline import FramePacket
+from vision_source import open_source
+from vision_track import iou, box_bbox
+
+# Прогон записанного видео или каталога кадров через детектор и чтение QR
+# из "2) video_yolo.py" без камеры. Файл разметки (JSON):
+#   {"frames": {"<имя файла или номер кадра>": {"boxes": [[x1, y1, x2, y2], ...],
+#                                               "qr": ["<текст QR, который должен читаться на кадре>", ...]}}}
+# Кадры без разметки участвуют только в замере времени.
+# Пример: python bench_replay.py --source conveyor.mp4 --truth conveyor.json --output replay.json
+
+
+def load_script(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def match_boxes(expected, actual, threshold=0.5):
+    pairs = sorted(((iou(e, a), i, j) for i, e in enumerate(expected) for j, a in enumerate(actual)),
+                   reverse=True)
+    used_expected, used_actual = set(), set()
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i not in used_expected and j not in used_actual:
+            used_expected.add(i)
+            used_actual.add(j)
+    return len(used_expected)
+
+
+def summary(values):
+    return {name: round(percentile(values, p) * 1000, 3) if values else None
+            for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))}
+
+
+def replay(source, detect, decode, truth, limit=None):
+    timings = {"inference": [], "qr": [], "total": []}
+    counts = {"labelled": 0, "true_boxes": 0, "found_boxes": 0, "matched_boxes": 0,
+              "true_qr": 0, "read_qr": 0, "wrong_qr": 0}
+    expected_payloads, read_payloads = set(), set()
+
+    seq = 0
+    start = time.perf_counter()
+    while limit is None or seq < limit:
+        ret, frame = source.read()
+        if not ret:
+            break
+        seq += 1
+        packet = FramePacket(seq, frame)
+
+        t0 = time.perf_counter()
+        detect(packet)
+        t1 = time.perf_counter()
+        decode(packet)
+        t2 = time.perf_counter()
+        timings["inference"].append(t1 - t0)
+        timings["qr"].append(t2 - t1)
+        timings["total"].append(t2 - t0)
+
+        read = {value for value in packet.qr if value}
+        read_payloads |= read
+        labels = truth.get(source.name)
+        if labels is None:
+            continue
+        found = [box_bbox(box) for box in packet.boxes]
+        counts["labelled"] += 1
+        counts["true_boxes"] += len(labels.get("boxes", []))
+        counts["found_boxes"] += len(found)
+        counts["matched_boxes"] += match_boxes(labels.get("boxes", []), found)
+        expected = set(labels.get("qr", []))
+        expected_payloads |= expected
+        counts["true_qr"] += len(expected)
+        counts["read_qr"] += len(expected & read)
+        counts["wrong_qr"] += len(read - expected)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "frames": seq,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(seq / elapsed, 2) if elapsed else None,
+        "latency_ms": {stage: summary(values) for stage, values in timings.items()},
+        "accuracy": {
+            **counts,
+            "box_precision": round(counts["matched_boxes"] / counts["found_boxes"], 4) if counts["found_boxes"] else None,
+            "box_recall": round(counts["matched_boxes"] / counts["true_boxes"], 4) if counts["true_boxes"] else None,
+            "qr_frame_recall": round(counts["read_qr"] / counts["true_qr"], 4) if counts["true_qr"] else None,
+            "qr_parcels_read": len(expected_payloads & read_payloads),
+            "qr_parcels_total": len(expected_payloads),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк распознавания коробок и QR-кодов")
+    parser.add_argument("--source", required=True, help="видеофайл или каталог кадров")
+    parser.add_argument("--truth", help="файл разметки JSON")
+    parser.add_argument("--script", default="2) video_yolo.py")
+    parser.add_argument("--limit", type=int, help="не больше стольких кадров")
+    parser.add_argument("--model", help="веса .pt или модель .onnx вместо модели из скрипта")
+    parser.add_argument("--engine", choices=("onnxruntime", "opencv"), help="чем запускать .onnx")
+    parser.add_argument("--output", default="bench_replay.json")
+    args = parser.parse_args()
+
+    truth = {}
+    if args.truth:
+        with open(args.truth, "r", encoding="utf-8") as file:
+            truth = json.load(file)["frames"]
+
+    vision = load_script(args.script, "video_yolo")
+    if args.model:
+        vision.MODEL_PATH, vision.MODEL_ENGINE = args.model, args.engine
+    # Загрузка модели не входит в замер
+    if hasattr(vision, "get_model"):
+        vision.get_model()
+    source = open_source(args.source)
+    try:
+        result = replay(source, vision.detect_boxes, vision.read_qr_codes, truth, args.limit)
+    finally:
+        source.release()
+
+    latency = result["latency_ms"]
+    accuracy = result["accuracy"]
+    print(f"Кадров: {result['frames']}, {result['fps']} к/с")
+    for stage in ("inference", "qr", "total"):
+        print(f"  {stage:>9}: p50 {latency[stage]['p50']} мс, p90 {latency[stage]['p90']} мс, "
+              f"p99 {latency[stage]['p99']} мс")
+    if truth:
+        print(f"  коробки: точность {accuracy['box_precision']}, полнота {accuracy['box_recall']}")
+        print(f"  QR: прочитано на кадрах {accuracy['qr_frame_recall']}, ошибочных {accuracy['wrong_qr']}, "
+              f"посылок {accuracy['qr_parcels_read']} из {accuracy['qr_parcels_total']}")
+
+    report = {"source": args.source, "truth": args.truth, "python": platform.python_version(),
+              "machine": platform.machine(), **result}
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,575 @@
+import contextlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from vision_draw import TextOverlay, load_font
+from vision_track import BoxTracker, RegionTracker, box_bbox
+from vision_server import MultiSourceServer
+from vision_motion import MotionGate
+from vision_pipeline import FramePacket
+from vision_channel import DetectionPublisher, DetectionSubscriber, DetectionRecord, encode_message
+from vision_framebus import FrameBus, FrameBusReader
+from vision_adapt import AdaptiveController
+from vision_pipeline import VisionPipeline
+from bench_replay import load_script
+
+
+def legacy_draw_russian_text(image, text, position, font_size=30, font_color=(0, 255, 0)):
+    # Прежняя реализация: весь кадр через PIL туда и обратно
+    image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(image_pil)
+    draw.text(position, text, font=load_font(font_size), fill=font_color)
+    return cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
+
+
+def synthetic_frame(width=640, height=480, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def check_overlay(width=640, height=480):
+    frame = synthetic_frame(width, height)
+    text = "QR: Поле: 1 Ширина: 3 Высота: 2 Вес: 5"
+    expected = legacy_draw_russian_text(frame.copy(), text, (10, 30))
+    actual = TextOverlay().draw(frame.copy(), text, (10, 30))
+    diff = np.abs(expected.astype(np.int16) - actual.astype(np.int16))
+    print(f"Надпись: отличающихся пикселей {np.count_nonzero(diff.max(axis=2) > 2)}, "
+          f"макс. отличие {diff.max()}")
+    return diff.max() <= 2
+
+
+def headless_sink(yolo, frames, width, height, text):
+    # Настоящий my_custom_sink из "2) video_yolo.py" с headless = True: записи, output.txt
+    # и шина кадров, без рисования. Печать в консоль уходит в буфер
+    yolo.headless = True
+    yolo.frame_buses["1"] = FrameBus("bench_annotation")
+    path = os.path.join(tempfile.mkdtemp(), "output.txt")
+    packets = []
+    for n in range(frames):
+        packet = FramePacket(n + 1, synthetic_frame(width, height))
+        packet.boxes = [{"x": width / 2, "y": height / 2, "width": width / 4, "height": height / 4}]
+        packet.qr = [text]
+        packets.append(packet)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for packet in packets:
+                yolo.my_custom_sink(packet, path)
+            return (time.perf_counter() - start) / frames
+    finally:
+        yolo.frame_buses.pop("1").close()
+
+
+def benchmark_annotation(sizes=((640, 480), (1280, 720), (1920, 1080)), frames=200):
+    # PIL и overlay - только рисование кадра; headless - весь вывод кадра без рисования
+    text = "QR: Поле: 1 Ширина: 3 Высота: 2 Вес: 5"
+    try:
+        yolo = load_script("2) video_yolo.py", "video_yolo")
+    except ImportError as e:
+        yolo = None
+        print(f"headless не измерен, \"2) video_yolo.py\" не импортируется: {e}")
+    print(f"{'кадр':>10} {'PIL, мс':>9} {'overlay, мс':>12} {'headless, мс':>13} {'ускорение':>10}")
+    for width, height in sizes:
+        frame = synthetic_frame(width, height)
+        overlay = TextOverlay()
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            image = frame.copy()
+            cv2.line(image, (width // 2, 0), (width // 2, height), (0, 255, 0), 2)
+            legacy_draw_russian_text(image, text, (10, 30))
+        t_legacy = (time.perf_counter() - start) / frames
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            image = frame.copy()
+            cv2.line(image, (width // 2, 0), (width // 2, height), (0, 255, 0), 2)
+            overlay.draw(image, text, (10, 30))
+        t_overlay = (time.perf_counter() - start) / frames
+
+        headless = "-" if yolo is None else f"{headless_sink(yolo, frames, width, height, text[4:]) * 1000:.3f}"
+        print(f"{f'{width}x{height}':>10} {t_legacy * 1000:9.3f} {t_overlay * 1000:12.3f} "
+              f"{headless:>13} {t_legacy / t_overlay:10.1f}")
+
+
+def conveyor_scene(frames=300, width=640, height=480, speed=6, every=60, size=(120, 100), qr=40):
+    # Синтетическая лента: посылки въезжают слева, в центре каждой - "QR" из
+    # уникального значения в канале 0. Возвращает кадры и рамки посылок на них.
+    for frame in range(frames):
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        boxes = []
+        for parcel in range(frame // every + 1):
+            left = (frame - parcel * every) * speed - size[0]
+            if left >= width:
+                continue
+            top = height // 2 - size[1] // 2
+            x1, x2 = max(0, left), min(width, left + size[0])
+            if x2 <= x1:
+                continue
+            image[top:top + size[1], x1:x2, 1] = 255
+            qx = left + (size[0] - qr) // 2
+            if qx >= 0 and qx + qr <= width:
+                image[top + (size[1] - qr) // 2:top + (size[1] + qr) // 2, qx:qx + qr, 0] = parcel + 1
+            boxes.append({"x": (x1 + x2) / 2, "y": top + size[1] / 2, "width": x2 - x1, "height": size[1]})
+        yield image, boxes
+
+
+class FakeQrDecoder:
+    # Заменяет pyzbar: стоимость пропорциональна числу пикселей, как у настоящего сканера
+    def __init__(self, fail_rate=0.0, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.pixels = 0
+
+    def __call__(self, image):
+        self.calls += 1
+        self.pixels += image.shape[0] * image.shape[1]
+        codes = []
+        channel = image[:, :, 0]
+        for value in np.unique(channel):
+            if value == 0 or self.rng.random() < self.fail_rate:
+                continue
+            ys, xs = np.nonzero(channel == value)
+            polygon = [(int(xs.min()), int(ys.min())), (int(xs.max()), int(ys.min())),
+                       (int(xs.max()), int(ys.max())), (int(xs.min()), int(ys.max()))]
+            codes.append({"data": f"Поле: 1 Ширина: 3 Высота: 2 Вес: {value}", "polygon": polygon})
+        return codes
+
+
+def crop_decode(decoder, image, box):
+    x1, y1, x2, y2 = (int(v) for v in box_bbox(box))
+    codes = decoder(image[max(0, y1):y2, max(0, x1):x2])
+    return codes[0]["data"] if codes else None
+
+
+def benchmark_tracking(frames=300, fail_rate=0.3):
+    # Посылки с детектором (2) video_yolo.py): чтение QR каждый кадр против трекера
+    plain, tracked = FakeQrDecoder(fail_rate, 1), FakeQrDecoder(fail_rate, 1)
+    tracker = BoxTracker()
+    seen_plain, seen_tracked = set(), set()
+    for image, boxes in conveyor_scene(frames):
+        center_x = image.shape[1] // 2
+        tracks = tracker.update([box_bbox(box) for box in boxes])
+        for box, track in zip(boxes, tracks):
+            if box['x'] - box['width'] / 2 <= center_x <= box['x'] + box['width'] / 2:
+                value = crop_decode(plain, image, box)
+                if value:
+                    seen_plain.add(value)
+                value = tracker.read(track, lambda: crop_decode(tracked, image, box))
+                if value:
+                    seen_tracked.add(value)
+    print(f"Посылки: вызовов сканера {plain.calls} -> {tracked.calls} "
+          f"({plain.calls / frames:.2f} -> {tracked.calls / frames:.2f} на кадр), "
+          f"распознано посылок {len(seen_plain)} -> {len(seen_tracked)}")
+
+    # QR без детектора (3) server_1.py): полный кадр каждый раз против поиска в областях
+    plain, tracked = FakeQrDecoder(), FakeQrDecoder()
+    regions = RegionTracker()
+    agree = 0
+    for image, boxes in conveyor_scene(frames):
+        expected = {qr["data"] for qr in plain(image)}
+        actual = {qr["data"] for qr in regions.update(image, tracked)}
+        agree += expected == actual
+    print(f"QR в кадре: пикселей на кадр {plain.pixels / frames:.0f} -> {tracked.pixels / frames:.0f}, "
+          f"кадров с тем же результатом {agree} из {frames}")
+    return seen_plain == seen_tracked
+
+
+class SyntheticSource:
+    # Камера из conveyor_scene с заданной частотой кадров
+    def __init__(self, frames=150, fps=30):
+        self.scene = conveyor_scene(frames)
+        self.interval = 1 / fps
+        self.next_time = time.perf_counter()
+
+    def read(self):
+        delay = self.next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_time += self.interval
+        frame = next(self.scene, None)
+        return (frame is not None), (frame[0] if frame else None)
+
+    def release(self):
+        pass
+
+
+def benchmark_batching(cameras=4, call_cost=0.02, image_cost=0.005, frames=150):
+    # Модель заменена задержкой call_cost + image_cost * кадров: накладные
+    # расходы вызова делятся между кадрами одного пакета
+    def detect_batch(packets):
+        time.sleep(call_cost + image_cost * len(packets))
+        for packet in packets:
+            packet.boxes = []
+
+    print(f"{'пакет':>6} {'к/с на камеру':>14} {'средний пакет':>14} {'задержка, мс':>13}")
+    for max_batch in (1, cameras):
+        names = [str(n + 1) for n in range(cameras)]
+        server = MultiSourceServer({name: SyntheticSource(frames) for name in names}, detect_batch,
+                                   {name: lambda packet: None for name in names},
+                                   {name: lambda packet: None for name in names},
+                                   max_batch=max_batch, max_wait=0.01, report_every=0)
+        report = server.run()
+        fps = sum(report[name]["fps"] for name in names) / cameras
+        latency = sum(report[name]["busy_ms"] for name in names) / cameras
+        print(f"{max_batch:>6} {fps:14.1f} {report['mean_batch']:14.2f} {latency:13.1f}")
+
+
+def check_gated_order(frames=120, change_every=10, fps=100, model_ms=50):
+    # Сцена меняется раз в change_every кадров, модель медленнее камеры. Каждый кадр
+    # на выходе должен идти по порядку и нести детекции последнего изменения до него
+    class ScriptedSource:
+        def __init__(self):
+            self.seq = 0
+
+        def read(self):
+            if self.seq >= frames:
+                return False, None
+            time.sleep(1 / fps)
+            self.seq += 1
+            return True, np.full((48, 64, 3), (self.seq - 1) // change_every * 40 % 256, dtype=np.uint8)
+
+    inferred = set()
+
+    def detect_batch(packets):
+        time.sleep(model_ms / 1000)
+        for packet in packets:
+            inferred.add(packet.seq)
+            packet.boxes = [{"seq": packet.seq}]
+
+    published = []
+    server = MultiSourceServer({"1": ScriptedSource()}, detect_batch, {"1": lambda packet: None},
+                               {"1": lambda packet: published.append((packet.seq, packet.boxes[0]["seq"]))},
+                               report_every=0, gates={"1": MotionGate(width=16, heartbeat=0)})
+    server.run()
+    seqs = [seq for seq, _ in published]
+    ok = seqs == sorted(set(seqs))
+    for seq, source in published:
+        latest = max(n for n in inferred if n <= seq)
+        if source != latest:
+            ok = False
+    print(f"Порядок кадров за детектором движения: {'ok' if ok else 'НАРУШЕН'} "
+          f"(кадров {len(published)}, инференсов {len(inferred)})")
+    return ok
+
+
+def stop_and_go_scene(width=640, height=480, noise=3, seed=0):
+    # Пустая лента, посылка въезжает и останавливается, снова пустая лента.
+    # Возвращает (кадр, есть ли посылка в кадре); шум - как у реальной камеры
+    rng = np.random.default_rng(seed)
+    background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    phases = [(100, None), (40, 8), (100, 0), (40, -8), (100, None)]
+    left = -120
+    for frames, speed in phases:
+        for _ in range(frames):
+            image = background.copy()
+            present = speed is not None
+            if present:
+                left += speed
+                x1, x2 = max(0, left), min(width, left + 120)
+                if x2 > x1:
+                    image[190:290, x1:x2] = (40, 200, 200)
+                present = x2 > x1
+            image = cv2.add(image, rng.integers(0, noise + 1, image.shape, dtype=np.uint8))
+            yield image, present
+
+
+def benchmark_motion(heartbeat=2.0, fps=30, model_cost=20):
+    # Модель заменена матричным умножением, занимающим процессор примерно как инференс
+    weights = np.random.default_rng(1).random((model_cost * 10, model_cost * 10))
+
+    def detect(packet):
+        for _ in range(10):
+            weights @ weights
+        packet.boxes = []
+
+    print(f"{'режим':>12} {'инференсов':>11} {'CPU, с':>8} {'задержка въезда, кадров':>24}")
+    for mode in ("каждый кадр", "детектор"):
+        gate = MotionGate(heartbeat=heartbeat)
+        stage = detect if mode == "каждый кадр" else gate.wrap(detect)
+        inferred = 0
+        first_present = first_detected = None
+        cpu = 0.0
+        for n, (image, present) in enumerate(stop_and_go_scene()):
+            packet = FramePacket(n, image)
+            # Время сцены идёт с частотой камеры, а не со скоростью расчёта
+            packet.captured = n / fps
+            runs = gate.runs
+            start = time.process_time()
+            stage(packet)
+            cpu += time.process_time() - start
+            ran = mode == "каждый кадр" or gate.runs > runs
+            inferred += ran
+            if present and first_present is None:
+                first_present = n
+            if present and ran and first_detected is None:
+                first_detected = n
+        print(f"{mode:>12} {inferred:>11} {cpu:8.2f} {first_detected - first_present:>24}")
+
+
+class Payload:
+    # Если подписчик распакует pickle, выполнится _unpickled и оставит флаг
+    def __reduce__(self):
+        return (_unpickled, ())
+
+
+unpickled = []
+
+
+def _unpickled():
+    unpickled.append(True)
+    return {}
+
+
+def check_channel(address=("127.0.0.1", 6012), authkey=b"bench"):
+    # Подписчик принимает только JSON с известными полями: pickle и мусор отбрасываются,
+    # следующий за ними кадр доходит
+    listener = Listener(address, authkey=authkey)
+    subscriber = DetectionSubscriber(address, authkey=authkey, retry=0.01)
+    subscriber.start()
+    connection = listener.accept()
+    record = DetectionRecord.create(time.time(), "1", np.int64(7), np.int32(3), np.array([1, 2, 30, 40]),
+                                    np.bool_(True), "Поле: 2 Ширина: 4 Высота: 3 Вес: 12")
+    connection.send(Payload())
+    connection.send_bytes(b"not json")
+    connection.send_bytes(b'{"source": "1", "frame": 7, "timestamp": 0, "records": [{"bbox": 1}]}')
+    connection.send_bytes(encode_message("1", 7, record.timestamp, [record]))
+    deadline = time.time() + 5
+    while subscriber.latest("1") is None and time.time() < deadline:
+        time.sleep(0.01)
+    message = subscriber.latest("1")
+    ok = not unpickled and subscriber.rejected == 3 and message is not None \
+        and message["records"][0].as_dict() == record.as_dict()
+    connection.close()
+    listener.close()
+    print(f"Канал: JSON {'ok' if message else 'НЕТ'}, отброшено {subscriber.rejected} из 3, "
+          f"pickle {'выполнен!' if unpickled else 'не распакован'}")
+    return ok
+
+
+def benchmark_channel(parcels=30, idle=0.05, address=("127.0.0.1", 6011)):
+    # Посылка появляется через idle секунд после начала ожидания. Старый get_wall
+    # в цикле перечитывал output.txt, новый ждёт запись из канала
+    qr = "Поле: 1 Ширина: 4 Высота: 3 Вес: 12"
+    pattern = r"Поле:\s*\d+\s*Ширина:\s*\d+\s*Высота:\s*\d+"
+    path = os.path.join(tempfile.mkdtemp(), "output.txt")
+    publisher = DetectionPublisher(address)
+    subscriber = DetectionSubscriber(address, retry=0.01)
+    subscriber.start()
+    while not subscriber.connected:
+        time.sleep(0.01)
+
+    def wait_file():
+        while True:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    if re.findall(pattern, file.read()):
+                        return
+            except FileNotFoundError:
+                pass
+
+    def wait_channel():
+        subscriber.wait_for_qr(5.0)
+
+    def publish_file(seq, found):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(f"  QR-код: {qr}\n" if found else "No parcels detected.\n")
+
+    def publish_channel(seq, found):
+        records = [DetectionRecord.create(time.time(), "1", seq, 1, (0, 0, 10, 10), True, qr)] if found else []
+        publisher.publish("1", seq, time.time(), records)
+        if not found:
+            # Пустой кадр должен дойти до подписчика, иначе wait_for_qr сразу вернёт
+            # посылку с прошлого кадра и замер ничего не покажет
+            while (subscriber.latest("1") or {}).get("frame") != seq:
+                time.sleep(0.001)
+
+    print(f"{'способ':>8} {'задержка p50, мс':>17} {'макс., мс':>10} {'CPU ожидания, %':>16}")
+    for name, wait, publish in (("файл", wait_file, publish_file), ("канал", wait_channel, publish_channel)):
+        latencies, busy = [], []
+        for seq in range(parcels):
+            publish(seq, False)
+            done = []
+
+            def consumer():
+                start = time.thread_time()
+                wait()
+                done.append((time.perf_counter(), time.thread_time() - start))
+
+            thread = threading.Thread(target=consumer)
+            thread.start()
+            time.sleep(idle)
+            published = time.perf_counter()
+            publish(seq, True)
+            thread.join()
+            latencies.append(done[0][0] - published)
+            busy.append(done[0][1] / (done[0][0] - published + idle))
+        latencies.sort()
+        print(f"{name:>8} {latencies[len(latencies) // 2] * 1000:17.2f} {latencies[-1] * 1000:10.2f} "
+              f"{sum(busy) / len(busy) * 100:16.1f}")
+    publisher.close()
+
+
+def check_framebus_restart(name="bench_restart"):
+    # Писатель "падает" без close() и перезапускается с другим размером кадра под тем же
+    # именем: меньший кадр - в том же сегменте, больший - в новом. Читатель должен
+    # подключиться заново и отдать новый кадр целиком, а не срез по старой разметке
+    reader = FrameBusReader(name)
+    ok = True
+    writers = []
+    for width, height in ((64, 48), (32, 24), (128, 96)):
+        image = synthetic_frame(width, height, seed=width)
+        writer = FrameBus(name, jpeg=False)
+        writer.publish(image)
+        writers.append(writer)
+        result = reader.read(jpeg=False)
+        ok = ok and result is not None and result[1].shape == image.shape and np.array_equal(result[1], image)
+    print(f"Перезапуск шины кадров: {'ok' if ok else 'НЕТ'}, переподключений {reader.reattached}")
+    reader.detach()
+    for writer in writers:
+        writer.close()
+    return ok
+
+
+def benchmark_framebus(viewers=(1, 4, 8), frames=90, fps=30, slow_delay=0.2):
+    # Прежний /video_feed кодировал JPEG в каждом клиенте; с шиной кадр кодируется
+    # один раз. Последний клиент медленный: он должен пропускать кадры, не задерживая остальных
+    images = [synthetic_frame(seed=n) for n in range(10)]
+    print(f"{'клиентов':>9} {'способ':>7} {'JPEG':>6} {'CPU, с':>7} {'кадров у быстрых':>17} "
+          f"{'у медленного':>13} {'пропущено':>10}")
+    for count in viewers:
+        for mode in ("каждый", "шина"):
+            bus = FrameBus("bench_frames") if mode == "шина" else None
+            latest = [None, 0]
+            stop = threading.Event()
+            delivered = [0] * count
+            encodes = [0]
+            readers = []
+
+            def viewer(index):
+                delay = slow_delay if index == count - 1 and count > 1 else 0
+                if bus is None:
+                    seen = 0
+                    while not stop.is_set():
+                        if latest[1] == seen:
+                            time.sleep(0.005)
+                            continue
+                        seen = latest[1]
+                        cv2.imencode('.jpg', latest[0], [cv2.IMWRITE_JPEG_QUALITY, 80])
+                        encodes[0] += 1
+                        delivered[index] += 1
+                        time.sleep(delay)
+                    return
+                reader = FrameBusReader("bench_frames", poll=0.005)
+                readers.append(reader)
+                for _ in reader.frames():
+                    delivered[index] += 1
+                    if stop.is_set():
+                        break
+                    time.sleep(delay)
+
+            # Сначала кадр в шине, чтобы клиенты подключились к готовой памяти
+            if bus is not None:
+                bus.publish(images[0])
+            threads = [threading.Thread(target=viewer, args=(i,)) for i in range(count)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.1)
+            cpu = time.process_time()
+            for n in range(frames):
+                start = time.perf_counter()
+                if bus is None:
+                    latest[:] = [images[n % len(images)], n + 1]
+                else:
+                    bus.publish(images[n % len(images)])
+                time.sleep(max(0.0, 1 / fps - (time.perf_counter() - start)))
+            cpu = time.process_time() - cpu
+            stop.set()
+            for thread in threads:
+                thread.join()
+            if bus is not None:
+                encodes[0] = bus.encoded
+                bus.close()
+            fast = delivered[:-1] if count > 1 else delivered
+            skipped = sum(reader.skipped for reader in readers[-1:]) if count > 1 and readers else "-"
+            print(f"{count:>9} {mode:>7} {encodes[0]:>6} {cpu:7.2f} {min(fast):>17} "
+                  f"{delivered[-1] if count > 1 else '-':>13} {skipped!s:>10}")
+
+
+def spin(seconds):
+    # Занять процессор, как модель или pyzbar, а не просто ждать
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+class FakeResizableModel:
+    size = 640
+    resizable = True
+
+
+def benchmark_adaptive(target_ms=120, frames=360, fps=30, model_ms=45, qr_ms=12):
+    # Камера 1280x720 при 30 к/с. Стоимость модели растёт как квадрат входа,
+    # чтения QR - как площадь кадра; на полном качестве процессора не хватает
+    image = cv2.resize(synthetic_frame(), (1280, 720))
+
+    class Camera:
+        def __init__(self):
+            self.left = frames
+            self.next_time = time.perf_counter()
+
+        def read(self):
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time += 1 / fps
+            self.left -= 1
+            return self.left >= 0, image
+
+    print(f"{'режим':>11} {'к/с':>6} {'задержка p90, мс':>17} {'точка':>6} {'ширина':>7} {'вход':>5} "
+          f"{'пропуск':>8} {'смен':>5}")
+    for prefer in (None, "throughput", "accuracy"):
+        model = FakeResizableModel()
+        controller = AdaptiveController(target_ms, prefer or "throughput", model, interval=1.0,
+                                        metrics_path=None)
+
+        def detect(packet):
+            spin(model_ms / 1000 * (model.size / 640) ** 2)
+            packet.boxes = []
+
+        def decode(packet):
+            spin(qr_ms / 1000 * packet.image.shape[0] * packet.image.shape[1] / (1280 * 720))
+
+        if prefer is None:
+            # Без регулятора: только замер задержки на исходной точке
+            controller.levels = controller.levels[:1]
+        report = VisionPipeline(controller.wrap_read(Camera().read), controller.wrap(detect), decode,
+                                controller.wrap_publish(lambda packet: True), report_every=0).run()
+        metrics = controller.metrics()
+        print(f"{prefer or 'без':>11} {report['output']['fps']:6.1f} {metrics['latency_p90_ms']!s:>17} "
+              f"{metrics['level'] if prefer else '-':>6} {metrics['capture_width'] or 1280:>7} "
+              f"{model.size:>5} {metrics['skip']:>8} {metrics['changes']:>5}")
+
+if __name__ == "__main__":
+    ok = check_overlay()
+    ok = benchmark_tracking() and ok
+    ok = check_gated_order() and ok
+    ok = check_channel() and ok
+    ok = check_framebus_restart() and ok
+    print("Результаты совпадают." if ok else "Найдены расхождения!")
+    benchmark_annotation()
+    benchmark_batching()
+    benchmark_motion()
+    benchmark_channel()
+    benchmark_framebus()
+    benchmark_adaptive()
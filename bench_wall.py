@@ -0,0 +1,442 @@
+import json
+import os
+import random
+import tempfile
+import time
+
+import wall_logick
+import wall_numpy
+from wall_index import OccupancyIndex
+from wall_field import Field
+from wall_free import FreeSpaceIndex
+from wall_compact import CompactField
+from wall_cache import placement_cache
+from wall_service import PlacementService
+from wall_state import FieldStore
+
+
+def random_field(width, height, fill, rng):
+    field = wall_logick.create_field(width, height)
+    box_id = 0
+    for _ in range(width * height):
+        if sum(1 for row in field for cell in row if cell != 0) >= fill * width * height:
+            break
+        box_width = rng.randint(1, max(1, width // 3))
+        box_height = rng.randint(1, max(1, height // 3))
+        x = rng.randint(0, width - box_width)
+        y = rng.randint(0, height - box_height)
+        if wall_logick.can_place_box(field, box_width, box_height, x, y):
+            box_id += 1
+            wall_logick.place_box(field, box_width, box_height, x, y, box_id)
+    return field
+
+
+def check_equivalence(cases=300, seed=1):
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(cases):
+        width = rng.randint(1, 16)
+        height = rng.randint(1, 16)
+        field = random_field(width, height, rng.random(), rng)
+        box_width = rng.randint(1, width + 1)
+        box_height = rng.randint(1, height + 1)
+        expected = wall_logick.find_best_placement(field, box_width, box_height)
+        actual = wall_numpy.find_best_placement(field, box_width, box_height)
+        if expected != actual:
+            mismatches += 1
+            print(f"Расхождение: поле {width}x{height}, коробка {box_width}x{box_height}: "
+                  f"{expected} != {actual}")
+    print(f"Проверено случаев: {cases}, расхождений: {mismatches}")
+    return mismatches == 0
+
+
+def sequence_equivalence(width, height, boxes, seed=2):
+    rng = random.Random(seed)
+    field_py = wall_logick.create_field(width, height)
+    field_np = wall_logick.create_field(width, height)
+    for box_id in range(1, boxes + 1):
+        box_width = rng.randint(1, 4)
+        box_height = rng.randint(1, 4)
+        expected = wall_logick.find_best_placement(field_py, box_width, box_height)
+        actual = wall_numpy.find_best_placement(field_np, box_width, box_height)
+        if expected != actual:
+            print(f"Расхождение на коробке {box_id}: {expected} != {actual}")
+            return False
+        x, y, orientation = expected
+        if x == -1:
+            continue
+        wall_logick.place_box(field_py, orientation[0], orientation[1], x, y, box_id)
+        wall_logick.place_box(field_np, orientation[0], orientation[1], x, y, box_id)
+    return True
+
+
+def check_state_recovery():
+    # Размер поля изменился: коробка, размещённая после этого, должна пережить перезапуск
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "fields_state.json")
+        store = FieldStore({"1": (8, 12), "2": (8, 12)}, filename, snapshot_every=1000)
+        store.place("1", 2, 3, 0, 0)
+        store.flush()
+        store = FieldStore({"1": (10, 12), "2": (8, 12)}, filename, snapshot_every=1000)
+        store.place("1", 4, 4, 2, 2)
+        store.flush()
+        store = FieldStore({"1": (10, 12), "2": (8, 12)}, filename, snapshot_every=1000)
+        cells = store.field("1").cells
+        if cells[2][2] == 0 or cells[0][0] != 0 or store.current_box_id != 1:
+            print("Коробка, размещённая после смены размера поля, потеряна при перезапуске")
+            return False
+    return True
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(sizes=((8, 12), (20, 30), (40, 60)), box=(3, 2), fill=0.3, seed=3):
+    rng = random.Random(seed)
+    print(f"{'поле':>8} {'python, мс':>12} {'numpy, мс':>12} {'ускорение':>10}")
+    for width, height in sizes:
+        field = random_field(width, height, fill, rng)
+        t_py = timed(wall_logick.find_best_placement, field, *box)
+        t_np = timed(wall_numpy.find_best_placement, field, *box)
+        print(f"{f'{width}x{height}':>8} {t_py * 1000:12.2f} {t_np * 1000:12.2f} {t_py / t_np:10.1f}")
+
+
+def scan_fits(field, box_width, box_height, index=None):
+    fits = 0
+    for y in range(len(field) - box_height + 1):
+        for x in range(len(field[0]) - box_width + 1):
+            if wall_logick.can_place_box(field, box_width, box_height, x, y, index):
+                fits += 1
+    return fits
+
+
+def check_index(cases=200, seed=4):
+    rng = random.Random(seed)
+    for _ in range(cases):
+        width = rng.randint(1, 20)
+        height = rng.randint(1, 20)
+        field = random_field(width, height, rng.random(), rng)
+        index = OccupancyIndex.from_field(field)
+        for box_id in range(1, 6):
+            box_width = rng.randint(1, width)
+            box_height = rng.randint(1, height)
+            if scan_fits(field, box_width, box_height) != scan_fits(field, box_width, box_height, index):
+                print(f"Индекс расходится с полем {width}x{height}")
+                return False
+            x, y, orientation = wall_logick.find_best_placement(field, box_width, box_height, index)
+            if x != -1:
+                wall_logick.place_box(field, orientation[0], orientation[1], x, y, 100 + box_id, index)
+                if index.table != OccupancyIndex.from_field(field).table:
+                    print(f"Инкрементальное обновление индекса неверно: поле {width}x{height}")
+                    return False
+    return True
+
+
+def check_field(cases=100, seed=6):
+    rng = random.Random(seed)
+    for _ in range(cases):
+        width = rng.randint(1, 16)
+        height = rng.randint(1, 16)
+        cells = random_field(width, height, rng.random() / 2, rng)
+        field = Field([row[:] for row in cells])
+        for box_id in range(1, 8):
+            box_width = rng.randint(1, 4)
+            box_height = rng.randint(1, 4)
+            for y in range(height - box_height + 1):
+                for x in range(width - box_width + 1):
+                    if (wall_logick.calculate_score(cells, box_width, box_height, x, y)
+                            != wall_logick.calculate_score(field, box_width, box_height, x, y)):
+                        print(f"Оценка расходится: поле {width}x{height}, позиция ({x}, {y})")
+                        return False
+            expected = wall_logick.find_best_placement(cells, box_width, box_height)
+            if expected != wall_logick.find_best_placement(field, box_width, box_height):
+                print(f"Размещение расходится: поле {width}x{height}")
+                return False
+            x, y, orientation = expected
+            if x != -1:
+                wall_logick.place_box(cells, orientation[0], orientation[1], x, y, 100 + box_id)
+                wall_logick.place_box(field, orientation[0], orientation[1], x, y, 100 + box_id)
+    return True
+
+
+def benchmark_field(sizes=((8, 12), (20, 30), (40, 60)), box=(3, 2), fill=0.3, seed=7):
+    rng = random.Random(seed)
+    print(f"{'поле':>8} {'список, мс':>11} {'Field, мс':>10} {'ускорение':>10}")
+    for width, height in sizes:
+        cells = random_field(width, height, fill, rng)
+        field = Field(cells)
+        # Сам поиск, без кэша решений: иначе все повторы после первого - попадания в кэш
+        t_list = timed(wall_logick.search_best_placement, cells, *box)
+        t_field = timed(wall_logick.search_best_placement, field, *box)
+        print(f"{f'{width}x{height}':>8} {t_list * 1000:11.2f} {t_field * 1000:10.2f} {t_list / t_field:10.1f}")
+
+
+def check_free(cases=150, seed=8):
+    rng = random.Random(seed)
+    for _ in range(cases):
+        width = rng.randint(1, 16)
+        height = rng.randint(1, 16)
+        field = Field(random_field(width, height, rng.random() / 2, rng))
+        for box_id in range(1, 10):
+            for box_width, box_height in ((1, 1), (2, 3), (3, 2), (4, 4)):
+                valid = [(x, y) for y in range(height - box_height + 1) for x in range(width - box_width + 1)
+                         if wall_logick.can_place_box(field.cells, box_width, box_height, x, y)]
+                if valid != field.free.candidates(box_width, box_height):
+                    print(f"Кандидаты расходятся: поле {width}x{height}, коробка {box_width}x{box_height}")
+                    return False
+            if sorted(field.free.rects) != sorted(FreeSpaceIndex.from_field(field.cells).rects):
+                print(f"Инкрементальные прямоугольники расходятся: поле {width}x{height}")
+                return False
+            box_width = rng.randint(1, 4)
+            box_height = rng.randint(1, 4)
+            x, y, orientation = wall_logick.find_best_placement(field, box_width, box_height)
+            if x != -1:
+                wall_logick.place_box(field, orientation[0], orientation[1], x, y, 100 + box_id)
+    return True
+
+
+def legacy_free_index(field):
+    # Прежняя сборка: occupy() на каждый занятый отрезок строки, каждый раз с отсевом _maximal
+    height = len(field)
+    width = len(field[0]) if height else 0
+    index = FreeSpaceIndex(width, height)
+    for y in range(height):
+        x = 0
+        while x < width:
+            if field[y][x] == 0:
+                x += 1
+                continue
+            start = x
+            while x < width and field[y][x] != 0:
+                x += 1
+            index.occupy(start, y, x - start, 1)
+    return index
+
+
+def scattered_field(width, height, fill, rng):
+    # Раздробленное поле: отдельные занятые клетки вместо коробок
+    return [[1 if rng.random() < fill else 0 for _ in range(width)] for _ in range(height)]
+
+
+def check_free_fragmented(cases=60, seed=21, sizes=((40, 60), (60, 90))):
+    # Сборка за один проход совпадает с прежней на раздробленных полях; и время сборки
+    rng = random.Random(seed)
+    for _ in range(cases):
+        width = rng.randint(1, 20)
+        height = rng.randint(1, 20)
+        field = scattered_field(width, height, rng.choice((0.0, 0.05, 0.2, 0.5, 0.9, 1.0)), rng)
+        if sorted(FreeSpaceIndex.from_field(field).rects) != sorted(legacy_free_index(field).rects):
+            print(f"Прямоугольники расходятся: раздробленное поле {width}x{height}")
+            return False
+    print(f"{'поле':>8} {'прямоуг.':>9} {'прежняя, с':>11} {'один проход, мс':>16}")
+    for width, height in sizes:
+        field = scattered_field(width, height, 0.1, rng)
+        start = time.perf_counter()
+        legacy = legacy_free_index(field)
+        t_legacy = time.perf_counter() - start
+        t_new = timed(FreeSpaceIndex.from_field, field)
+        if sorted(FreeSpaceIndex.from_field(field).rects) != sorted(legacy.rects):
+            print(f"Прямоугольники расходятся: раздробленное поле {width}x{height}")
+            return False
+        print(f"{f'{width}x{height}':>8} {len(legacy.rects):>9} {t_legacy:11.2f} {t_new * 1000:16.1f}")
+    return True
+
+
+def box_stream(max_width, max_height, rng):
+    while True:
+        yield rng.randint(1, max_width), rng.randint(1, max_height)
+
+
+def replay_until_full(field, boxes, rejections=20, find=wall_logick.find_best_placement):
+    timings = []
+    rejected = 0
+    box_id = 0
+    cells = len(field) * len(field[0])
+    for box_width, box_height in boxes:
+        filled = sum(1 for row in field for cell in row if cell != 0)
+        start = time.perf_counter()
+        x, y, orientation = find(field, box_width, box_height)
+        timings.append((filled / cells, time.perf_counter() - start))
+        if x == -1:
+            rejected += 1
+            if rejected >= rejections or wall_logick.is_field_full(field):
+                break
+            continue
+        rejected = 0
+        box_id += 1
+        wall_logick.place_box(field, orientation[0], orientation[1], x, y, box_id)
+    return timings
+
+
+def benchmark_fill(sizes=((8, 12, 4, 6), (40, 60, 8, 10)), seed=9):
+    buckets = (0.25, 0.5, 0.75, 1.01)
+    header = ' '.join(f"{f'<{int(min(b, 1) * 100)}%, мс':>11}" for b in buckets)
+    print(f"{'поле':>8} {'режим':>7} {header}")
+    for width, height, max_width, max_height in sizes:
+        for mode in ("список", "Field"):
+            rng = random.Random(seed)
+            cells = wall_logick.create_field(width, height)
+            field = Field(cells) if mode == "Field" else cells
+            timings = replay_until_full(field, box_stream(max_width, max_height, rng),
+                                        find=wall_logick.search_best_placement)
+            columns = []
+            low = 0
+            for high in buckets:
+                chunk = [t for fill, t in timings if low <= fill < high]
+                columns.append(f"{sum(chunk) / len(chunk) * 1000:11.2f}" if chunk else f"{'-':>11}")
+                low = high
+            print(f"{f'{width}x{height}':>8} {mode:>7} {' '.join(columns)}")
+
+
+def check_compact(cases=100, seed=10):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "field.bin")
+        for _ in range(cases):
+            width = rng.randint(1, 20)
+            height = rng.randint(1, 20)
+            cells = random_field(width, height, rng.random() / 2, rng)
+            compact = CompactField.from_list(cells)
+            box_width, box_height = rng.randint(1, 4), rng.randint(1, 4)
+            expected = wall_logick.find_best_placement(cells, box_width, box_height)
+            if expected != wall_logick.find_best_placement(compact, box_width, box_height):
+                print(f"Размещение на CompactField расходится: поле {width}x{height}")
+                return False
+            if wall_logick.is_field_full(cells) != wall_logick.is_field_full(compact):
+                return False
+            compact.save(filename)
+            loaded = CompactField.load(filename)
+            occupancy = CompactField.load_occupancy(filename)
+            if loaded.tolist() != cells or occupancy.tolist() != [[cell != 0 for cell in row] for row in cells]:
+                print(f"Файл поля {width}x{height} прочитан неверно")
+                return False
+            del loaded
+    return True
+
+
+def benchmark_compact(width=200, height=300, fill=0.5, seed=11):
+    rng = random.Random(seed)
+    cells = random_field(width, height, fill, rng)
+    compact = CompactField.from_list(cells)
+    with tempfile.TemporaryDirectory() as folder:
+        json_name = os.path.join(folder, "fields_state.json")
+        bin_name = os.path.join(folder, "field.bin")
+
+        def save_json():
+            with open(json_name, "w") as file:
+                json.dump({"field1": cells}, file)
+
+        def load_json():
+            with open(json_name, "r") as file:
+                return json.load(file)["field1"]
+
+        t_save_json = timed(save_json)
+        t_load_json = timed(load_json)
+        t_save_bin = timed(compact.save, bin_name)
+        t_load_bin = timed(lambda: CompactField.load(bin_name)[height - 1][width - 1])
+        print(f"Поле {width}x{height}: {'размер, КБ':>11} {'запись, мс':>11} {'чтение, мс':>11}")
+        print(f"{'JSON':>15} {os.path.getsize(json_name) / 1024:11.1f} {t_save_json * 1000:11.2f} "
+              f"{t_load_json * 1000:11.2f}")
+        print(f"{'CompactField':>15} {os.path.getsize(bin_name) / 1024:11.1f} {t_save_bin * 1000:11.2f} "
+              f"{t_load_bin * 1000:11.2f}")
+
+
+def benchmark_cache(width=40, height=60, pallets=3, seed=12):
+    rng = random.Random(seed)
+    boxes = [(rng.randint(2, 8), rng.randint(2, 10)) for _ in range(300)]
+    placement_cache.clear()
+    print(f"{'паллета':>8} {'время, мс':>10} {'попадания':>10} {'промахи':>8}")
+    for pallet in range(1, pallets + 1):
+        field = Field(wall_logick.create_field(width, height))
+        hits, misses = placement_cache.hits, placement_cache.misses
+        start = time.perf_counter()
+        replay_until_full(field, iter(boxes))
+        elapsed = time.perf_counter() - start
+        print(f"{pallet:>8} {elapsed * 1000:10.1f} {placement_cache.hits - hits:>10} "
+              f"{placement_cache.misses - misses:>8}")
+
+
+def benchmark_service(pallets=8, sizes=((8, 12), (200, 300)), boxes=20, seed=13):
+    # Пул против оценки на месте: запуск пула (spawn) отдельно, затем мс на коробку
+    # и ускорение относительно одного процесса. Размещения должны совпадать
+    rng = random.Random(seed)
+    stream = [(rng.randint(2, 6), rng.randint(2, 6)) for _ in range(boxes)]
+    print(f"{pallets} паллет, {boxes} коробок, ядер {os.cpu_count()}")
+    print(f"{'поле':>8} {'процессов':>10} {'запуск, мс':>11} {'мс/коробку':>11} {'ускорение':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        for width, height in sizes:
+            fields = [{"name": str(n), "width": width, "height": height, "offset_x": 0, "offset_y": 0}
+                      for n in range(1, pallets + 1)]
+            scale = max(1, min(width, height) // 8)
+            sized = [(box_width * scale, box_height * scale) for box_width, box_height in stream]
+            placements = baseline = None
+            for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+                service = PlacementService(fields, workers=workers, parallel_cells=0,
+                                           filename=os.path.join(folder, f"state_{width}_{workers}.json"))
+                start = time.perf_counter()
+                service.choose(*sized[0])
+                startup = time.perf_counter() - start
+                start = time.perf_counter()
+                result = [service.place(*box) for box in sized]
+                elapsed = (time.perf_counter() - start) / boxes
+                service.close()
+                service.store.flush()
+                if placements is not None and result != placements:
+                    print("Результаты различаются при разном числе процессов!")
+                placements = result
+                baseline = baseline or elapsed
+                print(f"{f'{width}x{height}':>8} {workers:>10} {startup * 1000:11.1f} {elapsed * 1000:11.2f} "
+                      f"{baseline / elapsed:10.2f}")
+
+
+def benchmark_index(sizes=((8, 12), (40, 60), (200, 300)), box=(5, 4), fill=0.3, seed=5):
+    rng = random.Random(seed)
+    print(f"{'поле':>8} {'скан, мс':>10} {'индекс, мс':>11} {'ускорение':>10} "
+          f"{'add, мс':>9} {'пересчёт, мс':>13}")
+    for width, height in sizes:
+        field = random_field(width, height, fill, rng)
+        index = OccupancyIndex.from_field(field)
+        t_scan = timed(scan_fits, field, *box)
+        t_index = timed(scan_fits, field, *box, index)
+
+        x, y, orientation = wall_numpy.find_best_placement(field, *box)
+        if orientation is None:
+            print(f"{f'{width}x{height}':>8} коробка {box[0]}x{box[1]} не помещается")
+            continue
+        t_add = None
+        for copy in [OccupancyIndex.from_field(field) for _ in range(3)]:
+            start = time.perf_counter()
+            copy.add(x, y, orientation[0], orientation[1])
+            elapsed = time.perf_counter() - start
+            t_add = elapsed if t_add is None else min(t_add, elapsed)
+        wall_logick.place_box(field, orientation[0], orientation[1], x, y, -1)
+        t_build = timed(OccupancyIndex.from_field, field)
+        print(f"{f'{width}x{height}':>8} {t_scan * 1000:10.2f} {t_index * 1000:11.2f} "
+              f"{t_scan / t_index:10.1f} {t_add * 1000:9.3f} {t_build * 1000:13.3f}")
+
+
+if __name__ == "__main__":
+    ok = check_equivalence()
+    ok = sequence_equivalence(8, 12, 40) and ok
+    ok = sequence_equivalence(40, 60, 200) and ok
+    ok = check_index() and ok
+    ok = check_field() and ok
+    ok = check_free() and ok
+    ok = check_free_fragmented() and ok
+    ok = check_compact() and ok
+    ok = check_state_recovery() and ok
+    print("Результаты совпадают." if ok else "Найдены расхождения!")
+    benchmark()
+    benchmark_index()
+    benchmark_field()
+    benchmark_fill()
+    benchmark_compact()
+    benchmark_cache()
+    benchmark_service()
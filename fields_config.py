@@ -0,0 +1,33 @@
+import json
+
+from wall_state import open_store
+
+_configs = {}
+
+DEFAULT_FIELDS = [
+    {"name": "1", "width": 8, "height": 12, "offset_x": 0, "offset_y": 0},
+    {"name": "2", "width": 8, "height": 12, "offset_x": 144, "offset_y": 0},
+]
+
+
+def load_fields_config(filename="fields_config.json"):
+    # Размеры паллет в клетках и сдвиг каждой паллеты относительно поля 1 в координатах робота
+    if filename not in _configs:
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                _configs[filename] = json.load(file)["fields"]
+        except FileNotFoundError:
+            _configs[filename] = DEFAULT_FIELDS
+    return _configs[filename]
+
+
+def field_config(field_name, fields=None):
+    for field in fields or load_fields_config():
+        if field["name"] == field_name:
+            return field
+    raise KeyError(f"Поле {field_name} не описано в конфигурации")
+
+
+def fields_store(fields=None, filename="fields_state.json"):
+    fields = fields or load_fields_config()
+    return open_store({field["name"]: (field["width"], field["height"]) for field in fields}, filename)
@@ -10,6 +10,7 @@ import serial
 import serial.serialutil
 import serial.tools.list_ports
 from host import *
+from vision_framebus import FrameBusReader
 
 tolerance = 5
 
@@ -32,19 +33,10 @@ tablee = False
 angle_1 = 70
 angle_2 = 90
 
-camera = cv2.VideoCapture(1)
-
-
 def generate_frames():
-    while True:
-        success, frame = camera.read()
-        if not success:
-            break
-        else:
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    for frame in FrameBusReader().frames():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
 
 @app.route('/video_feed')
@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from collections import deque
+
+import cv2
+
+# Рабочие точки (ширина кадра после захвата, размер входа модели, пропуск кадров)
+# от лучшего качества к самой лёгкой. None - исходная ширина камеры.
+# "throughput" сначала уменьшает картинку и держит частоту кадров,
+# "accuracy" сначала пропускает кадры и держит разрешение для QR и модели.
+LEVELS = {
+    "throughput": [(None, 640, 0), (960, 640, 0), (640, 640, 0), (640, 480, 0), (640, 416, 0),
+                   (640, 320, 0), (480, 320, 1), (480, 320, 2)],
+    "accuracy": [(None, 640, 0), (None, 640, 1), (None, 640, 2), (960, 640, 2), (960, 640, 3),
+                 (640, 480, 3), (640, 320, 4)],
+}
+
+
+class AdaptiveController:
+    # Держит задержку кадров с инференсом (захват -> вывод) ниже target_ms.
+    # Раз в interval секунд смотрит p90 задержки и загрузку процессора процессом:
+    # превышение цели или загрузка выше cpu_high - шаг к более лёгкой точке;
+    # hold интервалов подряд с запасом (задержка и загрузка ниже headroom от порогов) -
+    # шаг обратно. Выбранная точка и замеры пишутся в metrics_path (JSON).
+    def __init__(self, target_ms=150, prefer="throughput", model=None, interval=2.0, cpu_high=0.9,
+                 headroom=0.6, hold=3, metrics_path="vision_metrics.json"):
+        self.target = target_ms / 1000
+        self.prefer = prefer
+        self.levels = LEVELS[prefer]
+        self.model = model
+        self.interval = interval
+        self.cpu_high = cpu_high
+        self.headroom = headroom
+        self.hold = hold
+        self.metrics_path = metrics_path
+        self.level = 0
+        self.calm = 0
+        self.changes = 0
+        self.frame = 0
+        self.last = None
+        self.latency = deque(maxlen=120)
+        self.inference = deque(maxlen=120)
+        self.last_check = None
+        self.last_cpu = None
+        self.cpu = 0.0
+        self.p90 = None
+        self.apply()
+
+    @property
+    def width(self):
+        return self.levels[self.level][0]
+
+    @property
+    def imgsz(self):
+        return self.levels[self.level][1]
+
+    @property
+    def skip(self):
+        return self.levels[self.level][2]
+
+    def apply(self):
+        # Размер входа меняется только у моделей, которые его поддерживают
+        # (.pt и ONNX, экспортированная с dynamic=True)
+        if self.model is not None and getattr(self.model, "resizable", False):
+            self.model.size = self.imgsz
+
+    def wrap_read(self, read_frame):
+        def read():
+            ret, frame = read_frame()
+            width = self.width
+            if ret and width and frame.shape[1] > width:
+                height = round(frame.shape[0] * width / frame.shape[1])
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            return ret, frame
+
+        return read
+
+    def wrap(self, detect):
+        # Из каждых skip + 1 кадров модель видит один, остальные получают его детекции
+        def stage(packet):
+            self.frame += 1
+            if self.last is not None and self.frame % (self.skip + 1):
+                packet.boxes = [dict(box) for box in self.last.boxes]
+                packet.detections = self.last.detections
+                return
+            start = time.perf_counter()
+            detect(packet)
+            self.inference.append(time.perf_counter() - start)
+            packet.inferred = True
+            self.last = packet
+
+        return stage
+
+    def wrap_publish(self, publish):
+        def stage(packet):
+            keep_running = publish(packet)
+            self.observe(packet)
+            return keep_running
+
+        return stage
+
+    def observe(self, packet, now=None):
+        now = time.perf_counter() if now is None else now
+        if packet.inferred:
+            self.latency.append(now - packet.captured)
+        if self.last_check is None:
+            self.last_check, self.last_cpu = now, time.process_time()
+        elif now - self.last_check >= self.interval:
+            self.decide(now)
+
+    def decide(self, now):
+        cpu = time.process_time()
+        self.cpu = (cpu - self.last_cpu) / max(now - self.last_check, 1e-9) / (os.cpu_count() or 1)
+        self.last_check, self.last_cpu = now, cpu
+        if not self.latency:
+            return
+        latency = sorted(self.latency)
+        self.p90 = latency[min(len(latency) - 1, int(len(latency) * 0.9))]
+        self.latency.clear()
+
+        level = self.level
+        if self.p90 > self.target or self.cpu > self.cpu_high:
+            self.calm = 0
+            level = min(self.level + 1, len(self.levels) - 1)
+        elif self.p90 < self.target * self.headroom and self.cpu < self.cpu_high * self.headroom:
+            self.calm += 1
+            if self.calm >= self.hold:
+                self.calm = 0
+                level = max(self.level - 1, 0)
+        else:
+            self.calm = 0
+
+        if level != self.level:
+            self.level = level
+            self.changes += 1
+            self.apply()
+            print(f"Рабочая точка {self.level}: ширина кадра {self.width or 'исходная'}, "
+                  f"вход модели {self.imgsz}, пропуск кадров {self.skip} "
+                  f"(p90 {self.p90 * 1000:.0f} мс, CPU {self.cpu * 100:.0f}%)")
+        self.export()
+
+    def metrics(self):
+        inference = sum(self.inference) / len(self.inference) if self.inference else None
+        return {
+            "prefer": self.prefer,
+            "level": self.level,
+            "capture_width": self.width,
+            "imgsz": self.imgsz,
+            "skip": self.skip,
+            "target_ms": round(self.target * 1000, 1),
+            "latency_p90_ms": round(self.p90 * 1000, 1) if self.p90 is not None else None,
+            "inference_ms": round(inference * 1000, 1) if inference is not None else None,
+            "cpu": round(self.cpu, 3),
+            "changes": self.changes,
+            "updated": time.time(),
+        }
+
+    def export(self):
+        if not self.metrics_path:
+            return
+        with open(self.metrics_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.metrics(), file, ensure_ascii=False, indent=2)
+        os.replace(self.metrics_path + ".tmp", self.metrics_path)
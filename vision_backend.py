@@ -0,0 +1,199 @@
+import ast
+import json
+import os
+
+import cv2
+import numpy as np
+
+# Бэкенды детектора коробок с общим интерфейсом: names и predict(images) -> [Prediction].
+# size - размер входа модели; его можно менять между вызовами, если resizable.
+# torch и ultralytics импортируются только для .pt-модели, ONNX-модель
+# запускается через onnxruntime или OpenCV DNN с предобработкой в numpy.
+
+
+class Prediction:
+    def __init__(self, xyxy, confidence, class_id):
+        self.xyxy = xyxy
+        self.confidence = confidence
+        self.class_id = class_id
+
+
+def letterbox(image, size=640, color=114, stride=None):
+    # Как LetterBox в ultralytics: масштаб с сохранением пропорций и рамка до квадрата,
+    # а со stride - только до кратного stride прямоугольника (для моделей с dynamic=True)
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = size - new_width, size - new_height
+    if stride:
+        pad_x, pad_y = pad_x % stride, pad_y % stride
+    left, top = round(pad_x / 2 - 0.1), round(pad_y / 2 - 0.1)
+    canvas = np.full((new_height + pad_y, new_width + pad_x, 3), color, dtype=np.uint8)
+    canvas[top:top + new_height, left:left + new_width] = image
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255
+    return blob, scale, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        width = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        height = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = width * height
+        order = rest[inter / (area[i] + area[rest] - inter + 1e-9) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output, scale, pad, image_shape, conf=0.25, iou=0.7, max_det=300):
+    # output - (4 + классов, N) из головы YOLOv8: cx, cy, w, h и оценки классов
+    output = output.T
+    scores = output[:, 4:]
+    class_id = scores.argmax(axis=1)
+    confidence = scores[np.arange(len(scores)), class_id]
+    mask = confidence > conf
+    boxes, confidence, class_id = output[mask, :4], confidence[mask], class_id[mask]
+
+    xyxy = np.empty_like(boxes)
+    xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+    xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+    xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+    xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+    # Сдвиг рамок на номер класса, чтобы NMS не подавлял рамки разных классов
+    keep = nms(xyxy + class_id[:, None] * 7680.0, confidence, iou)[:max_det]
+    xyxy, confidence, class_id = xyxy[keep], confidence[keep], class_id[keep]
+
+    xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / scale).clip(0, image_shape[1])
+    xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / scale).clip(0, image_shape[0])
+    return Prediction(xyxy, confidence, class_id.astype(int))
+
+
+def names_path(model_path):
+    return os.path.splitext(model_path)[0] + ".names.json"
+
+
+def load_names(model_path, metadata=None):
+    if os.path.exists(names_path(model_path)):
+        with open(names_path(model_path), "r", encoding="utf-8") as file:
+            return {int(key): value for key, value in json.load(file).items()}
+    if metadata and "names" in metadata:
+        return ast.literal_eval(metadata["names"])
+    return {0: "box"}
+
+
+class UltralyticsBackend:
+    def __init__(self, weights, conf=0.25, iou=0.7):
+        import torch
+        from ultralytics import YOLO
+
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        print(f"Using device: {self.device}")
+        self.model = YOLO(weights)
+        self.model.to(self.device)
+        self.names = self.model.names
+        self.size, self.conf, self.iou = 640, conf, iou
+        self.resizable = True
+
+    def predict(self, images):
+        results = self.model(images, imgsz=self.size, conf=self.conf, iou=self.iou)
+        return [Prediction(result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy(),
+                           result.boxes.cls.cpu().numpy().astype(int)) for result in results]
+
+
+class OnnxRuntimeBackend:
+    def __init__(self, path, size=640, conf=0.25, iou=0.7, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0]
+        # Модель, экспортированная без dynamic=True, принимает только один квадратный кадр;
+        # с dynamic=True - пакет кадров и прямоугольный вход, как у PyTorch-модели
+        self.batched = not isinstance(self.input.shape[0], int)
+        self.stride = 32 if not isinstance(self.input.shape[2], int) else None
+        self.size, self.conf, self.iou = size, conf, iou
+        self.resizable = self.stride is not None
+        self.names = load_names(path, self.session.get_modelmeta().custom_metadata_map)
+
+    def predict(self, images):
+        same_shape = len({image.shape for image in images}) == 1
+        prepared = [letterbox(image, self.size, stride=self.stride if same_shape else None) for image in images]
+        if self.batched:
+            outputs = self.session.run(None, {self.input.name: np.stack([blob for blob, _, _ in prepared])})[0]
+        else:
+            outputs = [self.session.run(None, {self.input.name: blob[None]})[0][0] for blob, _, _ in prepared]
+        return [postprocess(output, scale, pad, image.shape, self.conf, self.iou)
+                for output, (_, scale, pad), image in zip(outputs, prepared, images)]
+
+
+class OpenCvDnnBackend:
+    def __init__(self, path, size=640, conf=0.25, iou=0.7):
+        self.net = cv2.dnn.readNetFromONNX(path)
+        self.size, self.conf, self.iou = size, conf, iou
+        self.resizable = False
+        self.names = load_names(path)
+
+    def predict(self, images):
+        predictions = []
+        for image in images:
+            blob, scale, pad = letterbox(image, self.size)
+            self.net.setInput(blob[None])
+            predictions.append(postprocess(self.net.forward()[0], scale, pad, image.shape, self.conf, self.iou))
+        return predictions
+
+
+def load_backend(path, engine=None, conf=0.25, iou=0.7):
+    # path - .pt (ultralytics) или .onnx; engine для ONNX - "onnxruntime" или "opencv"
+    if path.endswith(".onnx"):
+        if engine == "opencv":
+            return OpenCvDnnBackend(path, conf=conf, iou=iou)
+        return OnnxRuntimeBackend(path, conf=conf, iou=iou)
+    return UltralyticsBackend(path, conf=conf, iou=iou)
+
+
+class CalibrationReader:
+    # Кадры с ленты для статической INT8-квантизации
+    def __init__(self, input_name, images, size=640):
+        self.batches = iter([{input_name: letterbox(image, size)[0][None]} for image in images])
+
+    def get_next(self):
+        return next(self.batches, None)
+
+
+def export_onnx(weights, size=640, dynamic=True):
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    path = model.export(format="onnx", imgsz=size, dynamic=dynamic, simplify=False)
+    with open(names_path(path), "w", encoding="utf-8") as file:
+        json.dump({str(key): value for key, value in model.names.items()}, file, ensure_ascii=False)
+    return path
+
+
+def quantize_onnx(path, calibration_images=None, size=640):
+    # С кадрами для калибровки - статическая квантизация (QDQ), иначе динамическая
+    # только весов. INT8-модель запускается через onnxruntime.
+    import shutil
+    import onnxruntime
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantType, QuantFormat
+
+    output = os.path.splitext(path)[0] + "_int8.onnx"
+    if calibration_images:
+        input_name = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        quantize_static(path, output, CalibrationReader(input_name, calibration_images, size),
+                        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8, per_channel=True)
+    else:
+        quantize_dynamic(path, output, weight_type=QuantType.QUInt8)
+    if os.path.exists(names_path(path)):
+        shutil.copyfile(names_path(path), names_path(output))
+    return output
@@ -0,0 +1,248 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+# Результаты распознавания от скриптов камер к host.py: вместо текста в output.txt
+# каждый кадр отправляется списком записей по локальному сокету (TCP на 127.0.0.1,
+# работает и на Windows). Подписчик держит последний кадр каждой камеры и будит
+# ожидающих, как только на кадре появляется посылка с прочитанным QR.
+# Кадр идёт JSON-ом (send_bytes), а не pickle: подписчик собирает DetectionRecord
+# только из проверенных полей, чужой процесс на порту не может выполнить у него код.
+
+ADDRESS = ("127.0.0.1", 6010)
+KEY_ENV = "VISION_CHANNEL_KEY"
+KEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vision_channel.key")
+MAX_MESSAGE = 1 << 20
+QR_PATTERN = r"(?:Поле:\s*(\d+)\s*)?Ширина:\s*(\d+)\s*Высота:\s*(\d+)(?:\s*Вес:\s*(\d+))?"
+
+
+def load_authkey(path=KEY_FILE):
+    # Ключ канала: переменная окружения VISION_CHANNEL_KEY, иначе файл vision_channel.key
+    # рядом со скриптами. Файла нет - его создаёт первый запущенный процесс, остальные читают
+    key = os.getenv(KEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    try:
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            file.write(secrets.token_hex(32))
+    for _ in range(100):
+        with open(path, "r", encoding="utf-8") as file:
+            key = file.read().strip()
+        if key:
+            return key.encode("utf-8")
+        # Другой процесс только что создал файл и ещё не дописал ключ
+        time.sleep(0.01)
+    raise IOError(f"Пустой ключ канала в {path}")
+
+
+def parse_qr(text):
+    match = re.search(QR_PATTERN, text or "")
+    if not match:
+        return None, None, None, None
+    return tuple(int(value) if value else None for value in match.groups())
+
+
+def _check(value, types, name):
+    # bool - тоже int, но в числовых полях ему не место
+    if isinstance(value, bool) and bool not in types or not isinstance(value, types):
+        raise ValueError(f"Поле {name}: недопустимое значение {value!r}")
+    return value
+
+
+class DetectionRecord:
+    # Одна посылка (или один QR-код) на кадре. timestamp - time.time() момента захвата,
+    # qr - текст QR ("" - не прочитан), field/width/height/weight - поля из текста QR
+    FIELDS = {"timestamp": (int, float), "source": (str,), "frame": (int,), "track": (int, type(None)),
+              "bbox": (list,), "centered": (bool,), "qr": (str, type(None)), "field": (int, type(None)),
+              "width": (int, type(None)), "height": (int, type(None)), "weight": (int, type(None))}
+
+    def __init__(self, timestamp, source, frame, track, bbox, centered, qr=None,
+                 field=None, width=None, height=None, weight=None):
+        self.timestamp = timestamp
+        self.source = source
+        self.frame = frame
+        self.track = track
+        self.bbox = bbox
+        self.centered = centered
+        self.qr = qr
+        self.field = field
+        self.width = width
+        self.height = height
+        self.weight = weight
+
+    @classmethod
+    def create(cls, timestamp, source, frame, track, bbox, centered, qr=None):
+        # Значения numpy приводятся к обычным числам, иначе запись не уйдёт в JSON
+        return cls(float(timestamp), str(source), int(frame), None if track is None else int(track),
+                   [round(float(value), 1) for value in bbox], bool(centered), qr, *parse_qr(qr))
+
+    @classmethod
+    def from_dict(cls, data):
+        # Запись, пришедшая по каналу: только известные поля известных типов, иначе ValueError
+        if not isinstance(data, dict) or set(data) != set(cls.FIELDS):
+            raise ValueError(f"Недопустимая запись: {data!r}")
+        for name, types in cls.FIELDS.items():
+            _check(data[name], types, name)
+        if len(data["bbox"]) != 4:
+            raise ValueError(f"Поле bbox: недопустимое значение {data['bbox']!r}")
+        for value in data["bbox"]:
+            _check(value, (int, float), "bbox")
+        return cls(**data)
+
+    @property
+    def has_size(self):
+        return self.width is not None and self.height is not None
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"DetectionRecord({self.as_dict()})"
+
+
+def encode_message(source, frame, timestamp, records):
+    return json.dumps({"source": str(source), "frame": int(frame), "timestamp": float(timestamp),
+                       "records": [record.as_dict() for record in records]}).encode("utf-8")
+
+
+def decode_message(data):
+    # Кадр из канала: dict с проверенными полями и записями DetectionRecord, иначе ValueError
+    message = json.loads(data.decode("utf-8"))
+    if not isinstance(message, dict) or set(message) != {"source", "frame", "timestamp", "records"}:
+        raise ValueError("Недопустимый кадр")
+    _check(message["source"], (str,), "source")
+    _check(message["frame"], (int,), "frame")
+    _check(message["timestamp"], (int, float), "timestamp")
+    _check(message["records"], (list,), "records")
+    message["records"] = [DetectionRecord.from_dict(record) for record in message["records"]]
+    return message
+
+
+def capture_time(packet):
+    # FramePacket.captured - perf_counter, в записи нужно время, понятное другому процессу
+    return time.time() - (time.perf_counter() - packet.captured)
+
+
+class DetectionPublisher:
+    # Рассылает кадры всем подключённым подписчикам. Новый подписчик сразу получает
+    # последний кадр каждой камеры; отключившийся удаляется при следующей отправке.
+    def __init__(self, address=ADDRESS, authkey=None):
+        self.listener = Listener(address, authkey=authkey or load_authkey())
+        self.clients = []
+        self.last = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.published = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            with self.lock:
+                try:
+                    for message in self.last.values():
+                        connection.send_bytes(message)
+                except OSError:
+                    connection.close()
+                    continue
+                self.clients.append(connection)
+
+    def publish(self, source, frame, timestamp, records):
+        message = encode_message(source, frame, timestamp, records)
+        with self.lock:
+            self.last[source] = message
+            for connection in list(self.clients):
+                try:
+                    connection.send_bytes(message)
+                except OSError:
+                    connection.close()
+                    self.clients.remove(connection)
+            self.published += 1
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+        with self.lock:
+            for connection in self.clients:
+                connection.close()
+            self.clients = []
+
+
+class DetectionSubscriber:
+    # Соединение с публикатором в фоновом потоке (с переподключением). Пока
+    # соединения нет, кадров нет: устаревшие записи не выдаются.
+    def __init__(self, address=ADDRESS, authkey=None, retry=1.0):
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.retry = retry
+        self.rejected = 0
+        self.condition = threading.Condition()
+        self.frames = {}
+        self.connected = False
+        self.thread = None
+
+    def start(self):
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                connection = Client(self.address, authkey=self.authkey)
+            except (OSError, EOFError, AuthenticationError):
+                time.sleep(self.retry)
+                continue
+            with self.condition:
+                self.connected = True
+            try:
+                while True:
+                    try:
+                        message = decode_message(connection.recv_bytes(MAX_MESSAGE))
+                    except ValueError:
+                        self.rejected += 1
+                        continue
+                    with self.condition:
+                        self.frames[message["source"]] = message
+                        self.condition.notify_all()
+            except (OSError, EOFError):
+                pass
+            finally:
+                connection.close()
+                with self.condition:
+                    self.connected = False
+                    self.frames = {}
+                    self.condition.notify_all()
+
+    def latest(self, source="1"):
+        self.start()
+        with self.condition:
+            return self.frames.get(source)
+
+    def _find_qr(self, source):
+        message = self.frames.get(source)
+        if message is None:
+            return None
+        for record in message["records"]:
+            if record.centered and record.has_size:
+                return record
+        return None
+
+    def wait_for_qr(self, timeout=None, source="1"):
+        # Посылка в центре кадра с прочитанными размерами; None, если за timeout её не было
+        self.start()
+        with self.condition:
+            self.condition.wait_for(lambda: self._find_qr(source) is not None, timeout)
+            return self._find_qr(source)
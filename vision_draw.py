@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+@lru_cache(maxsize=None)
+def load_font(font_size, font_name="arial.ttf"):
+    try:
+        return ImageFont.truetype(font_name, font_size)
+    except IOError:
+        print("Шрифт Arial не найден. Используется стандартный шрифт.")
+        return ImageFont.load_default()
+
+
+class TextOverlay:
+    # Надписи рендерятся через PIL один раз в маленький BGR-фрагмент с альфа-маской
+    # и дальше накладываются на кадр numpy-смешиванием прямо в его памяти,
+    # без перевода всего кадра BGR -> RGB -> PIL -> numpy -> BGR
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.patches = OrderedDict()
+
+    def patch(self, text, font_size, font_color):
+        key = (text, font_size, font_color)
+        if key in self.patches:
+            self.patches.move_to_end(key)
+            return self.patches[key]
+        font = load_font(font_size)
+        left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
+        mask = Image.new("L", (max(1, right), max(1, bottom)))
+        ImageDraw.Draw(mask).text((0, 0), text, font=font, fill=255)
+        alpha = np.asarray(mask, dtype=np.float32)[:, :, None] / 255
+        color = np.array(font_color[::-1], dtype=np.float32)
+        self.patches[key] = (alpha, color * alpha)
+        while len(self.patches) > self.maxsize:
+            self.patches.popitem(last=False)
+        return self.patches[key]
+
+    def draw(self, image, text, position, font_size=30, font_color=(0, 255, 0)):
+        alpha, colored = self.patch(text, font_size, font_color)
+        x, y = position
+        height = min(alpha.shape[0], image.shape[0] - y)
+        width = min(alpha.shape[1], image.shape[1] - x)
+        if height <= 0 or width <= 0:
+            return image
+        region = image[y:y + height, x:x + width]
+        a = alpha[:height, :width]
+        region[:] = (region * (1 - a) + colored[:height, :width]).astype(image.dtype)
+        return image
+
+
+overlay = TextOverlay()
+
+
+def draw_russian_text(image, text, position, font_size=30, font_color=(0, 255, 0)):
+    return overlay.draw(image, text, position, font_size, font_color)
@@ -0,0 +1,238 @@
+import os
+import time
+
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+
+# Последний кадр камеры в общей памяти: процесс распознавания пишет кадр (и его JPEG)
+# один раз, любое число клиентов /video_feed в других процессах читает без своей
+# камеры и без повторного кодирования.
+#
+# Разметка: заголовок, заголовки слотов и кольцо из slots слотов с кадром BGR и JPEG.
+# Слот защищён счётчиком как seqlock: нечётный - идёт запись. Читатель копирует
+# последний слот и проверяет, что счётчик не изменился; если писатель успел
+# перезаписать слот, читатель берёт следующий свежий кадр. Писатель никого не ждёт.
+# Каждое создание шины пишет новое поколение (H_GENERATION): если писатель перезапущен
+# с другим размером кадра в том же сегменте, читатель видит смену поколения и
+# подключается заново, а не режет слоты по старой разметке.
+
+BUS_NAME = "logistix_frames"
+MAGIC = 0x4C4F4749
+HEADER = 8
+SLOT_HEADER = 4
+# Поля заголовка
+H_MAGIC, H_WIDTH, H_HEIGHT, H_SLOTS, H_JPEG_SIZE, H_LATEST, H_READER_SEEN, H_GENERATION = range(HEADER)
+# Поля заголовка слота
+S_SEQ, S_FRAME, S_JPEG_LENGTH, S_TIMESTAMP = range(SLOT_HEADER)
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def bus_size(width, height, slots):
+    return (HEADER + SLOT_HEADER * slots) * 8 + slots * width * height * 3 * 2
+
+
+# Шины, созданные этим процессом: их регистрацию в resource_tracker снимать нельзя
+created = set()
+
+
+def attach_memory(name):
+    # До Python 3.13 resource_tracker на Linux удаляет сегмент при выходе любого
+    # процесса, который его открыл; читатель не должен удалять кадры писателя
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name)
+        if os.name != "nt" and name not in created:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+class BusLayout:
+    def __init__(self, memory):
+        self.memory = memory
+        self.header = np.ndarray((HEADER,), dtype=np.int64, buffer=memory.buf)
+        self.generation = int(self.header[H_GENERATION])
+        width, height, slots = (int(value) for value in self.header[[H_WIDTH, H_HEIGHT, H_SLOTS]])
+        self.shape = (height, width, 3)
+        self.slot_headers = np.ndarray((slots, SLOT_HEADER), dtype=np.int64, buffer=memory.buf, offset=HEADER * 8)
+        offset = (HEADER + SLOT_HEADER * slots) * 8
+        frame_size = width * height * 3
+        self.frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=memory.buf, offset=offset)
+        self.jpegs = np.ndarray((slots, frame_size), dtype=np.uint8, buffer=memory.buf,
+                                offset=offset + slots * frame_size)
+
+    def current(self):
+        return int(self.header[H_MAGIC]) == MAGIC and int(self.header[H_GENERATION]) == self.generation
+
+    def release(self):
+        self.header = self.slot_headers = self.frames = self.jpegs = None
+        self.memory.close()
+
+
+class FrameBus:
+    # Сторона процесса распознавания. Размер шины задаётся первым кадром, кадры
+    # другого размера приводятся к нему. JPEG кодируется, только пока кто-то
+    # смотрит видео (читатель отмечался за последние reader_timeout секунд).
+    def __init__(self, name=BUS_NAME, slots=3, jpeg=True, quality=80, reader_timeout=2.0):
+        self.name = name
+        self.slots = slots
+        self.jpeg = jpeg
+        self.quality = quality
+        self.reader_timeout = reader_timeout
+        self.layout = None
+        self.memory = None
+        self.published = 0
+        self.encoded = 0
+
+    def _create(self, width, height):
+        size = bus_size(width, height, self.slots)
+        created.add(self.name)
+        try:
+            self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            # Сегмент остался от прошлого запуска (или его держит открытым читатель)
+            self.memory = attach_memory(self.name)
+            if self.memory.size < size:
+                # Читатели старого сегмента увидят, что он больше не шина, и подключатся к новому
+                np.ndarray((1,), dtype=np.int64, buffer=self.memory.buf)[H_MAGIC] = 0
+                self.memory.close()
+                self.memory.unlink()
+                self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+        header = np.ndarray((HEADER,), dtype=np.int64, buffer=self.memory.buf)
+        header[:] = 0
+        header[[H_WIDTH, H_HEIGHT, H_SLOTS]] = width, height, self.slots
+        header[H_JPEG_SIZE] = width * height * 3
+        header[H_GENERATION] = time.time_ns()
+        header[H_MAGIC] = MAGIC
+        del header
+        self.layout = BusLayout(self.memory)
+
+    def readers_active(self):
+        return now_ms() - int(self.layout.header[H_READER_SEEN]) < self.reader_timeout * 1000
+
+    def publish(self, image):
+        if self.layout is None:
+            self._create(image.shape[1], image.shape[0])
+        layout = self.layout
+        if image.shape != layout.shape:
+            image = cv2.resize(image, (layout.shape[1], layout.shape[0]))
+
+        encoded = None
+        if self.jpeg and self.readers_active():
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if ok and buffer.size <= layout.jpegs.shape[1]:
+                encoded = buffer.reshape(-1)
+                self.encoded += 1
+
+        frame = int(layout.header[H_LATEST]) + 1
+        slot = frame % self.slots
+        state = layout.slot_headers[slot]
+        state[S_SEQ] += 1
+        layout.frames[slot] = image
+        if encoded is not None:
+            layout.jpegs[slot, :encoded.size] = encoded
+        state[S_JPEG_LENGTH] = 0 if encoded is None else encoded.size
+        state[S_FRAME] = frame
+        state[S_TIMESTAMP] = now_ms()
+        state[S_SEQ] += 1
+        layout.header[H_LATEST] = frame
+        self.published += 1
+
+    def close(self):
+        if self.layout is not None:
+            self.layout.release()
+            self.layout = None
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass
+            created.discard(self.name)
+
+
+class FrameBusReader:
+    # Сторона веб-сервера. Подключается к шине, когда процесс распознавания её создаст,
+    # и переподключается, если кадры перестали приходить (процесс перезапущен).
+    def __init__(self, name=BUS_NAME, poll=0.01, stale=2.0):
+        self.name = name
+        self.poll = poll
+        self.stale = stale
+        self.layout = None
+        self.skipped = 0
+        self.reattached = 0
+
+    def attach(self):
+        if self.layout is not None:
+            return True
+        try:
+            memory = attach_memory(self.name)
+        except FileNotFoundError:
+            return False
+        if np.ndarray((1,), dtype=np.int64, buffer=memory.buf)[0] != MAGIC:
+            memory.close()
+            return False
+        self.layout = BusLayout(memory)
+        return True
+
+    def detach(self):
+        if self.layout is not None:
+            self.layout.release()
+            self.layout = None
+
+    def read(self, jpeg=True, attempts=3):
+        # (номер кадра, JPEG в bytes или копия кадра) или None
+        for _ in range(attempts):
+            if not self.attach():
+                return None
+            layout = self.layout
+            if not layout.current():
+                self.detach()
+                self.reattached += 1
+                continue
+            layout.header[H_READER_SEEN] = now_ms()
+            frame = int(layout.header[H_LATEST])
+            if frame == 0:
+                return None
+            state = layout.slot_headers[frame % len(layout.slot_headers)]
+            seq = int(state[S_SEQ])
+            if seq % 2 or int(state[S_FRAME]) != frame:
+                continue
+            if jpeg:
+                length = int(state[S_JPEG_LENGTH])
+                data = layout.jpegs[frame % len(layout.slot_headers), :length].tobytes() if length else None
+            else:
+                data = layout.frames[frame % len(layout.slot_headers)].copy()
+            # Кадр годен, если за время копирования слот не переписан и шина не пересоздана
+            if int(state[S_SEQ]) == seq and layout.current():
+                return frame, data
+        return None
+
+    def frames(self, jpeg=True):
+        # Бесконечный поток новых кадров для одного клиента. Медленный клиент
+        # пропускает промежуточные кадры и всегда получает самый свежий.
+        last = generation = 0
+        last_change = time.perf_counter()
+        try:
+            while True:
+                result = self.read(jpeg)
+                if result is not None and self.layout.generation != generation:
+                    # Шина пересоздана: нумерация кадров начинается заново
+                    last, generation = 0, self.layout.generation
+                if result is not None and result[0] != last and result[1] is not None:
+                    frame, data = result
+                    if last and frame > last + 1:
+                        self.skipped += frame - last - 1
+                    last, last_change = frame, time.perf_counter()
+                    yield data
+                    continue
+                if time.perf_counter() - last_change > self.stale:
+                    self.detach()
+                    last, last_change = 0, time.perf_counter()
+                time.sleep(self.poll)
+        finally:
+            # Клиент отключился - генератор закрывает Flask
+            self.detach()
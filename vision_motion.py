@@ -0,0 +1,59 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    # Дешёвый детектор изменений перед моделью: кадр уменьшается до width пикселей
+    # по ширине, переводится в серый и сравнивается с кадром последнего инференса.
+    # Изменение считается, если доля пикселей, отличающихся больше threshold,
+    # превышает min_area. Раз в heartbeat секунд инференс выполняется в любом случае.
+    def __init__(self, width=64, threshold=25, min_area=0.002, heartbeat=2.0):
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.heartbeat = heartbeat
+        self.reference = None
+        self.last_run = 0.0
+        self.runs = 0
+        self.skipped = 0
+
+    def small(self, image):
+        height, width = image.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return cv2.GaussianBlur(cv2.resize(gray, size, interpolation=cv2.INTER_AREA), (3, 3), 0)
+
+    def changed(self, image, now=None):
+        small = self.small(image)
+        now = time.perf_counter() if now is None else now
+        if (self.reference is None or self.reference.shape != small.shape
+                or (self.heartbeat and now - self.last_run >= self.heartbeat)):
+            moved = True
+        else:
+            diff = cv2.absdiff(small, self.reference)
+            moved = np.count_nonzero(diff > self.threshold) > self.min_area * diff.size
+        if moved:
+            self.reference = small
+            self.last_run = now
+            self.runs += 1
+        else:
+            self.skipped += 1
+        return moved
+
+    def wrap(self, detect):
+        # Стадия инференса, которая на неподвижной сцене повторяет прошлые детекции
+        last = []
+
+        def stage(packet):
+            if last and not self.changed(packet.image, packet.captured):
+                packet.boxes = [dict(box) for box in last[0].boxes]
+                packet.detections = last[0].detections
+                return
+            if not last:
+                self.changed(packet.image, packet.captured)
+            detect(packet)
+            last[:] = [packet]
+
+        return stage
@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class StageStats:
+    # Скользящая статистика стадии: кадров в секунду и среднее время обработки кадра
+    def __init__(self, name, window=60):
+        self.name = name
+        self.finished = deque(maxlen=window)
+        self.durations = deque(maxlen=window)
+        self.frames = 0
+        self.lock = threading.Lock()
+
+    def record(self, duration):
+        with self.lock:
+            self.finished.append(time.perf_counter())
+            self.durations.append(duration)
+            self.frames += 1
+
+    def snapshot(self):
+        with self.lock:
+            fps = 0.0
+            if len(self.finished) > 1:
+                fps = (len(self.finished) - 1) / max(self.finished[-1] - self.finished[0], 1e-9)
+            busy = sum(self.durations) / len(self.durations) if self.durations else 0.0
+            return {"fps": round(fps, 2), "busy_ms": round(busy * 1000, 2), "frames": self.frames}
+
+
+class LatestFrame:
+    # Слот на один кадр: новый кадр вытесняет непрочитанный, поэтому инференс
+    # всегда берёт самый свежий кадр, а не очередь устаревших
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.item is not None or self.closed, timeout):
+                return None
+            item, self.item = self.item, None
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FramePacket:
+    def __init__(self, seq, image):
+        self.seq = seq
+        self.image = image
+        self.captured = time.perf_counter()
+        self.boxes = []
+        self.detections = None
+        self.qr = []
+        self.inferred = False
+
+
+STOP = object()
+
+
+class VisionPipeline:
+    # Захват -> инференс -> QR -> вывод в отдельных потоках.
+    # read_frame() возвращает (ok, frame) как cv2.VideoCapture.read;
+    # detect, decode и publish получают FramePacket и дописывают в него результаты.
+    # publish выполняется в вызывающем потоке (там же cv2.imshow) и возвращает False для остановки.
+    def __init__(self, read_frame, detect, decode, publish, queue_size=2, report_every=5.0):
+        self.read_frame = read_frame
+        self.detect = detect
+        self.decode = decode
+        self.publish = publish
+        self.report_every = report_every
+        self.latest = LatestFrame()
+        self.detected = queue.Queue(maxsize=queue_size)
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "qr", "output")}
+        self.latency = deque(maxlen=60)
+        self.threads = []
+
+    def _put(self, target, item):
+        # Ограниченная очередь: если следующая стадия не успевает, ждём её, пока не остановлены
+        while not self.stop_event.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _capture(self):
+        seq = 0
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            ret, frame = self.read_frame()
+            if not ret:
+                break
+            seq += 1
+            self.latest.put(FramePacket(seq, frame))
+            self.stats["capture"].record(time.perf_counter() - start)
+        self.latest.close()
+
+    def _inference(self):
+        while not self.stop_event.is_set():
+            packet = self.latest.get(timeout=0.1)
+            if packet is None:
+                if self.latest.closed:
+                    break
+                continue
+            start = time.perf_counter()
+            self.detect(packet)
+            self.stats["inference"].record(time.perf_counter() - start)
+            self._put(self.detected, packet)
+        self._put(self.detected, STOP)
+
+    def _qr(self):
+        while not self.stop_event.is_set():
+            try:
+                packet = self.detected.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if packet is STOP:
+                break
+            start = time.perf_counter()
+            self.decode(packet)
+            self.stats["qr"].record(time.perf_counter() - start)
+            self._put(self.decoded, packet)
+        self._put(self.decoded, STOP)
+
+    def start(self):
+        for target in (self._capture, self._inference, self._qr):
+            thread = threading.Thread(target=target, name=target.__name__.strip("_"), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        self.latest.close()
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+
+    def report(self):
+        report = {name: stats.snapshot() for name, stats in self.stats.items()}
+        latency = sorted(self.latency)
+        report["latency_ms"] = round(latency[len(latency) // 2] * 1000, 2) if latency else None
+        report["dropped"] = self.latest.dropped
+        return report
+
+    def print_report(self):
+        report = self.report()
+        stages = ", ".join(f"{name} {report[name]['fps']:.1f} к/с ({report[name]['busy_ms']:.1f} мс)"
+                           for name in self.stats)
+        print(f"Стадии: {stages}; задержка кадра {report['latency_ms']} мс, пропущено кадров {report['dropped']}")
+
+    def run(self):
+        self.start()
+        last_report = time.perf_counter()
+        try:
+            while True:
+                try:
+                    packet = self.decoded.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if packet is STOP:
+                    break
+                start = time.perf_counter()
+                keep_running = self.publish(packet)
+                now = time.perf_counter()
+                self.stats["output"].record(now - start)
+                self.latency.append(now - packet.captured)
+                if self.report_every and now - last_report >= self.report_every:
+                    self.print_report()
+                    last_report = now
+                if keep_running is False:
+                    break
+        finally:
+            self.stop()
+        return self.report()
@@ -0,0 +1,240 @@
+import argparse
+import queue
+import threading
+import time
+from functools import partial
+
+from vision_pipeline import FramePacket, StageStats, STOP
+from vision_source import open_source
+
+
+class FrameSlots:
+    # По одному свежему кадру на источник с общим условием ожидания:
+    # инференс ждёт первый кадр, затем до max_wait добирает кадры остальных камер
+    def __init__(self, names):
+        self.condition = threading.Condition()
+        self.frames = {}
+        self.open = set(names)
+        self.dropped = 0
+
+    def put(self, name, packet):
+        with self.condition:
+            if name in self.frames:
+                self.dropped += 1
+            self.frames[name] = packet
+            self.condition.notify_all()
+
+    def close(self, name):
+        with self.condition:
+            self.open.discard(name)
+            self.condition.notify_all()
+
+    def take(self, max_batch, max_wait, timeout=0.1):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.frames or not self.open, timeout):
+                return []
+            deadline = time.perf_counter() + max_wait
+            while len(self.frames) < min(max_batch, len(self.open)):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            names = sorted(self.frames, key=lambda name: self.frames[name].captured)[:max_batch]
+            return [(name, self.frames.pop(name)) for name in names]
+
+
+class MultiSourceServer:
+    # Одна модель на все камеры. detect_batch(packets) заполняет boxes/detections
+    # у всех пакетов одним вызовом модели; decode и publish у каждого источника свои
+    # и выполняются в его собственном потоке, так что медленный вывод одной камеры
+    # не задерживает инференс остальных.
+    def __init__(self, sources, detect_batch, decoders, publishers, max_batch=4, max_wait=0.01,
+                 queue_size=2, report_every=5.0, gates=None):
+        self.sources = sources
+        self.detect_batch = detect_batch
+        self.decoders = decoders
+        self.publishers = publishers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.report_every = report_every
+        self.slots = FrameSlots(sources)
+        self.outputs = {name: queue.Queue(maxsize=queue_size) for name in sources}
+        self.stop_event = threading.Event()
+        self.stats = {"inference": StageStats("inference")}
+        self.stats.update({name: StageStats(name) for name in sources})
+        self.batch_sizes = []
+        self.threads = []
+        # Детектор движения на камеру: неизменившийся кадр не идёт в пакет,
+        # а получает детекции последнего обработанного кадра этой камеры.
+        # Пока изменившийся кадр ждёт инференса (pending), неизменившиеся кадры после него
+        # придерживаются (held, только самый свежий) и выходят за ним с его детекциями
+        self.gates = gates or {}
+        self.last = {}
+        self.pending = {}
+        self.held = {}
+        self.lock = threading.Lock()
+        self.superseded = 0
+        self.stale = 0
+
+    def _capture(self, name):
+        source = self.sources[name]
+        seq = 0
+        while not self.stop_event.is_set():
+            ret, frame = source.read()
+            if not ret:
+                break
+            seq += 1
+            packet = FramePacket(seq, frame)
+            gate = self.gates.get(name)
+            if gate is not None and not gate.changed(frame):
+                with self.lock:
+                    previous = self.last.get(name)
+                    if name in self.pending:
+                        if name in self.held:
+                            self.superseded += 1
+                        self.held[name] = packet
+                        continue
+                if previous is not None:
+                    packet.boxes = [dict(box) for box in previous.boxes]
+                    packet.detections = previous.detections
+                    try:
+                        self.outputs[name].put_nowait(packet)
+                    except queue.Full:
+                        pass
+                    continue
+            with self.lock:
+                # Придержанные кадры старше нового изменившегося кадра уже не нужны
+                if self.held.pop(name, None) is not None:
+                    self.superseded += 1
+                self.pending[name] = seq
+            self.slots.put(name, packet)
+        self.slots.close(name)
+
+    def _inference(self):
+        while not self.stop_event.is_set():
+            batch = self.slots.take(self.max_batch, self.max_wait)
+            if not batch:
+                if not self.slots.open and not self.slots.frames:
+                    break
+                continue
+            start = time.perf_counter()
+            self.detect_batch([packet for _, packet in batch])
+            self.stats["inference"].record(time.perf_counter() - start)
+            self.batch_sizes.append(len(batch))
+            for name, packet in batch:
+                with self.lock:
+                    self.last[name] = packet
+                self._emit(name, packet)
+        for output in self.outputs.values():
+            output.put(STOP)
+
+    def _emit(self, name, packet):
+        # pending снимается, только когда придержанных кадров не осталось: до этого
+        # захват не отправляет кадры в обход, и они не обгоняют кадр с инференсом
+        output = packet
+        while True:
+            try:
+                self.outputs[name].put(output, timeout=1.0)
+            except queue.Full:
+                pass
+            with self.lock:
+                if self.pending.get(name) != packet.seq:
+                    return
+                output = self.held.pop(name, None)
+                if output is None:
+                    del self.pending[name]
+                    return
+            output.boxes = [dict(box) for box in packet.boxes]
+            output.detections = packet.detections
+
+    def _output(self, name):
+        # Кадры выходят по возрастанию seq: опоздавший более старый кадр отбрасывается
+        last_seq = 0
+        while True:
+            packet = self.outputs[name].get()
+            if packet is STOP:
+                break
+            if packet.seq <= last_seq:
+                self.stale += 1
+                continue
+            last_seq = packet.seq
+            self.decoders[name](packet)
+            self.publishers[name](packet)
+            self.stats[name].record(time.perf_counter() - packet.captured)
+
+    def report(self):
+        report = {name: stats.snapshot() for name, stats in self.stats.items()}
+        report["mean_batch"] = round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else None
+        report["dropped"] = self.slots.dropped
+        report["superseded"] = self.superseded
+        report["stale"] = self.stale
+        return report
+
+    def run(self):
+        targets = [partial(self._capture, name) for name in self.sources]
+        targets += [self._inference] + [partial(self._output, name) for name in self.sources]
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        last_report = time.perf_counter()
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                time.sleep(0.1)
+                if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                    print(self.report())
+                    last_report = time.perf_counter()
+        finally:
+            self.stop_event.set()
+            for thread in self.threads:
+                thread.join(timeout=2.0)
+        return self.report()
+
+
+if __name__ == "__main__":
+    from bench_replay import load_script
+    from vision_track import BoxTracker
+    from vision_motion import MotionGate
+    from vision_channel import DetectionPublisher
+    from vision_framebus import FrameBus, BUS_NAME
+
+    parser = argparse.ArgumentParser(description="Распознавание коробок с нескольких камер одной моделью")
+    parser.add_argument("sources", nargs="+", help="номера камер, видеофайлы или каталоги кадров")
+    parser.add_argument("--max-batch", type=int, default=4)
+    parser.add_argument("--max-wait", type=float, default=0.01, help="сколько ждать кадры других камер, с")
+    parser.add_argument("--realtime", action="store_true")
+    parser.add_argument("--heartbeat", type=float, default=2.0,
+                        help="инференс не реже чем раз в столько секунд на неподвижной сцене")
+    parser.add_argument("--no-motion-gate", action="store_true", help="инференс на каждом кадре")
+    parser.add_argument("--model", default="yolov8n_custom_for_box.pt", help="веса .pt или модель .onnx")
+    parser.add_argument("--engine", choices=("onnxruntime", "opencv"), help="чем запускать .onnx")
+    args = parser.parse_args()
+
+    vision = load_script("2) video_yolo.py", "video_yolo")
+    vision.headless = True
+    vision.MODEL_PATH, vision.MODEL_ENGINE = args.model, args.engine
+    vision.get_model()
+    vision.channel = DetectionPublisher()
+    names = [str(n + 1) for n in range(len(args.sources))]
+    # Результаты первой камеры пишутся в output.txt, камеры N - в output_N.txt;
+    # в канал все камеры публикуют под своими номерами, кадры - в шины BUS_NAME и BUS_NAME_N
+    vision.frame_buses.update({name: FrameBus(BUS_NAME if name == "1" else f"{BUS_NAME}_{name}")
+                               for name in names})
+    server = MultiSourceServer(
+        {name: open_source(spec, args.realtime) for name, spec in zip(names, args.sources)},
+        vision.detect_batch,
+        {name: partial(vision.read_qr_codes, tracker=BoxTracker()) for name in names},
+        {name: partial(vision.my_custom_sink, file_path="output.txt" if name == "1" else f"output_{name}.txt",
+                       source=name)
+         for name in names},
+        max_batch=args.max_batch, max_wait=args.max_wait,
+        gates=None if args.no_motion_gate else {name: MotionGate(heartbeat=args.heartbeat) for name in names})
+    try:
+        print(server.run())
+    except KeyboardInterrupt:
+        print(server.report())
+    for source in server.sources.values():
+        source.release()
+    vision.channel.close()
+    for frame_bus in vision.frame_buses.values():
+        frame_bus.close()
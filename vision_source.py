@@ -0,0 +1,94 @@
+import os
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class CameraSource:
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        self.name = None
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    # Записанное видео с ленты. realtime=True выдаёт кадры с частотой записи,
+    # как камера; иначе так быстро, как их успевают забирать.
+    def __init__(self, path, realtime=False, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Не удалось открыть видео {path}")
+        self.interval = 1 / (self.cap.get(cv2.CAP_PROP_FPS) or 30)
+        self.index = -1
+        self.name = None
+        self.next_time = None
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        if self.realtime:
+            now = time.perf_counter()
+            if self.next_time is not None and self.next_time > now:
+                time.sleep(self.next_time - now)
+            self.next_time = max(now, self.next_time or now) + self.interval
+        self.index += 1
+        self.name = str(self.index)
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource:
+    # Каталог кадров; имя файла служит ключом кадра в файле разметки
+    def __init__(self, path, fps=None):
+        self.files = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.path = path
+        self.interval = 1 / fps if fps else None
+        self.position = 0
+        self.name = None
+        self.next_time = None
+
+    def read(self):
+        while self.position < len(self.files):
+            name = self.files[self.position]
+            self.position += 1
+            frame = cv2.imread(os.path.join(self.path, name))
+            if frame is None:
+                print(f"Не удалось прочитать кадр {name}")
+                continue
+            if self.interval:
+                now = time.perf_counter()
+                if self.next_time is not None and self.next_time > now:
+                    time.sleep(self.next_time - now)
+                self.next_time = max(now, self.next_time or now) + self.interval
+            self.name = name
+            return True, frame
+        return False, None
+
+    def release(self):
+        pass
+
+
+def open_source(spec, realtime=False):
+    # "0", "1"... - камера, каталог - кадры из файлов, иначе видеофайл
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, fps=30 if realtime else None)
+    return VideoFileSource(spec, realtime=realtime)
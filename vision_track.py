@@ -0,0 +1,124 @@
+def iou(a, b):
+    # Рамки в виде (x1, y1, x2, y2)
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def box_bbox(box):
+    # Рамка из словаря посылки, как его строит detect_boxes
+    return (box['x'] - box['width'] / 2, box['y'] - box['height'] / 2,
+            box['x'] + box['width'] / 2, box['y'] + box['height'] / 2)
+
+
+class Track:
+    def __init__(self, track_id, bbox, frame):
+        self.id = track_id
+        self.bbox = bbox
+        self.last_seen = frame
+        self.qr = None
+        self.attempts = 0
+        self.next_attempt = frame
+
+
+class BoxTracker:
+    # Жадное сопоставление рамок соседних кадров по IoU. Для каждой посылки QR
+    # читается, пока не распознан; после неудачи следующая попытка откладывается
+    # на 1, 2, 4... кадров (не больше retry_max), распознанный текст хранится в треке.
+    def __init__(self, iou_threshold=0.3, max_missed=10, retry_max=8):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.retry_max = retry_max
+        self.tracks = []
+        self.frame = 0
+        self.next_id = 1
+        self.decodes = 0
+
+    def update(self, bboxes):
+        self.frame += 1
+        pairs = sorted(((iou(track.bbox, bbox), t, d) for t, track in enumerate(self.tracks)
+                        for d, bbox in enumerate(bboxes)), reverse=True)
+        matched = [None] * len(bboxes)
+        used = set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used or matched[d] is not None:
+                continue
+            used.add(t)
+            matched[d] = self.tracks[t]
+
+        for d, bbox in enumerate(bboxes):
+            if matched[d] is None:
+                matched[d] = Track(self.next_id, bbox, self.frame)
+                self.next_id += 1
+                self.tracks.append(matched[d])
+            matched[d].bbox = bbox
+            matched[d].last_seen = self.frame
+
+        self.tracks = [track for track in self.tracks if self.frame - track.last_seen <= self.max_missed]
+        return matched
+
+    def read(self, track, decode):
+        # decode() вызывается только для трека без распознанного QR и только в его очередь попытки
+        if track.qr is None and self.frame >= track.next_attempt:
+            self.decodes += 1
+            track.qr = decode()
+            if track.qr is None:
+                track.attempts += 1
+                track.next_attempt = self.frame + min(self.retry_max, 2 ** (track.attempts - 1))
+        return track.qr
+
+
+class RegionTracker:
+    # Для кадров без детектора (3) server_1.py): найденные QR-коды ищутся дальше
+    # только в расширенной области вокруг последнего положения, а полный кадр
+    # сканируется при появлении кода и затем всё реже (через 1, 2, 4... кадров).
+    def __init__(self, margin=50, max_missed=5, scan_max=8):
+        self.margin = margin
+        self.max_missed = max_missed
+        self.scan_max = scan_max
+        self.regions = {}
+        self.frame = 0
+        self.scan_interval = 1
+        self.next_scan = 0
+
+    def _region(self, polygon, width, height):
+        x_coords = [point[0] for point in polygon]
+        y_coords = [point[1] for point in polygon]
+        return (max(0, min(x_coords) - self.margin), max(0, min(y_coords) - self.margin),
+                min(width, max(x_coords) + self.margin), min(height, max(y_coords) + self.margin))
+
+    def update(self, image, decode):
+        # decode(image) возвращает список {"data", "polygon"}, как decode_qr_code
+        self.frame += 1
+        height, width = image.shape[:2]
+        found = {}
+        if self.frame >= self.next_scan:
+            new = False
+            for qr in decode(image):
+                new = new or qr["data"] not in self.regions
+                found[qr["data"]] = qr["polygon"]
+            self.scan_interval = 1 if new else min(self.scan_max, self.scan_interval * 2)
+            self.next_scan = self.frame + self.scan_interval
+        else:
+            for data, (polygon, missed) in self.regions.items():
+                left, top, right, bottom = self._region(polygon, width, height)
+                for qr in decode(image[top:bottom, left:right]):
+                    if qr["data"] == data:
+                        found[data] = [(x + left, y + top) for x, y in qr["polygon"]]
+                        break
+
+        for data, (polygon, missed) in list(self.regions.items()):
+            if data not in found:
+                if missed + 1 > self.max_missed:
+                    del self.regions[data]
+                else:
+                    self.regions[data] = (polygon, missed + 1)
+        for data, polygon in found.items():
+            self.regions[data] = (polygon, 0)
+
+        return [{"data": data, "polygon": polygon} for data, polygon in found.items()]
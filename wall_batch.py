@@ -0,0 +1,63 @@
+from wall_logick import print_field, place_box, rank_placements, box_target, target_field_name
+from fields_config import fields_store
+
+
+class PlanState:
+    def __init__(self, fields, box_id):
+        self.fields = fields
+        self.box_id = box_id
+        self.targets = []
+        self.placements = []
+        self.score = 0
+        self.placed = 0
+
+    def branch(self):
+        clone = PlanState({name: field.copy() for name, field in self.fields.items()}, self.box_id)
+        clone.targets = self.targets[:]
+        clone.placements = self.placements[:]
+        clone.score = self.score
+        clone.placed = self.placed
+        return clone
+
+
+def plan_batch(boxes, beam_width=1):
+    # boxes - список (поле, ширина, высота, вес), как возвращает parse_box.
+    # При beam_width=1 план совпадает с последовательными вызовами process_input,
+    # при большей ширине луча перебираются лучшие варианты для каждой коробки.
+    # Планирование идёт на копиях полей, в хранилище попадает только итоговый план.
+    # Блокировка хранилища держится от копирования до записи плана: коробка, размещённая
+    # другим запросом посреди планирования, иначе была бы молча перезаписана.
+    store = fields_store()
+    with store.lock:
+        beam = [PlanState({name: field.copy() for name, field in store.fields.items()}, store.current_box_id)]
+
+        for target_field, box_width, box_height, weight in boxes:
+            expanded = []
+            for state in beam:
+                # Паллету без номера в QR каждая ветка выбирает по своему состоянию полей
+                field_name = target_field_name(state.fields, target_field, box_width, box_height)
+                options = rank_placements(state.fields[field_name], box_width, box_height, beam_width)
+                if not options:
+                    state.targets.append(None)
+                    expanded.append(state)
+                    continue
+                for n, (score, x, y, orientation) in enumerate(options):
+                    child = state if n == len(options) - 1 else state.branch()
+                    child.box_id += 1
+                    place_box(child.fields[field_name], orientation[0], orientation[1], x, y, child.box_id)
+                    child.targets.append(box_target(field_name, x, y, orientation, box_width, box_height))
+                    child.placements.append((field_name, orientation[0], orientation[1], x, y))
+                    child.score += score
+                    child.placed += 1
+                    expanded.append(child)
+            expanded.sort(key=lambda plan: (plan.placed, plan.score), reverse=True)
+            beam = expanded[:beam_width]
+
+        best = beam[0]
+        for field_name, width, height, x, y in best.placements:
+            store.place(field_name, width, height, x, y)
+
+    print("Итоговое состояние полей:")
+    for name, field in store.fields.items():
+        print_field(field, name)
+    return best.targets
@@ -0,0 +1,52 @@
+import random
+import threading
+from collections import OrderedDict
+
+_zobrist_tables = {}
+
+
+def zobrist_table(width, height):
+    # Случайные 64-битные ключи клеток; одинаковые для полей одного размера
+    key = (width, height)
+    if key not in _zobrist_tables:
+        rng = random.Random(f"{width}x{height}")
+        _zobrist_tables[key] = [[rng.getrandbits(64) for _ in range(width)] for _ in range(height)]
+    return _zobrist_tables[key]
+
+
+class PlacementCache:
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+placement_cache = PlacementCache()
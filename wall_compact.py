@@ -0,0 +1,85 @@
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"LXF1"
+HEADER = struct.Struct("<4sIII")
+DTYPE = np.dtype("<u2")
+
+
+class CompactField:
+    # Поле как массив uint16 с номерами коробок плюс упакованная битовая карта
+    # занятости. Строки - numpy-массивы, поэтому print_field, is_field_full
+    # и функции размещения из wall_logick работают с ним как со списком строк.
+    def __init__(self, cells):
+        self.cells = cells
+        self.height, self.width = cells.shape
+
+    @classmethod
+    def create(cls, width, height):
+        return cls(np.zeros((height, width), dtype=DTYPE))
+
+    @classmethod
+    def from_list(cls, field):
+        return cls(np.array(field, dtype=DTYPE).reshape(len(field), len(field[0]) if field else 0))
+
+    def tolist(self):
+        return self.cells.tolist()
+
+    def __getitem__(self, i):
+        return self.cells[i]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def occupancy_bits(self):
+        return np.packbits(self.cells != 0, axis=None)
+
+    def can_place(self, box_width, box_height, x, y):
+        if x < 0 or y < 0 or x + box_width > self.width or y + box_height > self.height:
+            return False
+        return not self.cells[y:y + box_height, x:x + box_width].any()
+
+    def place(self, box_width, box_height, x, y, box_id):
+        self.cells[y:y + box_height, x:x + box_width] = box_id
+
+    def save(self, filename):
+        if isinstance(self.cells, np.memmap):
+            # Отпускаем отображение файла, который сейчас будет заменён
+            self.cells = np.array(self.cells)
+        bits = self.occupancy_bits()
+        size = HEADER.size + self.cells.nbytes + bits.nbytes
+        temp = filename + ".tmp"
+        data = np.memmap(temp, dtype=np.uint8, mode="w+", shape=(size,))
+        data[:HEADER.size] = np.frombuffer(HEADER.pack(MAGIC, self.height, self.width, bits.nbytes), dtype=np.uint8)
+        data[HEADER.size:HEADER.size + self.cells.nbytes] = self.cells.astype(DTYPE).reshape(-1).view(np.uint8)
+        data[HEADER.size + self.cells.nbytes:] = bits
+        data.flush()
+        del data
+        os.replace(temp, filename)
+
+    @staticmethod
+    def _header(filename):
+        with open(filename, "rb") as file:
+            magic, height, width, bits_size = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} не является файлом поля")
+        return height, width, bits_size
+
+    @classmethod
+    def load(cls, filename, mode="c"):
+        # Без копирования: строки поля читаются прямо из отображённого файла,
+        # изменения остаются в памяти до следующего save
+        height, width, _ = cls._header(filename)
+        return cls(np.memmap(filename, dtype=DTYPE, mode=mode, offset=HEADER.size, shape=(height, width)))
+
+    @classmethod
+    def load_occupancy(cls, filename):
+        height, width, bits_size = cls._header(filename)
+        bits = np.memmap(filename, dtype=np.uint8, mode="r", offset=HEADER.size + height * width * 2,
+                         shape=(bits_size,))
+        return np.unpackbits(bits, count=height * width).reshape(height, width).astype(bool)
@@ -0,0 +1,120 @@
+from wall_index import OccupancyIndex
+from wall_free import FreeSpaceIndex
+from wall_cache import zobrist_table
+
+
+class Field:
+    # Обёртка над списком строк поля: хранит заполненность строк и столбцов,
+    # карту контактов (число занятых соседей у каждой клетки) и индекс занятости.
+    # Все счётчики обновляются в place, поэтому оценка позиции стоит O(w + h),
+    # а список максимальных пустых прямоугольников даёт только допустимые позиции.
+    # zobrist - хеш занятости поля, по нему кешируются решения о размещении.
+    def __init__(self, cells):
+        self.cells = cells
+        self.height = len(cells)
+        self.width = len(cells[0]) if cells else 0
+        self._rebuild()
+
+    def _rebuild(self):
+        cells = self.cells
+        self.row_filled = [sum(1 for cell in row if cell != 0) for row in cells]
+        self.col_filled = [sum(1 for i in range(self.height) if cells[i][j] != 0)
+                           for j in range(self.width)]
+        self.contact = [[self._count_neighbours(i, j) for j in range(self.width)]
+                        for i in range(self.height)]
+        self.contact_prefix = [self._prefix(row) for row in self.contact]
+        self.index = OccupancyIndex.from_field(cells)
+        self.free = FreeSpaceIndex.from_field(cells)
+        self.zobrist_keys = zobrist_table(self.width, self.height)
+        self.zobrist = 0
+        for i in range(self.height):
+            for j in range(self.width):
+                if cells[i][j] != 0:
+                    self.zobrist ^= self.zobrist_keys[i][j]
+
+    def copy(self):
+        clone = Field.__new__(Field)
+        clone.cells = [row[:] for row in self.cells]
+        clone.height = self.height
+        clone.width = self.width
+        clone.row_filled = self.row_filled[:]
+        clone.col_filled = self.col_filled[:]
+        clone.contact = [row[:] for row in self.contact]
+        clone.contact_prefix = [row[:] for row in self.contact_prefix]
+        clone.index = OccupancyIndex(self.index.width, self.index.height)
+        clone.index.table = [row[:] for row in self.index.table]
+        clone.free = FreeSpaceIndex(self.free.width, self.free.height)
+        clone.free.rects = self.free.rects[:]
+        clone.zobrist_keys = self.zobrist_keys
+        clone.zobrist = self.zobrist
+        return clone
+
+    def __getitem__(self, i):
+        return self.cells[i]
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    @staticmethod
+    def _prefix(row):
+        prefix = [0]
+        for value in row:
+            prefix.append(prefix[-1] + value)
+        return prefix
+
+    def _count_neighbours(self, i, j):
+        cells = self.cells
+        count = 0
+        if i > 0 and cells[i - 1][j] != 0:
+            count += 1
+        if i < self.height - 1 and cells[i + 1][j] != 0:
+            count += 1
+        if j > 0 and cells[i][j - 1] != 0:
+            count += 1
+        if j < self.width - 1 and cells[i][j + 1] != 0:
+            count += 1
+        return count
+
+    def can_place(self, box_width, box_height, x, y):
+        return self.index.is_free(x, y, box_width, box_height)
+
+    def place(self, box_width, box_height, x, y, box_id):
+        overwrites = box_id == 0 or not self.can_place(box_width, box_height, x, y)
+        for i in range(y, y + box_height):
+            row = self.cells[i]
+            for j in range(x, x + box_width):
+                row[j] = box_id
+        if overwrites:
+            self._rebuild()
+            return
+
+        touched_rows = set()
+        for i in range(y, y + box_height):
+            for j in range(x, x + box_width):
+                self.row_filled[i] += 1
+                self.col_filled[j] += 1
+                self.zobrist ^= self.zobrist_keys[i][j]
+                for ni, nj in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                    if 0 <= ni < self.height and 0 <= nj < self.width:
+                        self.contact[ni][nj] += 1
+                        touched_rows.add(ni)
+        for i in touched_rows:
+            self.contact_prefix[i] = self._prefix(self.contact[i])
+        self.index.add(x, y, box_width, box_height)
+        self.free.occupy(x, y, box_width, box_height)
+
+    def score(self, box_width, box_height, x, y):
+        score = sum(self.row_filled[y:y + box_height])
+        score += sum(self.col_filled[x:x + box_width])
+        for i in range(y, y + box_height):
+            prefix = self.contact_prefix[i]
+            score += prefix[x + box_width] - prefix[x]
+        edge_bonus = 0
+        edge_bonus += (self.height - (y + box_height))
+        edge_bonus += x
+        edge_bonus += (self.width - (x + box_width))
+        score += edge_bonus * 2
+        return score
@@ -0,0 +1,82 @@
+class FreeSpaceIndex:
+    # Множество максимальных пустых прямоугольников поля (x, y, ширина, высота).
+    # Любой свободный прямоугольник лежит внутри одного из них, поэтому
+    # допустимые позиции коробки - ровно объединение позиций внутри них.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rects = [(0, 0, width, height)] if width and height else []
+
+    @classmethod
+    def from_field(cls, field):
+        # Один проход по строкам: heights[x] - сколько пустых клеток стоит над (x, y)
+        # включительно. Монотонный стек по heights даёт прямоугольники, которые нельзя
+        # расширить влево, вправо и вверх; из них остаются те, что не расширить и вниз
+        height = len(field)
+        width = len(field[0]) if height else 0
+        index = cls(width, height)
+        index.rects = []
+        heights = [0] * width
+        for y in range(height):
+            row = field[y]
+            for x in range(width):
+                heights[x] = heights[x] + 1 if row[x] == 0 else 0
+            below = None
+            if y + 1 < height:
+                below = [0]
+                for cell in field[y + 1]:
+                    below.append(below[-1] + (cell != 0))
+            stack = []
+            for x in range(width + 1):
+                current = heights[x] if x < width else 0
+                start = x
+                while stack and stack[-1][1] > current:
+                    left, rect_height = stack.pop()
+                    if below is None or below[x] != below[left]:
+                        index.rects.append((left, y - rect_height + 1, x - left, rect_height))
+                    start = left
+                if current and (not stack or stack[-1][1] < current):
+                    stack.append((start, current))
+        return index
+
+    def occupy(self, x, y, box_width, box_height):
+        right, bottom = x + box_width, y + box_height
+        split = []
+        for rect in self.rects:
+            rx, ry, rw, rh = rect
+            if x >= rx + rw or right <= rx or y >= ry + rh or bottom <= ry:
+                split.append(rect)
+                continue
+            if x > rx:
+                split.append((rx, ry, x - rx, rh))
+            if right < rx + rw:
+                split.append((right, ry, rx + rw - right, rh))
+            if y > ry:
+                split.append((rx, ry, rw, y - ry))
+            if bottom < ry + rh:
+                split.append((rx, bottom, rw, ry + rh - bottom))
+        self.rects = self._maximal(split)
+
+    @staticmethod
+    def _maximal(rects):
+        rects = sorted(set(rects), key=lambda r: r[2] * r[3], reverse=True)
+        kept = []
+        for rx, ry, rw, rh in rects:
+            contained = False
+            for kx, ky, kw, kh in kept:
+                if kx <= rx and ky <= ry and rx + rw <= kx + kw and ry + rh <= ky + kh:
+                    contained = True
+                    break
+            if not contained:
+                kept.append((rx, ry, rw, rh))
+        return kept
+
+    def candidates(self, box_width, box_height):
+        positions = set()
+        for rx, ry, rw, rh in self.rects:
+            if rw < box_width or rh < box_height:
+                continue
+            for y in range(ry, ry + rh - box_height + 1):
+                for x in range(rx, rx + rw - box_width + 1):
+                    positions.add((y, x))
+        return [(x, y) for y, x in sorted(positions)]
@@ -0,0 +1,50 @@
+import operator
+
+
+class OccupancyIndex:
+    # Таблица префиксных сумм занятости: table[i][j] - число занятых клеток
+    # в прямоугольнике из первых i строк и первых j столбцов поля.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.table = [[0] * (width + 1) for _ in range(height + 1)]
+
+    @classmethod
+    def from_field(cls, field):
+        height = len(field)
+        width = len(field[0]) if height else 0
+        index = cls(width, height)
+        for i in range(height):
+            row_sum = 0
+            above = index.table[i]
+            current = index.table[i + 1]
+            for j in range(width):
+                if field[i][j] != 0:
+                    row_sum += 1
+                current[j + 1] = above[j + 1] + row_sum
+        return index
+
+    def filled(self, x, y, box_width, box_height):
+        table = self.table
+        top, bottom = table[y], table[y + box_height]
+        return bottom[x + box_width] - bottom[x] - top[x + box_width] + top[x]
+
+    def is_free(self, x, y, box_width, box_height):
+        if x < 0 or y < 0 or x + box_width > self.width or y + box_height > self.height:
+            return False
+        return self.filled(x, y, box_width, box_height) == 0
+
+    def add(self, x, y, box_width, box_height):
+        # Клетки прямоугольника должны быть свободны: к строкам таблицы ниже y
+        # прибавляется площадь пересечения с коробкой. Строки ниже коробки получают
+        # одинаковую добавку, она считается один раз.
+        ramp = [min(j - x, box_width) for j in range(x + 1, self.width + 1)]
+        table = self.table
+        for i in range(y + 1, self.height + 1):
+            rows = i - y
+            if rows < box_height:
+                step = [rows * value for value in ramp]
+            elif rows == box_height:
+                step = [box_height * value for value in ramp]
+            row = table[i]
+            row[x + 1:] = map(operator.add, row[x + 1:], step)
@@ -1,6 +1,11 @@
 import re
 import json
 from math import trunc, ceil
+from wall_field import Field
+from wall_compact import CompactField
+from wall_cache import placement_cache
+from fields_config import field_config, fields_store
+import wall_service
 
 field1 = []
 field2 = []
@@ -17,9 +22,13 @@ def print_field(field, field_name):
     print()
 
 
-def can_place_box(field, box_width, box_height, x, y):
+def can_place_box(field, box_width, box_height, x, y, index=None):
     if x + box_width > len(field[0]) or y + box_height > len(field):
         return False
+    if index is not None:
+        return index.is_free(x, y, box_width, box_height)
+    if isinstance(field, (Field, CompactField)):
+        return field.can_place(box_width, box_height, x, y)
     for i in range(y, y + box_height):
         for j in range(x, x + box_width):
             if field[i][j] != 0:
@@ -27,13 +36,20 @@ def can_place_box(field, box_width, box_height, x, y):
     return True
 
 
-def place_box(field, box_width, box_height, x, y, box_id):
-    for i in range(y, y + box_height):
-        for j in range(x, x + box_width):
-            field[i][j] = box_id
+def place_box(field, box_width, box_height, x, y, box_id, index=None):
+    if isinstance(field, (Field, CompactField)):
+        field.place(box_width, box_height, x, y, box_id)
+    else:
+        for i in range(y, y + box_height):
+            for j in range(x, x + box_width):
+                field[i][j] = box_id
+    if index is not None:
+        index.add(x, y, box_width, box_height)
 
 
 def calculate_score(field, box_width, box_height, x, y):
+    if isinstance(field, Field):
+        return field.score(box_width, box_height, x, y)
     score = 0
     for i in range(y, y + box_height):
         row_filled = sum(1 for cell in field[i] if cell != 0)
@@ -59,7 +75,24 @@ def calculate_score(field, box_width, box_height, x, y):
     return score
 
 
-def find_best_placement(field, box_width, box_height):
+def candidate_positions(field, width, height):
+    if isinstance(field, Field):
+        return field.free.candidates(width, height)
+    return [(x, y) for y in range(len(field) - height + 1) for x in range(len(field[0]) - width + 1)]
+
+
+def find_best_placement(field, box_width, box_height, index=None):
+    if isinstance(field, Field) and index is None:
+        key = (field.width, field.height, field.zobrist, box_width, box_height)
+        placement = placement_cache.get(key)
+        if placement is None:
+            placement = search_best_placement(field, box_width, box_height)
+            placement_cache.put(key, placement)
+        return placement
+    return search_best_placement(field, box_width, box_height, index)
+
+
+def search_best_placement(field, box_width, box_height, index=None):
     best_x, best_y, best_score = -1, -1, -1
     best_orientation = None
 
@@ -67,22 +100,80 @@ def find_best_placement(field, box_width, box_height):
 
     for orientation in [(box_height, box_width), (box_width, box_height)]:
         width, height = orientation
-        for y in range(len(field) - height + 1):
-            for x in range(len(field[0]) - width + 1):
-                if can_place_box(field, width, height, x, y):
-                    score = calculate_score(field, width, height, x, y)
+        for x, y in candidate_positions(field, width, height):
+            if can_place_box(field, width, height, x, y, index):
+                score = calculate_score(field, width, height, x, y)
 
-                    if orientation == (box_height, box_width):
-                        score += vertical_bonus
+                if orientation == (box_height, box_width):
+                    score += vertical_bonus
 
-                    if score > best_score:
-                        best_score = score
-                        best_x, best_y = x, y
-                        best_orientation = orientation
+                if score > best_score:
+                    best_score = score
+                    best_x, best_y = x, y
+                    best_orientation = orientation
 
     return best_x, best_y, best_orientation
 
 
+def find_best_placement_vertical_first(field, box_width, box_height, index=None):
+    best_x, best_y, best_score = -1, -1, -1
+    best_orientation = None
+
+    # First try vertical orientation (height > width)
+    if box_height >= box_width:
+        width, height = box_width, box_height
+        for x, y in candidate_positions(field, width, height):
+            if can_place_box(field, width, height, x, y, index):
+                score = calculate_score(field, width, height, x, y)
+                score += 200  # Bonus for vertical orientation
+                if score > best_score:
+                    best_score = score
+                    best_x, best_y = x, y
+                    best_orientation = (width, height)
+    else:
+        # If natural orientation is horizontal, try vertical first
+        width, height = box_height, box_width
+        for x, y in candidate_positions(field, width, height):
+            if can_place_box(field, width, height, x, y, index):
+                score = calculate_score(field, width, height, x, y)
+                score += 200  # Bonus for vertical orientation
+                if score > best_score:
+                    best_score = score
+                    best_x, best_y = x, y
+                    best_orientation = (width, height)
+
+    # If no vertical placement found, try original orientation
+    if best_orientation is None:
+        width, height = box_width, box_height
+        for x, y in candidate_positions(field, width, height):
+            if can_place_box(field, width, height, x, y, index):
+                score = calculate_score(field, width, height, x, y)
+                if score > best_score:
+                    best_score = score
+                    best_x, best_y = x, y
+                    best_orientation = (width, height)
+
+    return best_x, best_y, best_orientation
+
+
+def rank_placements(field, box_width, box_height, limit=None):
+    # Все допустимые размещения по убыванию оценки; первое совпадает с find_best_placement
+    ranked = []
+    vertical_bonus = 100
+    for order, orientation in enumerate([(box_height, box_width), (box_width, box_height)]):
+        width, height = orientation
+        for x, y in candidate_positions(field, width, height):
+            if can_place_box(field, width, height, x, y):
+                score = calculate_score(field, width, height, x, y)
+                if orientation == (box_height, box_width):
+                    score += vertical_bonus
+                ranked.append((-score, order, y, x, orientation))
+    ranked.sort(key=lambda item: item[:4])
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [(-score, x, y, orientation) for score, order, y, x, orientation in ranked]
+
+
 def is_field_full(field):
     for row in field:
         if 0 in row:
@@ -122,81 +213,92 @@ def load_fields_from_file(x1, y1, x2, y2, filename="fields_state.json"):
     return None, None, 0
 
 
-def process_input(input_string, x1, y1, x2, y2):
-    global field1, field2
-
-    pattern = r"Поле:\s*(\d+)\s*Ширина:\s*(\d+)\s*Высота:\s*(\d+)\s*Вес:\s*(\d+)"
+def parse_box(input_string):
+    # Поле в QR-коде может отсутствовать - тогда паллета выбирается планировщиком
+    pattern = r"(?:Поле:\s*(\d+)\s*)?Ширина:\s*(\d+)\s*Высота:\s*(\d+)\s*Вес:\s*(\d+)"
     match = re.match(pattern, input_string)
     if not match:
-        print("Некорректный формат входных данных.")
         return None
+    target_field = int(match.group(1)) if match.group(1) else None
+    return target_field, int(match.group(2)), int(match.group(3)), int(match.group(4))
+
+
+def box_target(field_name, x, y, orientation, box_width, box_height, fields=None):
+    width, height = orientation
+
+    center_x_cm = x + ceil(width / 2)
+    center_y_cm = y + ceil(height / 2)
+    if width % 2 == 0:
+        center_x_cm += 0.5
+    if height % 2 == 0:
+        center_y_cm += 0.5
+
+    offsets = field_config(field_name, fields)
+    center_xx = 40 + (center_x_cm * 8) + offsets["offset_x"]
+    center_yy = 92 - (center_y_cm * 8) + offsets["offset_y"]
+    return {
+        "center_coordinates": [center_xx, center_yy],
+        "orientation": "горизонтальная" if orientation == (box_width, box_height) else "вертикальная"
+    }
 
-    target_field = int(match.group(1))
-    box_width = int(match.group(2))
-    box_height = int(match.group(3))
-    weight = int(match.group(4))
 
-    field1, field2, current_box_id = load_fields_from_file(x1, y1, x2, y2)
+def choose_field(fields, box_width, box_height):
+    # Поле с лучшей оценкой размещения; оценку ведёт PlacementService (большие поля - в пуле процессов).
+    # Если коробка не помещается никуда - первое поле
+    best = wall_service.placement_service().evaluate(fields, box_width, box_height)
+    return best[1] if best else next(iter(fields))
 
-    if not field1:
-        field1 = create_field(x1, y1)
-    if not field2:
-        field2 = create_field(x2, y2)
 
-    field = field1 if target_field == 1 else field2
-    field_name = "1" if target_field == 1 else "2"
+def target_field_name(fields, target_field, box_width, box_height):
+    # Паллета из QR-кода, если она есть в конфигурации, иначе её выбирает choose_field
+    if target_field is not None and str(target_field) in fields:
+        return str(target_field)
+    if target_field is not None:
+        print(f"Поле {target_field} не описано в конфигурации, паллета будет выбрана автоматически.")
+    return choose_field(fields, box_width, box_height)
 
-    x, y, orientation = find_best_placement(field, box_width, box_height)
-    if x != -1 and y != -1:
-        width, height = orientation
-        current_box_id += 1
-        place_box(field, width, height, x, y, current_box_id)
 
-        t1 = False
-        t2 = False
+def process_input(input_string):
+    box = parse_box(input_string)
+    if box is None:
+        print("Некорректный формат входных данных.")
+        return None
+
+    target_field, box_width, box_height, weight = box
+
+    # Размеры полей берутся из fields_config.json
+    store = fields_store()
+    with store.lock:
+        field_name = target_field_name(store.fields, target_field, box_width, box_height)
+        field = store.field(field_name)
+
+        x, y, orientation = find_best_placement(field, box_width, box_height)
+        if x != -1 and y != -1:
+            store.place(field_name, orientation[0], orientation[1], x, y)
 
-        if width % 2 == 0:
-            t1 = True
-        if height % 2 == 0:
-            t2 = True
+    if x != -1 and y != -1:
+        width, height = orientation
 
         center_x_cell = x + ceil(width / 2)
         center_y_cell = y + ceil(height / 2)
 
-        center_x_cm = center_x_cell
-        center_y_cm = center_y_cell
-
-        orientation_str = "горизонтальная" if orientation == (box_width, box_height) else "вертикальная"
-        print(f"Ориентация коробки: {orientation_str}")
+        target = box_target(field_name, x, y, orientation, box_width, box_height)
+        print(f"Ориентация коробки: {target['orientation']}")
         print(f"Центр коробки на поле {field_name} (клетки): ({center_x_cell}, {center_y_cell})")
-        print(f"Центр коробки на поле {field_name} в сантиметрах: ({center_x_cm} см, {center_y_cm} см)")
+        print(f"Центр коробки на поле {field_name} в сантиметрах: ({center_x_cell} см, {center_y_cell} см)")
 
         print("Итоговое состояние полей:")
-        print_field(field1, "1")
-        print_field(field2, "2")
-
-        save_fields_to_file(field1, field2, x1, y1, x2, y2, current_box_id)
-        if t1:
-            center_x_cm += 0.5
-        if t2:
-            center_y_cm += 0.5
-
-        center_xx = 40 + (center_x_cm * 8)
-        center_yy = 92 - (center_y_cm * 8)
-
-        if field_name == "2":
-            center_xx += 144
-        return {
-            "center_coordinates": [center_xx, center_yy],
-            "orientation": orientation_str
-        }
+        for name, field in store.fields.items():
+            print_field(field, name)
+
+        return target
     else:
         print(f"Коробка размером {box_width}x{box_height} не помещается в поле {field_name}.")
         return None
 
 
 def extract_qr_data_lines(file_path):
-    pattern = r"Поле:\s*\d+\s*Ширина:\s*\d+\s*Высота:\s*\d+\s*Вес:\s*\d+"
+    pattern = r"(?:Поле:\s*\d+\s*)?Ширина:\s*\d+\s*Высота:\s*\d+\s*Вес:\s*\d+"
 
     qr_data_lines = []
 
@@ -215,13 +317,11 @@ def extract_qr_data_lines(file_path):
     return qr_data_lines
 
 if __name__ == "__main__":
-    x1, y1 = 8, 12
-    x2, y2 = 8, 12
     file_path = "output.txt"
     qr_data_lines = extract_qr_data_lines(file_path)
     print(qr_data_lines)
     input_string = "Поле: 2 Ширина: 4 Высота: 4 Вес: 12"
-    data = process_input(qr_data_lines[0], x1, y1, x2, y2)
+    data = process_input(qr_data_lines[0])
     center_coordinates = data['center_coordinates']
     orientation_str = data['orientation']
 
@@ -0,0 +1,78 @@
+import numpy as np
+
+VERTICAL_BONUS = 100
+
+
+def occupancy(field):
+    return (np.asarray(getattr(field, "cells", field)) != 0).astype(np.int64)
+
+
+def window_sums(grid, width, height):
+    # Сумма по каждому окну width x height через таблицу префиксных сумм
+    table = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+    return (table[height:, width:] - table[:-height, width:]
+            - table[height:, :-width] + table[:-height, :-width])
+
+
+def neighbour_counts(occ):
+    padded = np.pad(occ, 1)
+    return padded[:-2, 1:-1] + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]
+
+
+def score_grid(occ, width, height, rows=None, cols=None, contacts=None):
+    field_height, field_width = occ.shape
+    if width > field_width or height > field_height:
+        return None
+    if rows is None:
+        rows = occ.sum(axis=1)
+    if cols is None:
+        cols = occ.sum(axis=0)
+    if contacts is None:
+        contacts = neighbour_counts(occ)
+
+    row_cum = np.concatenate(([0], rows.cumsum()))
+    col_cum = np.concatenate(([0], cols.cumsum()))
+    row_part = row_cum[height:] - row_cum[:-height]
+    col_part = col_cum[width:] - col_cum[:-width]
+
+    edge_bonus = field_height - (np.arange(field_height - height + 1) + height) + field_width - width
+
+    score = (row_part + 2 * edge_bonus)[:, None] + col_part[None, :]
+    score = score + window_sums(contacts, width, height)
+    return np.where(window_sums(occ, width, height) == 0, score, -1)
+
+
+def best_in_orientation(occ, width, height, bonus=0, rows=None, cols=None, contacts=None):
+    # Лучшая позиция (оценка, x, y) для одной ориентации или None
+    scores = score_grid(occ, width, height, rows, cols, contacts)
+    if scores is None:
+        return None
+    flat = int(np.argmax(scores))
+    score = int(scores.flat[flat])
+    if score < 0:
+        return None
+    y, x = divmod(flat, scores.shape[1])
+    return score + bonus, x, y
+
+
+def find_best_placement(field, box_width, box_height):
+    occ = occupancy(field)
+    if occ.ndim != 2 or occ.size == 0:
+        return -1, -1, None
+    rows = occ.sum(axis=1)
+    cols = occ.sum(axis=0)
+    contacts = neighbour_counts(occ)
+
+    best_x, best_y, best_score = -1, -1, -1
+    best_orientation = None
+
+    for orientation in [(box_height, box_width), (box_width, box_height)]:
+        width, height = orientation
+        bonus = VERTICAL_BONUS if orientation == (box_height, box_width) else 0
+        best = best_in_orientation(occ, width, height, bonus, rows, cols, contacts)
+        if best is not None and best[0] > best_score:
+            best_score, best_x, best_y = best
+            best_orientation = orientation
+
+    return best_x, best_y, best_orientation
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import wall_logick
+import wall_numpy
+from fields_config import load_fields_config, fields_store
+
+
+def evaluate_orientation(occ, width, height, bonus):
+    return wall_numpy.best_in_orientation(occ.astype(np.int64), width, height, bonus)
+
+
+class PlacementService:
+    # Выбирает паллету и ориентацию для коробки среди всех полей из fields_config.json.
+    # Каждая пара (поле, ориентация) - отдельная задача. По умолчанию (workers=1) все они
+    # считаются на месте. Пул процессов включается явно, workers > 1, и только для полей
+    # от parallel_cells клеток: ускорение на данной машине сначала проверить
+    # bench_wall.benchmark_service (на одном ядре пул медленнее, а его запуск - до секунды).
+    def __init__(self, fields=None, workers=1, parallel_cells=20000, filename="fields_state.json"):
+        self.fields = fields or load_fields_config()
+        self.store = fields_store(self.fields, filename)
+        self.workers = workers or os.cpu_count()
+        self.parallel_cells = parallel_cells
+        self.pool = None
+
+    def _executor(self):
+        if self.pool is None:
+            # spawn и на Linux, как на Windows: без копии потоков и открытых портов родителя
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def evaluate(self, fields, box_width, box_height):
+        # Лучшее размещение (оценка, имя поля, x, y, ориентация) среди fields ({имя: поле}) или None
+        tasks = []
+        for name, field in fields.items():
+            occ = (np.asarray(getattr(field, "cells", field)) != 0).astype(np.uint8)
+            for orientation in [(box_height, box_width), (box_width, box_height)]:
+                bonus = wall_numpy.VERTICAL_BONUS if orientation == (box_height, box_width) else 0
+                tasks.append((name, orientation, occ, bonus))
+
+        cells = sum(occ.size for _, _, occ, _ in tasks)
+        if self.workers > 1 and len(tasks) > 1 and cells >= self.parallel_cells:
+            results = self._executor().map(evaluate_orientation,
+                                           [occ for _, _, occ, _ in tasks],
+                                           [orientation[0] for _, orientation, _, _ in tasks],
+                                           [orientation[1] for _, orientation, _, _ in tasks],
+                                           [bonus for _, _, _, bonus in tasks])
+        else:
+            results = [evaluate_orientation(occ, orientation[0], orientation[1], bonus)
+                       for _, orientation, occ, bonus in tasks]
+
+        best = None
+        for (name, orientation, _, _), result in zip(tasks, results):
+            if result is None:
+                continue
+            score, x, y = result
+            if best is None or score > best[0]:
+                best = (score, name, x, y, orientation)
+        return best
+
+    def choose(self, box_width, box_height, field_names=None):
+        names = field_names or [field["name"] for field in self.fields]
+        with self.store.lock:
+            return self.evaluate({name: self.store.field(name) for name in names}, box_width, box_height)
+
+    def place(self, box_width, box_height, field_name=None):
+        with self.store.lock:
+            best = self.choose(box_width, box_height, [field_name] if field_name else None)
+            if best is None:
+                print(f"Коробка размером {box_width}x{box_height} не помещается ни на одну паллету.")
+                return None
+            score, name, x, y, orientation = best
+            self.store.place(name, orientation[0], orientation[1], x, y)
+        target = wall_logick.box_target(name, x, y, orientation, box_width, box_height, self.fields)
+        target["field"] = name
+        return target
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def placement_service():
+    # Общий сервис для process_input, get_wall и plan_batch: поля из fields_config.json
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PlacementService()
+        return _service
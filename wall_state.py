@@ -0,0 +1,178 @@
+import atexit
+import json
+import os
+import queue
+import threading
+
+from wall_field import Field
+from wall_cache import placement_cache
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class FieldStore:
+    # Состояние полей живёт в памяти. Каждое размещение дописывается в журнал
+    # фоновым потоком, раз в snapshot_every размещений пишется снимок
+    # fields_state.json, после чего журнал очищается. При запуске снимок
+    # загружается и журнал проигрывается поверх него.
+    def __init__(self, sizes, filename="fields_state.json", journal=None, snapshot_every=50):
+        # sizes - {имя поля: (ширина, высота)}
+        self.sizes = dict(sizes)
+        self.filename = filename
+        self.journal = journal or os.path.splitext(filename)[0] + "_journal.log"
+        self.snapshot_every = snapshot_every
+        self.lock = threading.RLock()
+        self.seq = 0
+        self._since_snapshot = 0
+        self._queue = queue.Queue()
+        self._recover()
+        # Восстановленное состояние сразу пишется снимком, журнал очищается: если снимок
+        # был для полей другого размера или журнал оборвался, новые записи иначе
+        # дописывались бы после записей, которые при следующем запуске будут пропущены
+        self._write([("snapshot", self._state())])
+        self._writer = threading.Thread(target=self._write_behind, daemon=True)
+        self._writer.start()
+
+    def _empty_fields(self):
+        self.fields = {name: Field([[0 for _ in range(width)] for _ in range(height)])
+                       for name, (width, height) in self.sizes.items()}
+        self.current_box_id = 0
+
+    def _recover(self):
+        self._empty_fields()
+        try:
+            with open(self.filename, "r") as file:
+                state = json.load(file)
+            for name, (width, height) in self.sizes.items():
+                if (state.get(f"x{name}"), state.get(f"y{name}")) != (width, height):
+                    # Снимок и журнал относятся к полям другого размера
+                    return
+            self.fields = {name: Field(state[f"field{name}"]) for name in self.sizes}
+            self.current_box_id = state.get("current_box_id", 0)
+            self.seq = state.get("journal_seq", 0)
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(self.journal, "r", encoding="utf-8") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                if entry["seq"] <= self.seq:
+                    continue
+                self._apply(entry)
+            except (ValueError, KeyError, IndexError):
+                # Оборванная последняя запись после сбоя
+                break
+            self.seq = entry["seq"]
+
+    def _apply(self, entry):
+        if entry["op"] == "reset":
+            self._empty_fields()
+        else:
+            self.fields[entry["field"]].place(entry["width"], entry["height"], entry["x"], entry["y"],
+                                              entry["box_id"])
+            self.current_box_id = entry["box_id"]
+
+    def _state(self):
+        state = {}
+        for name, (width, height) in self.sizes.items():
+            state[f"field{name}"] = [row[:] for row in self.fields[name].cells]
+            state[f"x{name}"] = width
+            state[f"y{name}"] = height
+        state["current_box_id"] = self.current_box_id
+        state["journal_seq"] = self.seq
+        return state
+
+    def _log(self, entry):
+        self.seq += 1
+        entry["seq"] = self.seq
+        self._queue.put(("entry", entry))
+        self._since_snapshot += 1
+        if entry["op"] == "reset" or self._since_snapshot >= self.snapshot_every:
+            self._since_snapshot = 0
+            self._queue.put(("snapshot", self._state()))
+
+    def field(self, field_name):
+        return self.fields[field_name]
+
+    def place(self, field_name, width, height, x, y):
+        with self.lock:
+            self.current_box_id += 1
+            entry = {"op": "place", "field": field_name, "width": width, "height": height,
+                     "x": x, "y": y, "box_id": self.current_box_id}
+            self._apply(entry)
+            self._log(entry)
+            return self.current_box_id
+
+    def reset(self):
+        with self.lock:
+            entry = {"op": "reset"}
+            self._apply(entry)
+            self._log(entry)
+        placement_cache.clear()
+
+    def flush(self):
+        self._queue.join()
+
+    def _write_behind(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(items)
+            except OSError as e:
+                print(f"Ошибка записи состояния полей: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _write(self, items):
+        entries = []
+        for kind, payload in items:
+            if kind == "entry":
+                entries.append(payload)
+                continue
+            self._append(entries)
+            entries = []
+            temp = self.filename + ".tmp"
+            with open(temp, "w") as file:
+                json.dump(payload, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, self.filename)
+            open(self.journal, "w").close()
+        self._append(entries)
+
+    def _append(self, entries):
+        if not entries:
+            return
+        with open(self.journal, "a", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def open_store(sizes, filename="fields_state.json", journal=None):
+    with _stores_lock:
+        store = _stores.get(filename)
+        if store is None:
+            store = _stores[filename] = FieldStore(sizes, filename, journal)
+        elif store.sizes != dict(sizes) or (journal and store.journal != journal):
+            raise ValueError(f"Файл {filename} уже используется для полей {store.sizes}")
+        return store
+
+
+@atexit.register
+def _flush_stores():
+    for store in list(_stores.values()):
+        store.flush()